@@ -0,0 +1,255 @@
+"""
+Bulk PDF ingestion into the RAG knowledge base
+
+Usage:
+    python -m app.bulk_ingest /data/ielts-library
+    python -m app.bulk_ingest /data/ielts-library.zip --chunking-mode structured
+
+Documents already recorded as done in the manifest (same content hash) are
+skipped, so an interrupted run can simply be restarted with the same arguments.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+from .utils.pdf_extractor import get_pdf_extractor, build_chunk_metadata
+from .services.embedding_service import get_embedding_service
+from .clients.milvus_client import get_milvus_client
+
+env_path = Path(__file__).parent.parent.parent / ".env"
+if env_path.exists():
+    load_dotenv(env_path)
+else:
+    load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _init_extract_worker():
+    # Each worker handles whole documents, so no nested page-level pool
+    os.environ["PDF_EXTRACT_WORKERS"] = "1"
+
+def _extract_document(file_path: str, source_name: str, chunking_mode: Optional[str]) -> Tuple[int, List[Dict]]:
+    """Runs in a worker process: returns (page_count, non-empty chunks)"""
+    extractor = get_pdf_extractor()
+    pages = list(extractor.iter_pages(file_path))
+    chunks = [
+        chunk for chunk in extractor.chunk_pages(pages, source_name, chunking_mode)
+        if chunk["text"] and chunk["text"].strip()
+    ]
+    return len(pages), chunks
+
+def _sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class IngestManifest:
+    """Checkpoint file recording the outcome of every document, rewritten atomically"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.documents: Dict[str, Dict] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                self.documents = json.load(f).get("documents", {})
+            logger.info(f"Loaded manifest {path} ({len(self.documents)} documents)")
+
+    def is_done(self, key: str, sha256: str) -> bool:
+        entry = self.documents.get(key)
+        return bool(entry) and entry.get("status") == "done" and entry.get("sha256") == sha256
+
+    def record(self, key: str, **entry):
+        entry["updated_at"] = datetime.now(timezone.utc).isoformat()
+        self.documents[key] = entry
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"documents": self.documents}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+class ThroughputStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.documents = 0
+        self.failed = 0
+        self.skipped = 0
+        self.pages = 0
+        self.chunks = 0
+        self.embeddings = 0
+
+    def summary(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        return (
+            f"{self.documents} docs ({self.skipped} skipped, {self.failed} failed) in {elapsed:.1f}s | "
+            f"{self.pages / elapsed:.1f} pages/s, {self.chunks / elapsed:.1f} chunks/s, "
+            f"{self.embeddings / elapsed:.1f} embeddings/s"
+        )
+
+def collect_sources(source: Path, extract_dir: Path) -> List[Tuple[str, str]]:
+    """Return (source_key, file_path) for every PDF in a directory or zip archive"""
+    if source.is_dir():
+        return [
+            (str(path.relative_to(source)), str(path))
+            for path in sorted(source.rglob("*"))
+            if path.is_file() and path.suffix.lower() == ".pdf"
+        ]
+
+    if zipfile.is_zipfile(source):
+        sources = []
+        with zipfile.ZipFile(source) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or not member.filename.lower().endswith(".pdf"):
+                    continue
+                sources.append((member.filename, archive.extract(member, extract_dir)))
+        return sources
+
+    if source.suffix.lower() == ".pdf":
+        return [(source.name, str(source))]
+
+    raise ValueError(f"{source} is not a directory, zip archive or PDF file")
+
+class BulkIngester:
+    def __init__(
+        self,
+        manifest: IngestManifest,
+        extract_workers: int,
+        embed_concurrency: int,
+        chunking_mode: Optional[str] = None,
+        replace_existing: bool = True
+    ):
+        self.manifest = manifest
+        self.extract_workers = extract_workers
+        self.chunking_mode = chunking_mode
+        self.replace_existing = replace_existing
+        self.embedding_service = get_embedding_service()
+        self.milvus_client = get_milvus_client(
+            embedding_dimension=self.embedding_service.get_embedding_dimension()
+        )
+        self.milvus_client.create_collection_if_not_exists()
+        self.stats = ThroughputStats()
+        self._embed_semaphore = asyncio.Semaphore(embed_concurrency)
+        # Bounds how many extracted documents wait in memory for embedding
+        self._document_semaphore = asyncio.Semaphore(extract_workers * 2)
+        self._milvus_lock = asyncio.Lock()
+
+    async def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        async with self._embed_semaphore:
+            embeddings = await asyncio.to_thread(self.embedding_service.encode, texts)
+        self.stats.embeddings += len(texts)
+        return embeddings
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        batch_size = self.embedding_service.batch_size
+        batches = await asyncio.gather(*(
+            self._embed_batch(texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        ))
+        return np.vstack(batches)
+
+    def _store(self, key: str, chunks: List[Dict], embeddings: np.ndarray):
+        if self.replace_existing:
+            self.milvus_client.delete_by_source_file(key)
+        self.milvus_client.insert_documents(
+            texts=[chunk["text"] for chunk in chunks],
+            embeddings=embeddings,
+            source_file=key,
+            metadata_list=[build_chunk_metadata(chunk) for chunk in chunks],
+            flush=False
+        )
+
+    async def _process(self, pool: ProcessPoolExecutor, key: str, file_path: str, total: int):
+        loop = asyncio.get_running_loop()
+        sha256 = await asyncio.to_thread(_sha256, file_path)
+        if self.manifest.is_done(key, sha256):
+            self.stats.skipped += 1
+            return
+
+        async with self._document_semaphore:
+            try:
+                page_count, chunks = await loop.run_in_executor(
+                    pool, _extract_document, file_path, key, self.chunking_mode
+                )
+                self.stats.pages += page_count
+                self.stats.chunks += len(chunks)
+
+                if chunks:
+                    embeddings = await self._embed([chunk["text"] for chunk in chunks])
+                    async with self._milvus_lock:
+                        await asyncio.to_thread(self._store, key, chunks, embeddings)
+
+                self.manifest.record(key, status="done", sha256=sha256, pages=page_count, chunks=len(chunks))
+                self.stats.documents += 1
+                logger.info(
+                    f"[{self.stats.documents + self.stats.failed + self.stats.skipped}/{total}] "
+                    f"{key}: {page_count} pages, {len(chunks)} chunks | {self.stats.summary()}"
+                )
+            except Exception as e:
+                self.stats.failed += 1
+                self.manifest.record(key, status="failed", sha256=sha256, error=str(e))
+                logger.error(f"Failed to ingest {key}: {e}")
+
+    async def run(self, sources: List[Tuple[str, str]]) -> ThroughputStats:
+        with ProcessPoolExecutor(max_workers=self.extract_workers, initializer=_init_extract_worker) as pool:
+            await asyncio.gather(*(
+                self._process(pool, key, file_path, len(sources))
+                for key, file_path in sources
+            ))
+
+        await asyncio.to_thread(self.milvus_client.collection.flush)
+        return self.stats
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk ingest PDFs into the IELTS RAG knowledge base")
+    parser.add_argument("source", help="Directory, zip archive or single PDF")
+    parser.add_argument("--manifest", help="Checkpoint manifest path (default: <source>.ingest.json)")
+    parser.add_argument("--extract-workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes used for PDF extraction and chunking")
+    parser.add_argument("--embed-concurrency", type=int, default=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+                        help="Maximum embedding batches in flight")
+    parser.add_argument("--chunking-mode", choices=["sentence", "structured"],
+                        help="Overrides CHUNKING_MODE")
+    parser.add_argument("--keep-existing", action="store_true",
+                        help="Do not delete previously stored chunks of a re-ingested file")
+    return parser.parse_args()
+
+async def _main(args):
+    source = Path(args.source).resolve()
+    manifest_path = Path(args.manifest) if args.manifest else source.with_name(source.name + ".ingest.json")
+    manifest = IngestManifest(manifest_path)
+
+    with tempfile.TemporaryDirectory(prefix="ielts-ingest-") as extract_dir:
+        sources = collect_sources(source, Path(extract_dir))
+        logger.info(f"Found {len(sources)} PDF files in {source}")
+
+        ingester = BulkIngester(
+            manifest,
+            extract_workers=max(1, args.extract_workers),
+            embed_concurrency=max(1, args.embed_concurrency),
+            chunking_mode=args.chunking_mode,
+            replace_existing=not args.keep_existing
+        )
+        stats = await ingester.run(sources)
+
+    logger.info(f"Ingestion finished: {stats.summary()}")
+    logger.info(f"Manifest written to {manifest_path}")
+    return 1 if stats.failed else 0
+
+def main():
+    raise SystemExit(asyncio.run(_main(parse_args())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import os
+import logging
+from typing import List, Dict, Optional
+from pymilvus import (
+    connections,
+    Collection,
+    CollectionSchema,
+    FieldSchema,
+    DataType,
+    utility
+)
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows per batch when paging through a whole kind; a single query() is capped
+# at 16384 rows (offset + limit), so catalogs can be larger than one query
+QUERY_BATCH_SIZE = 4096
+
+class CatalogMilvusClient:
+    """
+    Milvus collection holding embeddings of platform catalog rows (courses, blogs).
+
+    Kept separate from the PDF knowledge base so catalog rows can be upserted by
+    their database id and filtered by structured fields (kind, skill, level, price).
+    """
+
+    def __init__(
+        self,
+        host: str = None,
+        port: int = None,
+        collection_name: str = None,
+        embedding_dimension: int = 1024
+    ):
+        self.host = host or os.getenv("MILVUS_HOST", "localhost")
+        self.port = port or int(os.getenv("MILVUS_PORT", "19530"))
+        self.collection_name = collection_name or os.getenv("CATALOG_COLLECTION_NAME", "ielts_catalog")
+        self.embedding_dimension = embedding_dimension
+        self.collection: Optional[Collection] = None
+        self._connected = False
+
+    def connect(self):
+        if self._connected:
+            return
+
+        try:
+            connections.connect(
+                alias="default",
+                host=self.host,
+                port=self.port
+            )
+            self._connected = True
+        except Exception as e:
+            logger.error(f"Failed to connect to Milvus: {e}")
+            raise
+
+    def create_collection_if_not_exists(self):
+        self.connect()
+
+        if utility.has_collection(self.collection_name):
+            self.collection = Collection(self.collection_name)
+            return
+
+        logger.info(f"Creating collection {self.collection_name}")
+
+        fields = [
+            # "<kind>:<row uuid>" so re-syncing a row overwrites its previous vector
+            FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, auto_id=False, max_length=64),
+            FieldSchema(name="kind", dtype=DataType.VARCHAR, max_length=16),
+            FieldSchema(name="ref_id", dtype=DataType.VARCHAR, max_length=64),
+            FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=8192),
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=self.embedding_dimension),
+            FieldSchema(name="skill_focus", dtype=DataType.VARCHAR, max_length=32),
+            FieldSchema(name="difficulty_level", dtype=DataType.VARCHAR, max_length=32),
+            FieldSchema(name="price", dtype=DataType.FLOAT),
+            FieldSchema(name="updated_at", dtype=DataType.INT64),
+        ]
+
+        schema = CollectionSchema(
+            fields=fields,
+            description="IELTS platform catalog - course and blog embeddings"
+        )
+
+        self.collection = Collection(
+            name=self.collection_name,
+            schema=schema
+        )
+
+        # The catalog is small and queried on every database_rag request,
+        # HNSW gives good recall without tuning nlist/nprobe to the row count
+        index_params = {
+            "metric_type": "COSINE",
+            "index_type": "HNSW",
+            "params": {"M": 16, "efConstruction": 200}
+        }
+
+        self.collection.create_index(
+            field_name="embedding",
+            index_params=index_params
+        )
+
+        logger.info(f"Collection {self.collection_name} created successfully")
+
+    def _ensure_collection(self):
+        if self.collection is None:
+            self.create_collection_if_not_exists()
+
+    def upsert_rows(self, rows: List[Dict], embeddings: np.ndarray):
+        """
+        Insert or replace catalog rows
+
+        Args:
+            rows: Dictionaries with id, kind, ref_id, text, skill_focus,
+                difficulty_level, price and updated_at (epoch ms)
+            embeddings: numpy array of embeddings, one per row
+        """
+        self._ensure_collection()
+
+        if len(rows) != len(embeddings):
+            raise ValueError(
+                f"Rows and embeddings count mismatch: {len(rows)} rows vs {len(embeddings)} embeddings"
+            )
+
+        if not rows:
+            return
+
+        data = []
+        for row, embedding in zip(rows, embeddings):
+            data.append({
+                "id": row["id"],
+                "kind": row["kind"],
+                "ref_id": row["ref_id"],
+                "text": (row.get("text") or "")[:8192],
+                "embedding": np.asarray(embedding, dtype=np.float32).tolist(),
+                "skill_focus": (row.get("skill_focus") or "")[:32],
+                "difficulty_level": (row.get("difficulty_level") or "")[:32],
+                "price": float(row.get("price") or 0.0),
+                "updated_at": int(row.get("updated_at") or 0),
+            })
+
+        try:
+            self.collection.upsert(data)
+            self.collection.flush()
+            logger.info(f"Upserted {len(data)} catalog rows into {self.collection_name}")
+        except Exception as e:
+            logger.error(f"Error upserting catalog rows: {e}")
+            raise
+
+    def delete_ids(self, ids: List[str]):
+        if not ids:
+            return
+        self._ensure_collection()
+        quoted = ", ".join(f'"{i}"' for i in ids)
+        self.collection.delete(f"id in [{quoted}]")
+        self.collection.flush()
+        logger.info(f"Deleted {len(ids)} stale catalog rows from {self.collection_name}")
+
+    def get_sync_state(self, kind: str) -> Dict[str, int]:
+        """
+        Return {id: updated_at} for every stored row of a kind.
+        Used both as the incremental sync watermark and to detect removed rows.
+        """
+        self._ensure_collection()
+        self.collection.load()
+
+        state = {}
+        iterator = self.collection.query_iterator(
+            batch_size=QUERY_BATCH_SIZE,
+            expr=f'kind == "{kind}"',
+            output_fields=["id", "updated_at"]
+        )
+        try:
+            while True:
+                results = iterator.next()
+                if not results:
+                    break
+                for r in results:
+                    state[r["id"]] = int(r.get("updated_at") or 0)
+        finally:
+            iterator.close()
+        return state
+
+    def search(
+        self,
+        query_embedding: List[float],
+        kind: str,
+        top_k: int = 5,
+        score_threshold: float = 0.4,
+        skill_focus: Optional[str] = None,
+        difficulty_level: Optional[str] = None,
+        max_price: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        ANN search restricted to one kind plus optional structured filters
+
+        Returns:
+            List of dictionaries with ref_id and score, best match first
+        """
+        self._ensure_collection()
+        self.collection.load()
+
+        conditions = [f'kind == "{kind}"']
+        if skill_focus:
+            conditions.append(f'skill_focus == "{skill_focus}"')
+        if difficulty_level:
+            conditions.append(f'difficulty_level == "{difficulty_level}"')
+        if max_price is not None:
+            conditions.append(f"price <= {float(max_price)}")
+
+        search_params = {
+            "metric_type": "COSINE",
+            "params": {"ef": max(64, top_k * 4)}
+        }
+
+        try:
+            results = self.collection.search(
+                data=[query_embedding],
+                anns_field="embedding",
+                param=search_params,
+                limit=top_k,
+                expr=" and ".join(conditions),
+                output_fields=["ref_id"]
+            )
+
+            hits = []
+            if results and len(results) > 0:
+                for hit in results[0]:
+                    if hit.score >= score_threshold:
+                        hits.append({
+                            "ref_id": hit.entity.get("ref_id", ""),
+                            "score": float(hit.score)
+                        })
+            return hits
+        except Exception as e:
+            logger.error(f"Error searching catalog: {e}")
+            raise
+
+    def get_collection_stats(self) -> Dict:
+        self._ensure_collection()
+
+        try:
+            return {
+                "num_entities": self.collection.num_entities,
+                "collection_name": self.collection_name
+            }
+        except Exception as e:
+            logger.error(f"Error getting catalog stats: {e}")
+            return {"error": str(e)}
+
+_catalog_milvus_client: Optional[CatalogMilvusClient] = None
+
+def get_catalog_milvus_client(embedding_dimension: int = 1024) -> CatalogMilvusClient:
+    global _catalog_milvus_client
+    if _catalog_milvus_client is None:
+        _catalog_milvus_client = CatalogMilvusClient(embedding_dimension=embedding_dimension)
+    return _catalog_milvus_client
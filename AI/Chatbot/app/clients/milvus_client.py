@@ -96,7 +96,8 @@ class MilvusClient:
         texts: List[str],
         embeddings: np.ndarray,
         source_file: str,
-        metadata_list: Optional[List[Dict]] = None
+        metadata_list: Optional[List[Dict]] = None,
+        flush: bool = True
     ) -> List[int]:
         """
         Insert documents into the collection
@@ -106,6 +107,7 @@ class MilvusClient:
             embeddings: numpy array of embeddings
             source_file: Name of the source file
             metadata_list: Optional list of metadata dictionaries
+            flush: Flush after inserting (bulk loads flush once at the end instead)
             
         Returns:
             List of inserted IDs
@@ -164,7 +166,8 @@ class MilvusClient:
         try:
             logger.info(f"Inserting {len(data)} documents into Milvus (embedding dim: {self.embedding_dimension})")
             result = self.collection.insert(data)
-            self.collection.flush()  # Ensure data is written
+            if flush:
+                self.collection.flush()  # Ensure data is written
             logger.info(f"Successfully inserted {len(texts)} documents into collection")
             return result.primary_keys
         except Exception as e:
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker over a sliding time window.
+
+    The circuit opens when, with at least min_calls in the window, the error
+    rate or the rate of calls slower than slow_call_seconds crosses its
+    threshold. After open_seconds the provider is probed (with the probe
+    coroutine if given, otherwise by letting one real request through); a
+    successful probe moves it to half-open, where a single trial request
+    decides between closing again and re-opening.
+
+    A last-resort provider may be called without allow_request(); an outcome
+    recorded after the cool-down then counts as that trial request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        probe: Optional[Callable[[], Awaitable[bool]]] = None
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.probe = probe
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self._calls = deque()  # (timestamp, failed, slow)
+        self._probe_task: Optional[asyncio.Task] = None
+        self._trial_in_flight = False
+
+    def _prune(self, now: float):
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _rates(self):
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failed = sum(1 for _, is_failed, _ in self._calls if is_failed)
+        slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+        return failed / total, slow / total
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Circuit '{self.name}' {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._calls.clear()
+        self._trial_in_flight = False
+
+    async def _run_probe(self):
+        try:
+            healthy = await self.probe()
+        except Exception as e:
+            logger.debug(f"Circuit '{self.name}' probe raised: {e}")
+            healthy = False
+        if self.state != OPEN:
+            return
+        if healthy:
+            self._transition(HALF_OPEN)
+        else:
+            # Stay open for another full period before probing again
+            self.opened_at = time.monotonic()
+
+    def is_open(self) -> bool:
+        """Open and still inside the cool-down period (does not reserve a trial request)"""
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def _end_cool_down(self):
+        # An ungated call finished after the cool-down: let it decide like a trial request
+        if self.state == OPEN and not self.is_open():
+            self._transition(HALF_OPEN)
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now; call record_* for every allowed request"""
+        if self.state == CLOSED:
+            return True
+
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            if self.probe is None:
+                self._transition(HALF_OPEN)
+            else:
+                if self._probe_task is None or self._probe_task.done():
+                    self._probe_task = asyncio.get_running_loop().create_task(self._run_probe())
+                return False
+
+        # Half-open: exactly one trial request at a time
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self, latency: float):
+        slow = self.slow_call_seconds is not None and latency > self.slow_call_seconds
+        self._end_cool_down()
+        if self.state == HALF_OPEN:
+            self._transition(OPEN if slow else CLOSED)
+            return
+        self._record(failed=False, slow=slow)
+
+    def record_failure(self, error: Exception):
+        self.last_error = str(error) or type(error).__name__
+        self._end_cool_down()
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        self._record(failed=True, slow=False)
+
+    def record_cancelled(self):
+        """A request abandoned by the caller (e.g. a hedged loser) says nothing about health"""
+        self._trial_in_flight = False
+
+    def _record(self, failed: bool, slow: bool):
+        now = time.monotonic()
+        self._calls.append((now, failed, slow))
+        self._prune(now)
+        if self.state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        error_rate, slow_rate = self._rates()
+        if error_rate >= self.error_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            logger.warning(
+                f"Circuit '{self.name}' opening: error rate {error_rate:.0%}, "
+                f"slow rate {slow_rate:.0%} over {len(self._calls)} calls"
+            )
+            self._transition(OPEN)
+
+    async def call(self, coro: Awaitable, is_failure: Callable[[Exception], bool] = lambda e: True):
+        """Await coro and record its outcome; callers other than a last resort check allow_request() first"""
+        start = time.perf_counter()
+        try:
+            result = await coro
+        except asyncio.CancelledError:
+            self.record_cancelled()
+            raise
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure(e)
+            else:
+                self.record_success(time.perf_counter() - start)
+            raise
+        self.record_success(time.perf_counter() - start)
+        return result
+
+    def snapshot(self) -> Dict:
+        self._prune(time.monotonic())
+        error_rate, slow_rate = self._rates()
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "window_calls": len(self._calls),
+            "error_rate": round(error_rate, 3),
+            "slow_rate": round(slow_rate, 3),
+            "retry_in_seconds": round(retry_in, 1) if retry_in is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def _breaker_from_env(name: str, prefix: str, slow_default: str, probe=None) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        window_seconds=float(os.getenv(f"{prefix}_CB_WINDOW_SECONDS", "60")),
+        min_calls=int(os.getenv(f"{prefix}_CB_MIN_CALLS", "5")),
+        error_rate_threshold=float(os.getenv(f"{prefix}_CB_ERROR_RATE", "0.5")),
+        slow_call_seconds=float(os.getenv(f"{prefix}_CB_SLOW_CALL_SECONDS", slow_default)),
+        slow_call_rate_threshold=float(os.getenv(f"{prefix}_CB_SLOW_CALL_RATE", "0.8")),
+        open_seconds=float(os.getenv(f"{prefix}_CB_OPEN_SECONDS", "30")),
+        probe=probe
+    )
+
+
+def get_ollama_breaker() -> CircuitBreaker:
+    if "ollama" not in _breakers:
+        from .ollama_client import health_check_ollama
+        _breakers["ollama"] = _breaker_from_env("ollama", "OLLAMA", "60", probe=health_check_ollama)
+    return _breakers["ollama"]
+
+
+def get_gemini_breaker() -> CircuitBreaker:
+    if "gemini" not in _breakers:
+        _breakers["gemini"] = _breaker_from_env("gemini", "GEMINI", "30")
+    return _breakers["gemini"]
+
+
+def get_breaker_states() -> Dict[str, Dict]:
+    get_ollama_breaker()
+    get_gemini_breaker()
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
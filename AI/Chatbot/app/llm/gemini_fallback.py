@@ -2,11 +2,17 @@ import os
 import logging
 import re
 import asyncio
+import time
 from pathlib import Path
 from fastapi import HTTPException
+from typing import Optional, Union
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
 
+from . import metrics
+from .profiles import GenerationProfile, get_profile
+
 env_path = Path(__file__).parent.parent.parent / ".env"
 if env_path.exists():
     load_dotenv(env_path)
@@ -23,8 +29,29 @@ genai_client = None
 if API_KEY:
     genai_client = genai.Client(api_key=API_KEY)
 
+def gemini_available() -> bool:
+    return genai_client is not None
+
+def _generation_config(profile: GenerationProfile, system: Optional[str] = None) -> types.GenerateContentConfig:
+    config = types.GenerateContentConfig(
+        system_instruction=system,
+        temperature=profile.temperature,
+        top_p=profile.top_p,
+        top_k=profile.top_k,
+        stop_sequences=profile.stop or None,
+    )
+    # Thinking tokens count against max_output_tokens, so the budget only applies
+    # to profiles that turn thinking off
+    if not profile.allow_thinking:
+        config.max_output_tokens = profile.num_predict
+        config.thinking_config = types.ThinkingConfig(thinking_budget=0)
+    return config
 
-async def query_gemini(prompt: str) -> str:
+async def query_gemini(
+    prompt: str,
+    profile: Optional[Union[str, GenerationProfile]] = None,
+    system: Optional[str] = None
+) -> str:
     if not API_KEY:
         raise HTTPException(
             status_code=500,
@@ -38,11 +65,14 @@ async def query_gemini(prompt: str) -> str:
         )
 
     try:
+        start = time.perf_counter()
         response = await asyncio.to_thread(
             genai_client.models.generate_content,
             model=MODEL_NAME,
-            contents=prompt
+            contents=prompt,
+            config=_generation_config(get_profile(profile), system)
         )
+        metrics.observe("gemini.total", time.perf_counter() - start)
         # Extract text from response
         text = response.text if hasattr(response, 'text') else str(response)
 
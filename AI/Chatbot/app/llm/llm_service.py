@@ -1,24 +1,81 @@
 import asyncio
 import logging
+import os
+from typing import Optional, Union
 from fastapi import HTTPException
 
-from .ollama_client import query_ollama
-from .gemini_fallback import query_gemini
+from . import metrics
+from .circuit_breaker import get_ollama_breaker, get_gemini_breaker
+from .scheduler import get_ollama_scheduler, QueueBudgetExceeded
+from .profiles import GenerationProfile, get_profile
+from .ollama_client import chat_ollama, build_messages
+from .gemini_fallback import query_gemini, gemini_available
 
 logger = logging.getLogger(__name__)
 
-BASE_MODEL_TIMEOUT = 120.0  
+BASE_MODEL_TIMEOUT = 120.0
 
+# Hedging: if Ollama has not produced its first token by the deadline, Gemini is
+# started in parallel and whichever provider finishes first wins. The deadline
+# follows the observed p95 time-to-first-token, clamped to [min, max].
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+HEDGE_INITIAL_DEADLINE = float(os.getenv("LLM_HEDGE_INITIAL_DEADLINE", "8.0"))
+HEDGE_MIN_DEADLINE = float(os.getenv("LLM_HEDGE_MIN_DEADLINE", "2.0"))
+HEDGE_MAX_DEADLINE = float(os.getenv("LLM_HEDGE_MAX_DEADLINE", "30.0"))
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
 
-async def generate_with_fallback(prompt: str) -> str:
+
+def _should_fallback(e: Exception) -> bool:
+    return not (isinstance(e, HTTPException) and 400 <= e.status_code < 500 and e.status_code != 404)
+
+
+def hedge_deadline() -> float:
+    """Seconds to wait for Ollama's first token before hedging with Gemini"""
+    histogram = metrics.get_histogram("ollama.first_token")
+    if histogram.sample_count() < HEDGE_MIN_SAMPLES:
+        return HEDGE_INITIAL_DEADLINE
+    observed = histogram.percentile(HEDGE_PERCENTILE)
+    return min(max(observed, HEDGE_MIN_DEADLINE), HEDGE_MAX_DEADLINE)
+
+
+async def _query_gemini(prompt: str, profile: GenerationProfile, system: Optional[str]) -> str:
+    # Gemini is the last resort, so it is not gated on allow_request(); the breaker
+    # still tracks it for hedging and /health, and closes again after the cool-down
+    return await get_gemini_breaker().call(query_gemini(prompt, profile, system))
+
+
+async def _call_ollama(make_request, priority: int) -> str:
+    """
+    Run an Ollama request inside a scheduler slot. Only waits for a slot up to the
+    priority's queue budget when there is somewhere to shed to (Gemini).
+    """
+    scheduler = get_ollama_scheduler()
+    breaker = get_ollama_breaker()
+    budget = scheduler.budget_for(priority) if gemini_available() else None
     try:
-        return await asyncio.wait_for(query_ollama(prompt), timeout=BASE_MODEL_TIMEOUT)
+        async with scheduler.slot(priority, budget):
+            # Client errors (bad request) say nothing about Ollama's health
+            return await breaker.call(
+                asyncio.wait_for(make_request(), timeout=BASE_MODEL_TIMEOUT), is_failure=_should_fallback
+            )
+    except (QueueBudgetExceeded, asyncio.CancelledError):
+        breaker.record_cancelled()
+        raise
+
+
+async def _generate_sequential(prompt: str, profile: GenerationProfile, system: Optional[str]) -> str:
+    try:
+        return await _call_ollama(lambda: chat_ollama(build_messages(prompt, system), profile=profile), profile.priority)
+    except QueueBudgetExceeded as e:
+        logger.warning(f"Shedding request to Gemini: {e}")
+        return await _query_gemini(prompt, profile, system)
     except asyncio.TimeoutError:
         logger.warning(
             f"Ollama request timed out after {BASE_MODEL_TIMEOUT}s. "
             "Falling back to Gemini."
         )
-        return await query_gemini(prompt)
+        return await _query_gemini(prompt, profile, system)
     except HTTPException as e:
         if 400 <= e.status_code < 500 and e.status_code != 404:
             raise
@@ -27,7 +84,98 @@ async def generate_with_fallback(prompt: str) -> str:
             f"Ollama failed with HTTP {e.status_code}: {e.detail}. "
             "Falling back to Gemini."
         )
-        return await query_gemini(prompt)
+        return await _query_gemini(prompt, profile, system)
     except Exception as e:
         logger.warning(f"Ollama unexpected error: {e}. Falling back to Gemini.")
-        return await query_gemini(prompt)
+        return await _query_gemini(prompt, profile, system)
+
+
+async def _await_ollama_or_fallback(
+    ollama_task: asyncio.Task, prompt: str, profile: GenerationProfile, system: Optional[str]
+) -> str:
+    try:
+        return await ollama_task
+    except QueueBudgetExceeded as e:
+        logger.warning(f"Shedding request to Gemini: {e}")
+        return await _query_gemini(prompt, profile, system)
+    except asyncio.TimeoutError:
+        logger.warning(f"Ollama request timed out after {BASE_MODEL_TIMEOUT}s. Falling back to Gemini.")
+    except Exception as e:
+        if not _should_fallback(e):
+            raise
+        logger.warning(f"Ollama failed: {e}. Falling back to Gemini.")
+    metrics.increment("llm.fallback")
+    return await _query_gemini(prompt, profile, system)
+
+
+async def _generate_hedged(prompt: str, profile: GenerationProfile, system: Optional[str]) -> str:
+    first_token = asyncio.Event()
+    messages = build_messages(prompt, system)
+    ollama_task = asyncio.create_task(
+        _call_ollama(lambda: chat_ollama(messages, on_first_token=first_token.set, profile=profile), profile.priority)
+    )
+    first_token_task = asyncio.create_task(first_token.wait())
+    tasks = [ollama_task, first_token_task]
+
+    try:
+        deadline = hedge_deadline()
+        await asyncio.wait(tasks, timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+        first_token_task.cancel()
+
+        if ollama_task.done() or first_token.is_set() or get_gemini_breaker().is_open():
+            # Ollama answered or is already streaming (or Gemini is down): no hedge
+            return await _await_ollama_or_fallback(ollama_task, prompt, profile, system)
+
+        logger.info(f"No first token from Ollama after {deadline:.1f}s, hedging with Gemini")
+        metrics.increment("llm.hedge.started")
+        gemini_task = asyncio.create_task(_query_gemini(prompt, profile, system))
+        tasks.append(gemini_task)
+
+        pending = {ollama_task, gemini_task}
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = "ollama" if task is ollama_task else "gemini"
+                    metrics.increment(f"llm.hedge.won.{winner}")
+                    return task.result()
+                last_error = task.exception()
+                logger.warning(f"Hedged {'Ollama' if task is ollama_task else 'Gemini'} request failed: {last_error}")
+        raise last_error
+    finally:
+        # Cancel the losing request (or everything, if the caller was cancelled)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def generate_with_fallback(
+    prompt: str,
+    profile: Optional[Union[str, GenerationProfile]] = "answer",
+    system: Optional[str] = None
+) -> str:
+    """
+    Generate with Ollama, falling back to (or hedging with) Gemini.
+
+    profile names a GenerationProfile ("answer", "summarize", "route",
+    "translate_fallback") whose budget, sampling, stop sequences and keep_alive
+    are sent to whichever provider serves the request; it also sets the
+    request's scheduling priority.
+
+    system is sent as the leading system message (Gemini system_instruction).
+    Pass one of the static prompts from llm.prompts and keep per-request data
+    in prompt, so the cached prefix is the same across requests.
+    """
+    profile = get_profile(profile)
+    # Without Gemini there is nothing to fail over to, so Ollama is always tried:
+    # a slow but working Ollama (CPU-only installs) must keep answering
+    if gemini_available() and not get_ollama_breaker().allow_request():
+        # Fail over immediately instead of paying Ollama's timeout on every request
+        logger.info("Ollama circuit is open, sending request straight to Gemini")
+        metrics.increment("llm.circuit_open.skipped_ollama")
+        return await _query_gemini(prompt, profile, system)
+
+    if HEDGE_ENABLED and gemini_available():
+        return await _generate_hedged(prompt, profile, system)
+    return await _generate_sequential(prompt, profile, system)
@@ -0,0 +1,82 @@
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+class LatencyHistogram:
+    """
+    Cumulative bucket counts plus a sliding window of recent samples
+
+    Buckets give the long-run distribution; the window answers percentile
+    queries (e.g. p95 time-to-first-token) that track current conditions.
+    """
+
+    BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0, math.inf)
+
+    def __init__(self, name: str, window: int = 500):
+        self.name = name
+        self.counts = [0] * len(self.BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+            self.total += 1
+            self.sum += seconds
+            self._recent.append(seconds)
+
+    def sample_count(self) -> int:
+        return len(self._recent)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._recent:
+                return None
+            ordered = sorted(self._recent)
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[index]
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.total,
+            "mean": (self.sum / self.total) if self.total else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": {
+                ("+Inf" if math.isinf(bound) else f"{bound:g}"): count
+                for bound, count in zip(self.BUCKETS, self.counts)
+            },
+        }
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_counters: Dict[str, int] = {}
+_registry_lock = threading.Lock()
+
+def get_histogram(name: str) -> LatencyHistogram:
+    with _registry_lock:
+        if name not in _histograms:
+            _histograms[name] = LatencyHistogram(name)
+        return _histograms[name]
+
+def observe(name: str, seconds: float):
+    get_histogram(name).observe(seconds)
+
+def increment(name: str, amount: int = 1):
+    with _registry_lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def get_llm_stats() -> Dict:
+    with _registry_lock:
+        histograms = dict(_histograms)
+        counters = dict(_counters)
+    return {
+        "latency_seconds": {name: h.snapshot() for name, h in sorted(histograms.items())},
+        "counters": counters,
+    }
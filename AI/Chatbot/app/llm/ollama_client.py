@@ -1,14 +1,24 @@
 import httpx
 import re
 import os
+import json
+import time
 import asyncio
 import logging
+from typing import Callable, Dict, List, Optional, Union
 from fastapi import HTTPException
 
+from . import metrics
+from .profiles import GenerationProfile, get_profile
+
 logger = logging.getLogger(__name__)
 
 API_URL = os.getenv("OLLAMA_API_URL", "http://ollama:11434/api/generate")
 MODEL_NAME = "hf.co/Zkare/Chatbot_Ielts_Assistant_v2:Q4_K_M"
+# /api/chat keeps the system message as a separate, stable prefix that Ollama can
+# reuse from its KV cache; set OLLAMA_USE_CHAT_API=false to send flat prompts instead
+USE_CHAT_API = os.getenv("OLLAMA_USE_CHAT_API", "true").lower() == "true"
+CHAT_API_URL = os.getenv("OLLAMA_CHAT_API_URL", API_URL.replace("/api/generate", "/api/chat"))
 
 _http_client = httpx.AsyncClient(
     timeout=httpx.Timeout(180.0, connect=30.0),  
@@ -17,141 +27,131 @@ _http_client = httpx.AsyncClient(
     follow_redirects=True  
 )
 
-_response_cache = {}
-_cache_max_size = 50
+EMPTY_RESPONSE_FALLBACK = "I'm here to help you with IELTS preparation. Please ask me a specific question."
+
+def _clean_response(response_text: str, from_response_field: bool) -> str:
+    if from_response_field:
+        cleaned_response = re.sub(r'<think>.*?</think>', '', response_text, flags=re.DOTALL | re.IGNORECASE)
+        cleaned_response = re.sub(r'<thinking>.*?</thinking>', '', cleaned_response, flags=re.DOTALL | re.IGNORECASE)
+    else:
+        cleaned_response = re.sub(r'<think>.*?</think>', '', response_text, flags=re.DOTALL | re.IGNORECASE)
+
+    cleaned_response = cleaned_response.strip()
+    return re.sub(r'\n\s*\n+', '\n\n', cleaned_response)
 
-async def query_ollama(prompt: str) -> str:
-    payload = {
+def _build_payload(prompt: str, stream: bool, profile: GenerationProfile) -> dict:
+    return {
         "model": MODEL_NAME, 
         "prompt": prompt, 
-        "stream": False,
-        "options": {
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "top_k": 40,
-            "num_ctx": 4096,
-            "num_predict": 1200,  
-            "repeat_penalty": 1.1,
-        }
+        "stream": stream,
+        "keep_alive": profile.keep_alive,
+        "options": profile.ollama_options()
+    }
+
+def _build_chat_payload(messages: List[Dict[str, str]], stream: bool, profile: GenerationProfile) -> dict:
+    return {
+        "model": MODEL_NAME,
+        "messages": messages,
+        "stream": stream,
+        "keep_alive": profile.keep_alive,
+        "options": profile.ollama_options()
     }
+
+def build_messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+    """Static system instructions first so every request shares the same prefix"""
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+async def chat_ollama(
+    messages: List[Dict[str, str]],
+    on_first_token: Optional[Callable[[], None]] = None,
+    profile: Optional[Union[str, GenerationProfile]] = None
+) -> str:
+    """
+    Streamed chat completion via /api/chat, returning the complete cleaned response.
+    With USE_CHAT_API disabled the messages are joined into one /api/generate prompt.
+
+    on_first_token is called as soon as the model emits its first non-empty
+    chunk, which lets callers tell a slow-to-start request from a long answer.
+    Time-to-first-token and total latency are recorded in the LLM metrics.
+    """
+    profile = get_profile(profile)
+    if not USE_CHAT_API:
+        prompt = "\n\n".join(message["content"] for message in messages)
+        return await _stream_response(API_URL, _build_payload(prompt, stream=True, profile=profile), on_first_token)
+    return await _stream_response(CHAT_API_URL, _build_chat_payload(messages, stream=True, profile=profile), on_first_token)
+
+async def _stream_response(url: str, payload: dict, on_first_token: Optional[Callable[[], None]]) -> str:
+    start = time.perf_counter()
+    response_text = ""
+    from_response_field = False
+    first_token_seen = False
     try:
-        resp = await _http_client.post(API_URL, json=payload)
-        
-        if resp.status_code == 404:
-            error_msg = f"Model '{MODEL_NAME}' not found. Please pull the model first: docker exec ollama-ielts ollama pull {MODEL_NAME}"
-            logger.error(error_msg)
-            raise HTTPException(status_code=404, detail=error_msg)
-        
-        resp.raise_for_status()
-        
-        # Ollama may return streaming format even with stream=False
-        # Parse the response text line by line to handle both formats
-        response_text = ""
-        thinking_text = ""
-        text_content = resp.text.strip()
-        from_response_field = False
-        
-        # Try to parse as single JSON first
-        try:
-            data = resp.json()
-            # Prioritize response field, fallback to thinking field if response is empty
-            response_text = data.get("response", "")
-            
-            # Track if we got data from response field
-            if response_text and response_text.strip():
-                from_response_field = True
-            else:
-                # Only use thinking if response is empty or None
-                thinking_text = data.get("thinking", "")
-                if thinking_text and thinking_text.strip():
-                    logger.debug("Response field is empty, using thinking field instead")
-                    response_text = thinking_text
-        except (ValueError, httpx.DecodeError):
-            # If single JSON fails, parse streaming format
-            # Accumulate all response chunks until done=True
-            import json
-            for line in text_content.split('\n'):
+        async with _http_client.stream("POST", url, json=payload) as resp:
+            if resp.status_code == 404:
+                error_msg = f"Model '{MODEL_NAME}' not found. Please pull the model first: docker exec ollama-ielts ollama pull {MODEL_NAME}"
+                logger.error(error_msg)
+                raise HTTPException(status_code=404, detail=error_msg)
+
+            resp.raise_for_status()
+
+            async for line in resp.aiter_lines():
                 if not line.strip():
                     continue
                 try:
                     chunk = json.loads(line)
-                    chunk_response = chunk.get("response", "")
-                    if chunk_response and chunk_response.strip():
-                        response_text += chunk_response
-                        from_response_field = True
-                    # Only check thinking if we don't have response yet
-                    elif not from_response_field:
-                        chunk_thinking = chunk.get("thinking", "")
-                        if chunk_thinking and chunk_thinking.strip():
-                            logger.debug("Response field is empty in stream, using thinking field instead")
-                            thinking_text += chunk_thinking
-                            response_text += chunk_thinking
-                    if chunk.get("done", False):
-                        break
                 except json.JSONDecodeError:
-                    # Skip invalid JSON lines
                     continue
-        
-        # If still no response, try to extract from last JSON object
-        if not response_text:
-            import json
-            try:
-                lines = text_content.split('\n')
-                for line in reversed(lines):
-                    if line.strip():
-                        try:
-                            data = json.loads(line)
-                            response_text = data.get("response", "")
-                            if response_text and response_text.strip():
-                                from_response_field = True
-                                break
-                            # Only check thinking if response is empty
-                            if not from_response_field:
-                                thinking_text = data.get("thinking", "")
-                                if thinking_text and thinking_text.strip():
-                                    logger.debug("Response field is empty, using thinking field instead")
-                                    response_text = thinking_text
-                                    break
-                        except json.JSONDecodeError:
-                            continue
-            except Exception:
-                pass
-        
-        # Clean up response
-        if from_response_field:
-            cleaned_response = re.sub(r'<think>.*?</think>', '', response_text, flags=re.DOTALL | re.IGNORECASE)
-            cleaned_response = re.sub(r'<thinking>.*?</thinking>', '', cleaned_response, flags=re.DOTALL | re.IGNORECASE)
-        else:
-            cleaned_response = re.sub(r'<think>.*?</think>', '', response_text, flags=re.DOTALL | re.IGNORECASE)
-        
-        cleaned_response = cleaned_response.strip()
-        cleaned_response = re.sub(r'\n\s*\n+', '\n\n', cleaned_response)
-        
+
+                # /api/generate streams "response"; /api/chat streams "message.content"
+                message = chunk.get("message") or {}
+                chunk_response = chunk.get("response") or message.get("content", "")
+                chunk_thinking = chunk.get("thinking") or message.get("thinking", "")
+                if not first_token_seen and (chunk_response or chunk_thinking):
+                    first_token_seen = True
+                    metrics.observe("ollama.first_token", time.perf_counter() - start)
+                    if on_first_token:
+                        on_first_token()
+
+                if chunk_response and (from_response_field or chunk_response.strip()):
+                    if not from_response_field:
+                        # Discard thinking accumulated before the real answer started
+                        response_text = ""
+                    response_text += chunk_response
+                    from_response_field = True
+                elif not from_response_field and chunk_thinking:
+                    response_text += chunk_thinking
+
+                if chunk.get("done", False):
+                    break
+
+        metrics.observe("ollama.total", time.perf_counter() - start)
+        cleaned_response = _clean_response(response_text, from_response_field)
         if not cleaned_response:
-            logger.warning(f"Empty response from Ollama. Original response_text length: {len(response_text)}, content preview: {response_text[:200]}")
-            try:
-                debug_data = resp.json()
-                logger.debug(f"Response JSON keys: {list(debug_data.keys())}")
-                logger.debug(f"Has 'response' field: {'response' in debug_data}, Has 'thinking' field: {'thinking' in debug_data}")
-            except:
-                pass
-            cleaned_response = "I'm here to help you with IELTS preparation. Please ask me a specific question."
-        
+            logger.warning(f"Empty streamed response from Ollama. Original response_text length: {len(response_text)}")
+            cleaned_response = EMPTY_RESPONSE_FALLBACK
         return cleaned_response
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Request timeout - please try again with a shorter question")
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error querying Ollama: {e}")
+        logger.error(f"Error streaming from Ollama: {e}")
         raise HTTPException(status_code=500, detail=f"Ollama error: {str(e)}")
 
 async def warmup_model():
     """
     Warm up the model by sending a simple request to prevent cold starts.
     """
+    from .scheduler import get_ollama_scheduler, PRIORITY_BACKGROUND
+    from .prompts import ASSISTANT_SYSTEM_PROMPT
     try:
-        await query_ollama("Hello")
+        # Also primes the KV cache with the answer system prompt
+        async with get_ollama_scheduler().slot(PRIORITY_BACKGROUND):
+            await chat_ollama(build_messages("Hello", ASSISTANT_SYSTEM_PROMPT), profile="summarize")
         print("Model warmed up successfully")
     except Exception as e:
         print(f"Model warmup failed: {e}")
@@ -0,0 +1,82 @@
+import os
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel, Field
+
+from .scheduler import PRIORITY_ROUTING, PRIORITY_ANSWER, PRIORITY_BACKGROUND
+
+DEFAULT_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+
+class GenerationProfile(BaseModel):
+    """Sampling and budget settings for one kind of LLM call, applied to both providers"""
+
+    name: str
+    num_predict: int = Field(description="Maximum tokens to generate (Gemini max_output_tokens)")
+    # Ollama reloads the model (and drops its KV cache) when num_ctx changes
+    # between requests, so all built-in profiles share the same context size
+    num_ctx: int = Field(default=4096, description="Ollama context window")
+    temperature: float = 0.7
+    top_p: float = 0.9
+    top_k: int = 40
+    repeat_penalty: float = 1.1
+    stop: List[str] = Field(default_factory=list)
+    keep_alive: str = DEFAULT_KEEP_ALIVE
+    priority: int = PRIORITY_ANSWER
+    allow_thinking: bool = Field(
+        default=True,
+        description="Let Gemini spend output budget on thinking; off for small internal budgets"
+    )
+
+    def ollama_options(self) -> Dict:
+        options = {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "top_k": self.top_k,
+            "num_ctx": self.num_ctx,
+            "num_predict": self.num_predict,
+            "repeat_penalty": self.repeat_penalty,
+        }
+        if self.stop:
+            options["stop"] = list(self.stop)
+        return options
+
+
+PROFILES: Dict[str, GenerationProfile] = {
+    "answer": GenerationProfile(
+        name="answer",
+        num_predict=1200,
+        temperature=0.7,
+    ),
+    "summarize": GenerationProfile(
+        name="summarize",
+        num_predict=300,
+        temperature=0.2,
+        stop=["\nUSER:", "\nASSISTANT:"],
+        priority=PRIORITY_BACKGROUND,
+        allow_thinking=False,
+    ),
+    "route": GenerationProfile(
+        name="route",
+        num_predict=500,  # Enough for the JSON decision plus a short reasoning
+        temperature=0.1,
+        priority=PRIORITY_ROUTING,
+        allow_thinking=False,
+    ),
+    "translate_fallback": GenerationProfile(
+        name="translate_fallback",
+        num_predict=512,
+        temperature=0.0,
+        repeat_penalty=1.0,
+        allow_thinking=False,
+    ),
+}
+
+
+def get_profile(profile: Optional[Union[str, GenerationProfile]] = None) -> GenerationProfile:
+    if profile is None:
+        return PROFILES["answer"]
+    if isinstance(profile, GenerationProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown generation profile '{profile}'. Available: {', '.join(PROFILES)}")
+    return PROFILES[profile]
@@ -0,0 +1,132 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITY_ROUTING = 0
+PRIORITY_ANSWER = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_ROUTING: "routing",
+    PRIORITY_ANSWER: "answer",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+class QueueBudgetExceeded(Exception):
+    """The request waited longer than its queue budget and should be shed"""
+
+
+class OllamaScheduler:
+    """
+    Admission control for the single Ollama instance.
+
+    At most max_in_flight requests are sent to Ollama at once; the rest wait
+    in a priority queue (routing before answers before background summaries,
+    FIFO within a class). A waiter that exceeds its queue budget is removed
+    and gets QueueBudgetExceeded so the caller can shed it to another provider.
+    """
+
+    def __init__(self, max_in_flight: int, budgets: Dict[int, Optional[float]]):
+        self.max_in_flight = max(1, max_in_flight)
+        self.budgets = budgets
+        self.in_flight = 0
+        self._queue: List = []  # (priority, seq, future)
+        self._seq = itertools.count()
+        self._waiting = {priority: 0 for priority in PRIORITY_NAMES}
+
+    def budget_for(self, priority: int) -> Optional[float]:
+        return self.budgets.get(priority)
+
+    def _grant_next(self):
+        while self._queue and self.in_flight < self.max_in_flight:
+            priority, _, future = heapq.heappop(self._queue)
+            if future.done():
+                # Abandoned waiter (timed out or cancelled), already uncounted
+                continue
+            self._waiting[priority] -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: int, budget: Optional[float] = None):
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future))
+        self._waiting[priority] += 1
+        self._grant_next()
+        if future.done():
+            metrics.observe(f"ollama.queue_wait.{name}", 0.0)
+            return
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait({future}, timeout=budget)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just as the caller was cancelled
+                self.release()
+            else:
+                future.cancel()
+                self._waiting[priority] -= 1
+            raise
+
+        waited = time.perf_counter() - start
+        metrics.observe(f"ollama.queue_wait.{name}", waited)
+        if not future.done():
+            future.cancel()
+            self._waiting[priority] -= 1
+            metrics.increment(f"ollama.queue_shed.{name}")
+            raise QueueBudgetExceeded(f"Waited {waited:.1f}s for an Ollama slot ({name} budget {budget}s)")
+
+    def release(self):
+        self.in_flight -= 1
+        self._grant_next()
+
+    @asynccontextmanager
+    async def slot(self, priority: int, budget: Optional[float] = None):
+        await self.acquire(priority, budget)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": {PRIORITY_NAMES[p]: count for p, count in self._waiting.items()},
+            "queue_budget_seconds": {PRIORITY_NAMES[p]: budget for p, budget in self.budgets.items()},
+        }
+
+
+def _budget_from_env(name: str, default: str) -> Optional[float]:
+    value = float(os.getenv(name, default))
+    return value if value > 0 else None
+
+
+_scheduler: Optional[OllamaScheduler] = None
+
+
+def get_ollama_scheduler() -> OllamaScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = OllamaScheduler(
+            max_in_flight=int(os.getenv("OLLAMA_MAX_IN_FLIGHT", "2")),
+            budgets={
+                PRIORITY_ROUTING: _budget_from_env("OLLAMA_QUEUE_BUDGET_ROUTING", "2"),
+                PRIORITY_ANSWER: _budget_from_env("OLLAMA_QUEUE_BUDGET_ANSWER", "5"),
+                PRIORITY_BACKGROUND: _budget_from_env("OLLAMA_QUEUE_BUDGET_BACKGROUND", "10"),
+            }
+        )
+        logger.info(f"Ollama scheduler: max {_scheduler.max_in_flight} in flight, budgets {_scheduler.budgets}")
+    return _scheduler
@@ -2,21 +2,27 @@ from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 from .schemas import (
     ChatRequest, ChatResponse, PDFUploadResponse, 
     DocumentSearchRequest, DocumentSearchResponse, CollectionStatsResponse,
     DocumentListResponse
 )
-from .utils.translator import is_vietnamese, translate_vi_to_en, get_translation_info
+from .utils.translator import is_vietnamese, translate_vi_to_en, get_translation_info, get_translation_service
 from .llm.ollama_client import warmup_model, health_check_ollama
 from .services.rag_service import get_rag_service
 from .services.embedding_service import get_embedding_service
 from .clients.milvus_client import get_milvus_client
-from .utils.pdf_extractor import get_pdf_extractor
-from .llm.llm_service import generate_with_fallback
+from .utils.pdf_extractor import get_pdf_extractor, build_chunk_metadata, shutdown_process_pool
+from .llm.llm_service import generate_with_fallback, hedge_deadline
+from .llm.metrics import get_llm_stats
+from .llm.circuit_breaker import get_breaker_states
+from .llm.scheduler import get_ollama_scheduler
+from .llm.prompts import ASSISTANT_SYSTEM_PROMPT, PLATFORM_SYSTEM_PROMPT
 from .services.router_service import get_router_service
 from .services.database_rag_service import get_database_rag_service
+from .services.catalog_service import get_catalog_service
 import asyncio
 import logging
 import os
@@ -53,6 +59,8 @@ app.add_middleware(
     max_age=3600,
 )
 
+CROSS_LINGUAL_RETRIEVAL = os.getenv("CROSS_LINGUAL_RETRIEVAL", "false").lower() == "true"
+
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
@@ -61,6 +69,10 @@ async def startup_event():
     logger.info("Starting IELTS Assistant API...")
     asyncio.create_task(warmup_model())
     
+    # Load the translation model in the background so startup is not blocked
+    if os.getenv("TRANSLATOR_PRELOAD", "true").lower() == "true":
+        asyncio.create_task(get_translation_service().load_async())
+    
     try:
         embedding_service = get_embedding_service()
         embedding_service.load_model()
@@ -89,6 +101,18 @@ async def startup_event():
         logger.info("Database RAG service initialized")
     except Exception as e:
         logger.warning(f"Failed to initialize database RAG service: {e}. Database RAG features may not work.")
+    
+    # Keep the course/blog vector index in sync with the database views
+    try:
+        catalog_service = get_catalog_service()
+        sync_interval = float(os.getenv("CATALOG_SYNC_INTERVAL", "900"))
+        if sync_interval > 0:
+            asyncio.create_task(catalog_service.run_periodic_sync(sync_interval))
+        else:
+            asyncio.create_task(catalog_service.sync())
+        logger.info("Catalog sync scheduled")
+    except Exception as e:
+        logger.warning(f"Failed to initialize catalog sync: {e}. Catalog semantic search will fall back to keyword search.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -99,6 +123,8 @@ async def shutdown_event():
     except Exception as e:
         logger.warning(f"Error closing database RAG service: {e}")
 
+    shutdown_process_pool()
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(req: ChatRequest):
     try:
@@ -107,13 +133,29 @@ async def chat_endpoint(req: ChatRequest):
             raise HTTPException(status_code=400, detail="Message cannot be empty")
         
         translated_text = original_text
+        retrieval_text = original_text
+        translation_task = None
         sources = None
         
-        # Translate if Vietnamese
+        # Translate if Vietnamese. In cross-lingual mode routing and retrieval use the
+        # original text (bge-m3 is multilingual) while translation runs in parallel;
+        # the English text is only awaited right before answer generation.
         if is_vietnamese(original_text):
             logger.info(f"Detected Vietnamese input: {original_text[:50]}...")
-            translated_text = await translate_vi_to_en(original_text)
-            logger.info(f"Translated to English: {translated_text[:50]}...")
+            if CROSS_LINGUAL_RETRIEVAL:
+                translation_task = asyncio.create_task(translate_vi_to_en(original_text))
+            else:
+                translated_text = await translate_vi_to_en(original_text)
+                retrieval_text = translated_text
+                logger.info(f"Translated to English: {translated_text[:50]}...")
+        
+        async def english_query() -> str:
+            nonlocal translated_text, translation_task
+            if translation_task is not None:
+                translated_text = await translation_task
+                translation_task = None
+                logger.info(f"Translated to English: {translated_text[:50]}...")
+            return translated_text
 
         # Prepare conversation context for router
         conversation_context = ""
@@ -124,7 +166,7 @@ async def chat_endpoint(req: ChatRequest):
 
         # Use LangChain router to determine the best route
         router = get_router_service()
-        routing_decision = await router.route_query(translated_text, conversation_context)
+        routing_decision = await router.route_query(retrieval_text, conversation_context)
         
         logger.info(
             f"Router decision: {routing_decision.route} "
@@ -132,11 +174,12 @@ async def chat_endpoint(req: ChatRequest):
             f"router_failed: {routing_decision.router_failed}, "
             f"reasoning: {routing_decision.reasoning})"
         )
-        logger.info(f"Query: {translated_text[:100]}")
+        logger.info(f"Query: {retrieval_text[:100]}")
 
         # If router failed due to serious Ollama error, skip routing and use Gemini directly
         if routing_decision.router_failed:
             logger.warning("Router failed due to Ollama error. Skipping routing and using Gemini directly.")
+            await english_query()
             from .llm.gemini_fallback import query_gemini
             if req.conversation_history:
                 from .services.conversation_service import get_conversation_service
@@ -146,15 +189,9 @@ async def chat_endpoint(req: ChatRequest):
                     conversation_history=summarized_history,
                     current_query=translated_text
                 )
-                response = await query_gemini(
-                    f"You are an IELTS assistant. Continue the conversation:\n\n{prompt}"
-                )
+                response = await query_gemini(prompt, system=ASSISTANT_SYSTEM_PROMPT)
             else:
-                response = await query_gemini(
-                    "You are an IELTS preparation assistant. Help students with reading, writing, "
-                    "listening, and speaking skills. Answer the following question clearly and "
-                    f"provide helpful guidance:\n\n{translated_text}"
-                )
+                response = await query_gemini(translated_text, system=ASSISTANT_SYSTEM_PROMPT)
             return ChatResponse(response=response, sources=None)
 
         # Route to appropriate handler
@@ -168,7 +205,7 @@ async def chat_endpoint(req: ChatRequest):
             db_context = None
             try:
                 db_results = await db_rag_service.intelligent_query(
-                    translated_text,
+                    retrieval_text,
                     conversation_history=req.conversation_history
                 )
                 db_context = db_results.get('formatted_context', '')
@@ -177,6 +214,8 @@ async def chat_endpoint(req: ChatRequest):
             except Exception as e:
                 logger.warning(f"Database query failed, will try without context: {e}")
             
+            await english_query()
+            
             # Try to generate answer with database context (pass pre-queried results to avoid duplicate query)
             try:
                 response = await db_rag_service.generate_answer(
@@ -208,19 +247,7 @@ async def chat_endpoint(req: ChatRequest):
                 prompt_parts.append(f"User question: {translated_text}")
                 prompt = "\n---\n".join(prompt_parts)
                 
-                enhanced_prompt = f"""You are an IELTS learning platform assistant. Use the database information provided to answer the user's question accurately and helpfully.
-
-{prompt}
-
-Instructions:
-- Use the database information above to provide accurate answers about courses, combos, coupons, blogs, and mock tests
-- If database information is available, provide details from it
-- If the information is not available in the database, explain that you're checking the platform's offerings and provide general guidance
-- Format your response in a clear and helpful manner
-- Include relevant details like prices, descriptions, and availability when appropriate
-- If asked about specific items, provide details from the database"""
-                
-                response = await query_gemini(enhanced_prompt)
+                response = await query_gemini(prompt, system=PLATFORM_SYSTEM_PROMPT)
                 sources = None
         
         elif router.should_use_vector_db(routing_decision) and req.use_rag:
@@ -232,7 +259,7 @@ Instructions:
             retrieved_docs = []
             rag_context = None
             try:
-                retrieved_docs = rag_service.retrieve_context(translated_text)
+                retrieved_docs = await asyncio.to_thread(rag_service.retrieve_context, retrieval_text)
                 sources = retrieved_docs if retrieved_docs else None
                 if retrieved_docs:
                     rag_context = await rag_service.format_and_summarize_context(retrieved_docs)
@@ -241,12 +268,15 @@ Instructions:
                 logger.warning(f"Vector DB context retrieval failed: {e}")
                 sources = None
             
-            # Generate answer with RAG and conversation history
+            await english_query()
+            
+            # Generate answer with RAG and conversation history (reuse the documents retrieved above)
             try:
                 response = await rag_service.generate_answer(
                     translated_text,
                     use_rag=True,
-                    conversation_history=req.conversation_history
+                    conversation_history=req.conversation_history,
+                    retrieved_docs=retrieved_docs
                 )
             except Exception as e:
                 logger.warning(f"Vector DB RAG generation failed, falling back to Gemini with context: {e}")
@@ -268,29 +298,12 @@ Instructions:
                 prompt_parts.append(f"User question: {translated_text}")
                 prompt = "\n---\n".join(prompt_parts)
                 
-                instructions = []
-                if req.conversation_history:
-                    instructions.append("- Pay attention to the conversation history above. If the user refers to \"that topic\", \"the topic above\", \"đề đó\", \"cái đó\", or similar references, they are referring to topics/questions mentioned in the previous conversation.")
-                    instructions.append("- Continue the conversation naturally and maintain context from previous messages.")
-                if rag_context:
-                    instructions.append("- Use the relevant study materials provided above to answer accurately.")
-                    instructions.append("- If using information from study materials, cite the source (e.g., Document X).")
-                instructions.append("- Provide a comprehensive and helpful answer.")
-                
-                instructions_text = "\n".join(instructions) if instructions else ""
-                
-                enhanced_prompt = f"""You are an IELTS preparation assistant. Use the following information to answer the question accurately and helpfully.
-
-{prompt}
-
-Instructions:
-{instructions_text}"""
-                
-                response = await query_gemini(enhanced_prompt)
+                response = await query_gemini(prompt, system=ASSISTANT_SYSTEM_PROMPT)
         
         else:
             # Base model: Direct generation for general questions (with Gemini fallback)
             logger.info("Using base model for query")
+            await english_query()
             if req.conversation_history:
                 from .services.conversation_service import get_conversation_service
                 conv_service = get_conversation_service()
@@ -299,15 +312,9 @@ Instructions:
                     conversation_history=summarized_history,
                     current_query=translated_text
                 )
-                response = await generate_with_fallback(
-                    f"You are an IELTS assistant. Continue the conversation:\n\n{prompt}"
-                )
+                response = await generate_with_fallback(prompt, system=ASSISTANT_SYSTEM_PROMPT)
             else:
-                response = await generate_with_fallback(
-                    "You are an IELTS preparation assistant. Help students with reading, writing, "
-                    "listening, and speaking skills. Answer the following question clearly and "
-                    f"provide helpful guidance:\n\n{translated_text}"
-                )
+                response = await generate_with_fallback(translated_text, system=ASSISTANT_SYSTEM_PROMPT)
         
         return ChatResponse(response=response, sources=sources)
         
@@ -327,19 +334,28 @@ async def health_check():
             "status": "ok",
             "ollama_connected": ollama_status,
             "translation_available": translation_info["available"],
+            "llm_circuits": get_breaker_states(),
             "version": "1.0.0"
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=500, detail="Health check failed")
 
+@app.get("/llm/stats")
+async def llm_stats():
+    """Per-provider latency histograms, hedging counters and Ollama queue depth"""
+    stats = get_llm_stats()
+    stats["hedge_deadline_seconds"] = hedge_deadline()
+    stats["ollama_scheduler"] = get_ollama_scheduler().snapshot()
+    return stats
+
 @app.post("/rag/upload-pdf", response_model=PDFUploadResponse)
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(file: UploadFile = File(...), chunking_mode: Optional[str] = None):
     """
     Upload and process a PDF file for RAG
     
     - Extract text from PDF
-    - Chunk the text
+    - Chunk the text ("structured" mode splits on passage/section/question headings)
     - Generate embeddings
     - Store in Milvus vector database
     """
@@ -370,7 +386,11 @@ async def upload_pdf(file: UploadFile = File(...)):
         
         # Extract and chunk PDF (uses env vars or defaults)
         pdf_extractor = get_pdf_extractor()
-        chunks = pdf_extractor.extract_and_chunk_pdf(str(file_path), file.filename)
+        if chunking_mode and chunking_mode not in ("sentence", "structured"):
+            raise HTTPException(status_code=400, detail="chunking_mode must be 'sentence' or 'structured'")
+        chunks = await asyncio.to_thread(
+            pdf_extractor.extract_and_chunk_pdf, str(file_path), file.filename, chunking_mode
+        )
         
         if not chunks:
             raise HTTPException(status_code=400, detail="No text could be extracted from PDF")
@@ -414,14 +434,7 @@ async def upload_pdf(file: UploadFile = File(...)):
         logger.info(f"Generated {len(embeddings)} embeddings, inserting into Milvus...")
         
         # Prepare metadata for valid chunks only
-        metadata_list = [
-            {
-                "chunk_index": chunk["chunk_index"],
-                "start_char": chunk.get("start_char", 0),
-                "end_char": chunk.get("end_char", 0)
-            }
-            for chunk in valid_chunks
-        ]
+        metadata_list = [build_chunk_metadata(chunk) for chunk in valid_chunks]
         
         # Store in Milvus
         milvus_client = get_milvus_client(
@@ -523,6 +536,15 @@ async def delete_documents(source_file: str):
         logger.error(f"Error deleting documents: {e}")
         raise HTTPException(status_code=500, detail=f"Error deleting documents: {str(e)}")
 
+@app.post("/rag/catalog/sync")
+async def sync_catalog():
+    try:
+        summary = await get_catalog_service().sync()
+        return {"message": "Catalog sync completed", "summary": summary}
+    except Exception as e:
+        logger.error(f"Error syncing catalog: {e}")
+        raise HTTPException(status_code=500, detail=f"Error syncing catalog: {str(e)}")
+
 @app.get("/")
 async def root():
     return {
@@ -536,6 +558,7 @@ async def root():
             "rag_stats": "/rag/stats",
             "rag_list_documents": "/rag/documents",
             "rag_delete_documents": "/rag/documents/{source_file}",
+            "rag_catalog_sync": "/rag/catalog/sync",
             "health": "/health", 
             "docs": "/docs"
         },
@@ -543,6 +566,7 @@ async def root():
             "langchain_router": "Intelligent query routing (vector_db, database_rag, base_model)",
             "vector_db_rag": "Semantic search in uploaded documents (Milvus)",
             "database_rag": "Query combo courses, coupons, blogs from PostgreSQL",
+            "catalog_semantic_search": "Vector search over course and blog content combined with SQL filters",
             "base_model": "General IELTS conversation and advice"
         },
         "milvus_ui": {
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+from .embedding_service import get_embedding_service
+from ..clients.catalog_milvus_client import get_catalog_milvus_client
+
+logger = logging.getLogger(__name__)
+
+# Source view and the columns used to build the embedded text for each kind
+CATALOG_SOURCES = {
+    "course": {
+        "view": "rag_courses",
+        "columns": "id, title, description, skill_focus, difficulty_level, "
+                   "price, discount_price, tags, category_name, updated_at",
+    },
+    "blog": {
+        "view": "rag_blogs",
+        "columns": "id, title, content, tags, category_name, updated_at",
+    },
+}
+
+def _to_epoch_ms(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+def _join_tags(tags) -> str:
+    if not tags:
+        return ""
+    if isinstance(tags, (list, tuple)):
+        return ", ".join(str(t) for t in tags)
+    return str(tags)
+
+class CatalogService:
+    """
+    Keeps a vector index of rag_courses / rag_blogs in Milvus and answers
+    semantic lookups that are combined with structured SQL filters.
+    """
+
+    def __init__(
+        self,
+        max_text_chars: int = 2000,
+        score_threshold: float = 0.4,
+        query_cache_size: int = 128
+    ):
+        self.max_text_chars = max_text_chars
+        self.score_threshold = score_threshold
+        self.embedding_service = get_embedding_service()
+        self.client = get_catalog_milvus_client(
+            embedding_dimension=self.embedding_service.get_embedding_dimension()
+        )
+        self._sync_lock = asyncio.Lock()
+        self._query_cache: Dict[str, List[float]] = {}
+        self._query_cache_size = query_cache_size
+
+    def build_text(self, kind: str, row: Dict) -> str:
+        if kind == "course":
+            parts = [
+                row.get("title") or "",
+                row.get("description") or "",
+                f"Skill: {row.get('skill_focus') or 'general'}",
+                f"Level: {row.get('difficulty_level') or 'all'}",
+                f"Category: {row.get('category_name') or ''}",
+                f"Tags: {_join_tags(row.get('tags'))}",
+            ]
+        else:
+            parts = [
+                row.get("title") or "",
+                f"Category: {row.get('category_name') or ''}",
+                f"Tags: {_join_tags(row.get('tags'))}",
+                row.get("content") or "",
+            ]
+        return "\n".join(p for p in parts if p.strip())[:self.max_text_chars]
+
+    def _to_index_row(self, kind: str, row: Dict) -> Dict:
+        ref_id = str(row["id"])
+        price = row.get("discount_price")
+        if price is None:
+            price = row.get("price")
+        return {
+            "id": f"{kind}:{ref_id}",
+            "kind": kind,
+            "ref_id": ref_id,
+            "text": self.build_text(kind, row),
+            "skill_focus": row.get("skill_focus") or "",
+            "difficulty_level": row.get("difficulty_level") or "",
+            "price": float(price or 0.0),
+            "updated_at": _to_epoch_ms(row.get("updated_at")),
+        }
+
+    async def _sync_kind(self, pool, kind: str) -> Dict[str, int]:
+        source = CATALOG_SOURCES[kind]
+
+        indexed = await asyncio.to_thread(self.client.get_sync_state, kind)
+
+        async with pool.acquire() as conn:
+            current = await conn.fetch(f"SELECT id, updated_at FROM {source['view']}")
+
+        current_state = {f"{kind}:{row['id']}": _to_epoch_ms(row["updated_at"]) for row in current}
+
+        # Only rows that are new or whose updated_at moved need re-embedding
+        changed_ids = [
+            key.split(":", 1)[1]
+            for key, updated_at in current_state.items()
+            if indexed.get(key) != updated_at
+        ]
+        removed_ids = [key for key in indexed if key not in current_state]
+
+        if changed_ids:
+            async with pool.acquire() as conn:
+                rows = await conn.fetch(
+                    f"SELECT {source['columns']} FROM {source['view']} WHERE id = ANY($1::uuid[])",
+                    changed_ids
+                )
+
+            index_rows = [self._to_index_row(kind, dict(row)) for row in rows]
+            batch_size = self.embedding_service.batch_size
+            for i in range(0, len(index_rows), batch_size):
+                batch = index_rows[i:i + batch_size]
+                embeddings = await asyncio.to_thread(
+                    self.embedding_service.encode,
+                    [r["text"] for r in batch]
+                )
+                await asyncio.to_thread(self.client.upsert_rows, batch, embeddings)
+
+        if removed_ids:
+            await asyncio.to_thread(self.client.delete_ids, removed_ids)
+
+        return {"upserted": len(changed_ids), "deleted": len(removed_ids), "total": len(current_state)}
+
+    async def sync(self) -> Dict[str, Dict[str, int]]:
+        """Bring the catalog collection up to date with the database views"""
+        from .database_rag_service import get_database_rag_service
+
+        async with self._sync_lock:
+            try:
+                pool = await get_database_rag_service()._get_pool()
+            except Exception as e:
+                logger.error(f"Catalog sync could not connect to the database: {e}")
+                return {kind: {"error": str(e)} for kind in CATALOG_SOURCES}
+            summary = {}
+            for kind in CATALOG_SOURCES:
+                try:
+                    summary[kind] = await self._sync_kind(pool, kind)
+                except Exception as e:
+                    hint = ""
+                    if "updated_at" in str(e):
+                        hint = " (apply init/migrations/20261019_rag_views_updated_at.sql to existing databases)"
+                    logger.error(f"Catalog sync failed for {kind}: {e}{hint}")
+                    summary[kind] = {"error": str(e)}
+            logger.info(f"Catalog sync finished: {summary}")
+            return summary
+
+    async def run_periodic_sync(self, interval_seconds: float):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                # Keep the task alive through outages; the next round retries
+                logger.error(f"Periodic catalog sync failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    async def _embed_query(self, query: str) -> List[float]:
+        cached = self._query_cache.get(query)
+        if cached is not None:
+            return cached
+
+        embedding = await asyncio.to_thread(self.embedding_service.encode_single, query)
+
+        if len(self._query_cache) >= self._query_cache_size:
+            self._query_cache.pop(next(iter(self._query_cache)))
+        self._query_cache[query] = embedding
+        return embedding
+
+    async def search(
+        self,
+        kind: str,
+        query: str,
+        top_k: int = 5,
+        skill_focus: Optional[str] = None,
+        difficulty_level: Optional[str] = None,
+        max_price: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Semantic lookup of catalog rows
+
+        Returns:
+            List of {"ref_id", "score"} ordered by relevance
+        """
+        query_embedding = await self._embed_query(query)
+        return await asyncio.to_thread(
+            self.client.search,
+            query_embedding,
+            kind,
+            top_k,
+            self.score_threshold,
+            skill_focus,
+            difficulty_level,
+            max_price
+        )
+
+_catalog_service: Optional[CatalogService] = None
+
+def get_catalog_service() -> CatalogService:
+    global _catalog_service
+    if _catalog_service is None:
+        _catalog_service = CatalogService(
+            score_threshold=float(os.getenv("CATALOG_SCORE_THRESHOLD", "0.4"))
+        )
+    return _catalog_service
@@ -2,6 +2,7 @@ import logging
 import os
 from typing import List, Dict, Optional, Tuple
 from ..llm.llm_service import generate_with_fallback
+from ..llm.prompts import SUMMARIZE_SYSTEM_PROMPTS
 
 logger = logging.getLogger(__name__)
 
@@ -21,26 +22,8 @@ class ConversationService:
     
     async def summarize_text(self, text: str, purpose: str = "conversation") -> str:
         try:
-            if purpose == "conversation":
-                prompt = f"""Summarize the following IELTS conversation history, preserving key information, questions asked, and important answers given. Keep it concise but informative:
-
-{text}
-
-Summary:"""
-            elif purpose == "context":
-                prompt = f"""Summarize the following IELTS study material excerpts, focusing on the most relevant information for answering questions. Keep key facts, examples, and explanations:
-
-{text}
-
-Summary:"""
-            else:
-                prompt = f"""Summarize the following text concisely:
-
-{text}
-
-Summary:"""
-            
-            summary = await generate_with_fallback(prompt)
+            system = SUMMARIZE_SYSTEM_PROMPTS.get(purpose, SUMMARIZE_SYSTEM_PROMPTS["default"])
+            summary = await generate_with_fallback(text, profile="summarize", system=system)
             logger.info(f"Summarized {len(text)} chars to {len(summary)} chars ({purpose})")
             return summary.strip()
         except Exception as e:
@@ -1,9 +1,12 @@
 import logging
 import os
+import re
 import asyncpg
 from typing import List, Dict, Optional
 from ..llm.llm_service import generate_with_fallback
+from ..llm.prompts import PLATFORM_SYSTEM_PROMPT
 from .conversation_service import get_conversation_service
+from .catalog_service import get_catalog_service
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,7 @@ class DatabaseRAGService:
         self.db_user = os.getenv("RAG_DB_USER", "rag_reader")
         self.db_password = os.getenv("RAG_DB_PASSWORD", "rag_password")
         self.conversation_service = get_conversation_service()
+        self.semantic_search_enabled = os.getenv("CATALOG_SEMANTIC_SEARCH", "true").lower() == "true"
         self._pool: Optional[asyncpg.Pool] = None
     
     async def _get_pool(self) -> asyncpg.Pool:
@@ -35,14 +39,76 @@ class DatabaseRAGService:
             await self._pool.close()
             self._pool = None
     
+    async def _semantic_rows(
+        self,
+        kind: str,
+        view: str,
+        search_term: str,
+        limit: int,
+        skill_focus: Optional[str] = None,
+        difficulty_level: Optional[str] = None,
+        max_price: Optional[float] = None
+    ) -> Optional[List[Dict]]:
+        """
+        Rank rows of a catalog view by vector similarity to search_term.
+        Returns None when the catalog index is unavailable so callers fall back to ILIKE
+        (an empty result also falls back, which covers a catalog that has not synced yet).
+        """
+        if not self.semantic_search_enabled:
+            return None
+
+        try:
+            hits = await get_catalog_service().search(
+                kind,
+                search_term,
+                top_k=limit,
+                skill_focus=skill_focus,
+                difficulty_level=difficulty_level,
+                max_price=max_price
+            )
+        except Exception as e:
+            logger.warning(f"Catalog vector search failed for {kind}, falling back to keyword search: {e}")
+            return None
+
+        if not hits:
+            return []
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"SELECT * FROM {view} WHERE id = ANY($1::uuid[])",
+                [hit["ref_id"] for hit in hits]
+            )
+
+        # Keep the ANN ranking; rows deleted since the last sync are dropped here
+        rows_by_id = {str(row["id"]): dict(row) for row in rows}
+        ranked = []
+        for hit in hits:
+            row = rows_by_id.get(hit["ref_id"])
+            if row is not None:
+                row["relevance_score"] = hit["score"]
+                ranked.append(row)
+        return ranked
+
     async def query_courses(
         self, 
         search_term: Optional[str] = None,
         skill_focus: Optional[str] = None,
         difficulty_level: Optional[str] = None,
+        max_price: Optional[float] = None,
         limit: int = 10
     ) -> List[Dict]:
         try:
+            if search_term:
+                ranked = await self._semantic_rows(
+                    "course", "rag_courses", search_term, limit,
+                    skill_focus=skill_focus,
+                    difficulty_level=difficulty_level,
+                    max_price=max_price
+                )
+                if ranked:
+                    return ranked
+            
             pool = await self._get_pool()
             conditions = []
             params = []
@@ -65,6 +131,11 @@ class DatabaseRAGService:
                 params.append(difficulty_level)
                 param_idx += 1
             
+            if max_price is not None:
+                conditions.append(f"COALESCE(discount_price, price) <= ${param_idx}")
+                params.append(max_price)
+                param_idx += 1
+            
             where_clause = " AND ".join(conditions) if conditions else "1=1"
             query = f"""
                 SELECT * FROM rag_courses
@@ -131,6 +202,11 @@ class DatabaseRAGService:
         limit: int = 10
     ) -> List[Dict]:
         try:
+            if search_term and not category:
+                ranked = await self._semantic_rows("blog", "rag_blogs", search_term, limit)
+                if ranked:
+                    return ranked
+            
             pool = await self._get_pool()
             conditions = []
             params = []
@@ -273,6 +349,12 @@ class DatabaseRAGService:
                     difficulty = diff
                     break
             
+            # Extract price ceiling ("under $50", "below 100", "dưới 500")
+            max_price = None
+            price_match = re.search(r"(?:under|below|less than|cheaper than|dưới)\s*\$?\s*(\d+(?:\.\d+)?)", query_lower)
+            if price_match:
+                max_price = float(price_match.group(1))
+            
             # For general queries, increase limit to show more courses
             limit = 10 if is_general_query else 5
             
@@ -280,6 +362,7 @@ class DatabaseRAGService:
                 search_term=search_term,
                 skill_focus=skill_focus,
                 difficulty_level=difficulty,
+                max_price=max_price,
                 limit=limit
             )
             logger.info(f"Database RAG query_courses returned {len(courses)} courses for query: {query} (is_general_query: {is_general_query})")
@@ -419,20 +502,8 @@ class DatabaseRAGService:
         
         prompt = "\n---\n".join(prompt_parts)
         
-        enhanced_prompt = f"""You are an IELTS learning platform assistant. Use the database information provided to answer the user's question accurately and helpfully.
-
-{prompt}
-
-Instructions:
-- Use the database information above to provide accurate answers about courses, combos, coupons, blogs, and mock tests
-- If database information is available, provide details from it
-- If the information is not available in the database, explain that you're checking the platform's offerings and provide general guidance
-- Format your response in a clear and helpful manner
-- Include relevant details like prices, descriptions, and availability when appropriate
-- If asked about specific items, provide details from the database"""
-        
-        logger.debug(f"Database RAG enhanced prompt length: {len(enhanced_prompt)}")
-        answer = await generate_with_fallback(enhanced_prompt)
+        logger.debug(f"Database RAG prompt length: {len(prompt)}")
+        answer = await generate_with_fallback(prompt, system=PLATFORM_SYSTEM_PROMPT)
         logger.info(f"Database RAG generated answer length: {len(answer)}")
         return answer
 
@@ -1,8 +1,10 @@
+import json
 import logging
 from typing import List, Dict, Optional
 from .embedding_service import get_embedding_service
 from ..clients.milvus_client import get_milvus_client
 from ..llm.llm_service import generate_with_fallback
+from ..llm.prompts import ASSISTANT_SYSTEM_PROMPT
 from .conversation_service import get_conversation_service
 
 logger = logging.getLogger(__name__)
@@ -67,6 +69,22 @@ class RAGService:
         # Shouldn't reach here, but return empty as fallback
         return []
     
+    def _format_location(self, metadata) -> str:
+        """Section and page label for chunks created in structured chunking mode"""
+        if not metadata:
+            return ""
+        try:
+            data = json.loads(metadata) if isinstance(metadata, str) else metadata
+        except ValueError:
+            return ""
+        parts = []
+        if data.get("section"):
+            parts.append(data["section"])
+        if data.get("page_start"):
+            page_end = data.get("page_end") or data["page_start"]
+            parts.append(f"p. {data['page_start']}" if page_end == data["page_start"] else f"pp. {data['page_start']}-{page_end}")
+        return ", ".join(parts)
+    
     def format_context(self, retrieved_docs: List[Dict]) -> str:
         if not retrieved_docs:
             return ""
@@ -77,7 +95,9 @@ class RAGService:
             text = doc.get("text", "").strip()
             # Only include if text is not empty
             if text:
-                context_parts.append(f"Document {i}:\n{text}")
+                location = self._format_location(doc.get("metadata"))
+                header = f"Document {i} ({location})" if location else f"Document {i}"
+                context_parts.append(f"{header}:\n{text}")
         
         return "\n\n".join(context_parts)
     
@@ -94,7 +114,8 @@ class RAGService:
         self,
         query: str,
         use_rag: bool = True,
-        conversation_history: Optional[List[Dict[str, str]]] = None
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        retrieved_docs: Optional[List[Dict]] = None
     ) -> str:
         # Summarize conversation history if provided
         summarized_history = None
@@ -104,28 +125,16 @@ class RAGService:
             )
         
         if not use_rag:
-            if summarized_history:
-                prompt = self.conversation_service.format_conversation_for_prompt(
-                    conversation_history=summarized_history,
-                    current_query=query
-                )
-                enhanced_prompt = f"""You are an IELTS preparation assistant. Continue the conversation naturally.
-
-{prompt}
-
-Instructions:
-- Pay attention to the conversation history. If the user refers to "that topic", "the topic above", "đề đó", or similar references, they are referring to topics/questions mentioned in the previous conversation.
-- Provide a helpful and accurate response based on the context."""
-            else:
-                # Add proper system prompt when no history
-                enhanced_prompt = f"""You are an IELTS preparation assistant. Help students with reading, writing, listening, and speaking skills. Answer the following question clearly and provide helpful guidance:
-
-{query}"""
-            return await generate_with_fallback(enhanced_prompt)
+            return await generate_with_fallback(
+                self._build_user_message(query, summarized_history),
+                system=ASSISTANT_SYSTEM_PROMPT
+            )
         
         try:
-            # Retrieve relevant context
-            retrieved_docs = self.retrieve_context(query)
+            # Retrieve relevant context (callers may pass documents they already retrieved,
+            # e.g. with the original-language query in cross-lingual mode)
+            if retrieved_docs is None:
+                retrieved_docs = self.retrieve_context(query)
             
             # Filter to only use highly relevant documents
             relevant_docs = self.filter_relevant_docs(retrieved_docs)
@@ -136,73 +145,43 @@ Instructions:
             if not use_rag_context:
                 # No relevant documents found, use base model instead
                 logger.info(f"No highly relevant documents found (max score: {max((d.get('score', 0.0) for d in retrieved_docs), default=0.0):.2f}), using base model")
-                # Fall through to base model generation below
-                if summarized_history:
-                    prompt = self.conversation_service.format_conversation_for_prompt(
-                        conversation_history=summarized_history,
-                        current_query=query
-                    )
-                    enhanced_prompt = f"""You are an IELTS preparation assistant. Continue the conversation naturally.
-
-{prompt}
-
-Instructions:
-- Pay attention to the conversation history. If the user refers to "that topic", "the topic above", "đề đó", or similar references, they are referring to topics/questions mentioned in the previous conversation.
-- Provide a helpful and accurate response based on the context."""
-                else:
-                    enhanced_prompt = f"""You are an IELTS preparation assistant. Help students with reading, writing, listening, and speaking skills. Answer the following question clearly and provide helpful guidance:
-
-{query}"""
-                return await generate_with_fallback(enhanced_prompt)
+                return await generate_with_fallback(
+                    self._build_user_message(query, summarized_history),
+                    system=ASSISTANT_SYSTEM_PROMPT
+                )
             
             # Format and optionally summarize context from relevant documents only
-            context = ""
-            if relevant_docs:
-                context = await self.format_and_summarize_context(relevant_docs)
-                scores_str = ", ".join([f"{d.get('score', 0.0):.2f}" for d in relevant_docs])
-                logger.info(f"Using {len(relevant_docs)} relevant documents (scores: {scores_str})")
-            
-            # Build prompt with clear structure
-            prompt_parts = []
-            
-            # Add RAG context if we have it
-            if context:
-                prompt_parts.append(f"Study materials:\n{context}")
-            
-            # Add conversation history if available
-            if summarized_history:
-                prompt_parts.append(f"Previous conversation:\n{summarized_history}")
-            
-            # Add current query
-            prompt_parts.append(f"Question: {query}")
-            
-            prompt_text = "\n\n".join(prompt_parts)
-            
-            # Build prompt - use RAG context if available, otherwise base model style
-            if context:
-                system_message = "You are an IELTS preparation assistant. Answer questions clearly and helpfully using the provided study materials."
-                enhanced_prompt = f"""{system_message}
-
-{prompt_text}
-
-Answer the question using information from the study materials. Provide a clear, helpful response."""
-            else:
-                # Shouldn't reach here if logic is correct, but handle it
-                system_message = "You are an IELTS preparation assistant. Help students with reading, writing, listening, and speaking skills."
-                enhanced_prompt = f"""{system_message}
-
-{prompt_text}
-
-Provide a clear, helpful answer to the question."""
+            context = await self.format_and_summarize_context(relevant_docs)
+            scores_str = ", ".join([f"{d.get('score', 0.0):.2f}" for d in relevant_docs])
+            logger.info(f"Using {len(relevant_docs)} relevant documents (scores: {scores_str})")
             
             # Generate answer
-            answer = await generate_with_fallback(enhanced_prompt)
+            answer = await generate_with_fallback(
+                self._build_user_message(query, summarized_history, context),
+                system=ASSISTANT_SYSTEM_PROMPT
+            )
             
             return answer
         except Exception as e:
             logger.error(f"Error in RAG generation: {e}")
             # Fallback to direct generation with proper prompt
-            return await generate_with_fallback(f"You are an IELTS preparation assistant. Help students with reading, writing, listening, and speaking skills. Answer the following question clearly and provide helpful guidance:\n\n{query}")
+            return await generate_with_fallback(query, system=ASSISTANT_SYSTEM_PROMPT)
+    
+    def _build_user_message(
+        self,
+        query: str,
+        summarized_history: Optional[str] = None,
+        context: Optional[str] = None
+    ) -> str:
+        # Instructions live in the static system prompt; this message only carries
+        # per-request data, oldest-changing first (history grows turn by turn)
+        parts = []
+        if summarized_history:
+            parts.append(f"Previous conversation:\n{summarized_history}")
+        if context:
+            parts.append(f"Study materials:\n{context}")
+        parts.append(f"Question: {query}")
+        return "\n\n".join(parts)
 
 _rag_service: Optional[RAGService] = None
 
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 from typing import Literal, Dict, Any
@@ -6,6 +7,12 @@ from langchain_ollama import ChatOllama
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
+from ..llm.circuit_breaker import get_ollama_breaker, CircuitOpenError
+from ..llm.scheduler import get_ollama_scheduler, QueueBudgetExceeded
+from ..llm.profiles import get_profile
+from ..llm.ollama_client import chat_ollama
+from ..llm.gemini_fallback import gemini_available
+
 logger = logging.getLogger(__name__)
 
 class RouterDecision(BaseModel):
@@ -99,81 +106,31 @@ Examples:
 - "What courses are on this platform?" → database_rag
 
 {format_instructions}"""),
-            ("human", "Query: {query}\n\nConversation context: {context}")
+            ("human", "Conversation context: {context}\n\nQuery: {query}")
         ])
     
     async def _invoke_ollama_direct(self, messages: list) -> str:
         """
         Call Ollama API directly to handle thinking field properly.
         This is a workaround for LangChain ChatOllama not handling thinking field correctly.
-        """
-        import httpx
-        
-        ollama_url = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
-        if "/api/generate" in ollama_url:
-            base_url = ollama_url.replace("/api/generate", "")
-        else:
-            base_url = ollama_url.replace("/api", "")
-        
-        from ..llm.ollama_client import MODEL_NAME
-        
-        # Convert LangChain messages to Ollama format
-        # For router, we just need the last human message or combine system + human
-        prompt_parts = []
-        for msg in messages:
-            if hasattr(msg, 'content'):
-                if hasattr(msg, 'type'):
-                    if msg.type == 'system':
-                        prompt_parts.append(f"System: {msg.content}")
-                    elif msg.type == 'human':
-                        prompt_parts.append(f"Human: {msg.content}")
-                else:
-                    prompt_parts.append(msg.content)
         
-        prompt = "\n\n".join(prompt_parts)
+        The system message (routing rules + format instructions) is identical on every
+        call and is sent first, so Ollama reuses its KV cache instead of re-evaluating it.
+        """
+        # Convert LangChain messages to Ollama chat format
+        roles = {"system": "system", "human": "user", "ai": "assistant"}
+        chat_messages = [
+            {"role": roles.get(getattr(msg, "type", ""), "user"), "content": msg.content}
+            for msg in messages
+            if hasattr(msg, "content")
+        ]
         
-        # Call Ollama API directly with full options
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{base_url}/api/generate",
-                json={
-                    "model": MODEL_NAME,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,
-                        "num_predict": 500,  # Ensure enough tokens for JSON response
-                        "num_ctx": 4096,
-                        "top_p": 0.9,
-                        "top_k": 40,
-                        "repeat_penalty": 1.1,
-                    }
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            logger.info(f"Ollama response keys: {list(data.keys())}")
-            logger.debug(f"Ollama eval_count: {data.get('eval_count', 0)}, done_reason: {data.get('done_reason', 'unknown')}")
-            
-            # Extract content: prioritize response field, fallback to thinking field if response is empty
-            content = data.get("response", "")
-            thinking_content = data.get("thinking", "")
-            
-            logger.debug(f"Response field length: {len(content) if content else 0}, Thinking field length: {len(thinking_content) if thinking_content else 0}")
-            
-            # Only use thinking field if response is empty or None
-            if not content or not content.strip():
-                if thinking_content and thinking_content.strip():
-                    logger.info("Response field is empty, using thinking field instead")
-                    content = thinking_content
-                else:
-                    logger.error(f"Both response and thinking fields are empty from Ollama. Eval count: {data.get('eval_count', 0)}, Done reason: {data.get('done_reason', 'unknown')}")
-                    logger.error(f"Full Ollama response (first 500 chars): {str(data)[:500]}")
-                    raise Exception(f"Empty response from Ollama (eval_count: {data.get('eval_count', 0)}, done_reason: {data.get('done_reason', 'unknown')})")
-            
-            logger.debug(f"Router extracted content length: {len(content)}")
-            return content
+        content = await asyncio.wait_for(
+            chat_ollama(chat_messages, profile=get_profile("route")),
+            timeout=60.0
+        )
+        logger.debug(f"Router extracted content length: {len(content)}")
+        return content
     
     async def route_query(
         self, 
@@ -187,9 +144,23 @@ Examples:
                 format_instructions=self.parser.get_format_instructions()
             )
             
+            # Skip the LLM entirely while Ollama's circuit is open, if Gemini can take over
+            breaker = get_ollama_breaker()
+            if gemini_available() and not breaker.allow_request():
+                raise CircuitOpenError("Ollama circuit is open")
+            
             # Use direct Ollama API call to properly handle thinking field
             # This is a workaround for LangChain ChatOllama not handling thinking field correctly
-            content = await self._invoke_ollama_direct(formatted_prompt)
+            scheduler = get_ollama_scheduler()
+            try:
+                priority = get_profile("route").priority
+                # Without Gemini there is nowhere to shed to, so wait for a slot without a limit
+                budget = scheduler.budget_for(priority) if gemini_available() else None
+                async with scheduler.slot(priority, budget):
+                    content = await breaker.call(self._invoke_ollama_direct(formatted_prompt))
+            except (QueueBudgetExceeded, asyncio.CancelledError):
+                breaker.record_cancelled()
+                raise
             
             # Log raw content for debugging
             logger.debug(f"Router raw response from Ollama: {content[:500]}")
@@ -230,7 +201,7 @@ Examples:
             
             # Check if it's a serious Ollama error (500, timeout, connection issues)
             # These indicate Ollama is likely down or unreachable
-            is_serious_error = any(keyword in error_str for keyword in [
+            is_serious_error = isinstance(e, (CircuitOpenError, QueueBudgetExceeded, asyncio.TimeoutError)) or any(keyword in error_str for keyword in [
                 '500', 'timeout', 'connection', 'refused', 'unreachable',
                 'network', 'econnrefused', 'etimedout', 'internal server error'
             ])
@@ -1,24 +1,195 @@
 import os
 import logging
-from typing import List, Dict, Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
 from PyPDF2 import PdfReader
 import re
+from .text_chunker import SentenceChunker, StructuredChunker
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_BACKENDS = ("pypdfium2", "pymupdf", "pypdf2")
+
+def resolve_backend(backend: str = "auto") -> str:
+    """Pick the fastest installed backend, or validate an explicit choice (PyPDF2 is always available)"""
+    backend = (backend or "auto").lower()
+    if backend == "auto":
+        if PDFIUM_AVAILABLE:
+            return "pypdfium2"
+        if PYMUPDF_AVAILABLE:
+            return "pymupdf"
+        return "pypdf2"
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{backend}', expected one of {SUPPORTED_BACKENDS} or 'auto'")
+    if backend == "pypdfium2" and not PDFIUM_AVAILABLE:
+        logger.warning("pypdfium2 is not installed, falling back to PyPDF2")
+        return "pypdf2"
+    if backend == "pymupdf" and not PYMUPDF_AVAILABLE:
+        logger.warning("PyMuPDF is not installed, falling back to PyPDF2")
+        return "pypdf2"
+    return backend
+
+def count_pages(file_path: str, backend: str) -> int:
+    if backend == "pypdfium2":
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    if backend == "pymupdf":
+        with fitz.open(file_path) as doc:
+            return doc.page_count
+    return len(PdfReader(file_path).pages)
+
+def extract_page_range(file_path: str, backend: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extract pages [start, end) with one document handle.
+    Module-level so it can run in a worker process.
+
+    Returns:
+        List of (page_number, text) with 1-based page numbers
+    """
+    pages = []
+
+    if backend == "pypdfium2":
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            for page_num in range(start, end):
+                try:
+                    page = pdf[page_num]
+                    textpage = page.get_textpage()
+                    pages.append((page_num + 1, textpage.get_text_range()))
+                    textpage.close()
+                    page.close()
+                except Exception as e:
+                    logger.warning(f"Error extracting text from page {page_num + 1}: {e}")
+        finally:
+            pdf.close()
+    elif backend == "pymupdf":
+        with fitz.open(file_path) as doc:
+            for page_num in range(start, end):
+                try:
+                    pages.append((page_num + 1, doc.load_page(page_num).get_text("text")))
+                except Exception as e:
+                    logger.warning(f"Error extracting text from page {page_num + 1}: {e}")
+    else:
+        reader = PdfReader(file_path)
+        for page_num in range(start, end):
+            try:
+                pages.append((page_num + 1, reader.pages[page_num].extract_text() or ""))
+            except Exception as e:
+                logger.warning(f"Error extracting text from page {page_num + 1}: {e}")
+
+    return pages
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # Spawn rather than fork: the server process already holds torch, Milvus
+        # clients and event-loop threads that must not be copied into workers
+        _process_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+def shutdown_process_pool():
+    """Stop the page extraction workers (called on app shutdown)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
 class PDFExtractor:
     """Service for extracting and chunking text from PDF files"""
     
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+        backend: str = "auto",
+        max_workers: int = None,
+        pages_per_task: int = 16,
+        chunk_tokens: int = None,
+        chunk_overlap_tokens: int = None,
+        chunking_mode: str = "sentence"
+    ):
         """
         Initialize PDF extractor
         
         Args:
-            chunk_size: Maximum number of characters per chunk
-            chunk_overlap: Number of characters to overlap between chunks
+            chunk_size: Approximate characters per chunk, used when chunk_tokens is not given
+            chunk_overlap: Approximate overlap characters, used when chunk_overlap_tokens is not given
+            backend: Text extraction backend ("auto", "pypdfium2", "pymupdf", "pypdf2")
+            max_workers: Processes used for page-parallel extraction (1 disables the pool)
+            pages_per_task: Number of pages each worker extracts per task
+            chunk_tokens: Maximum embedding-model tokens per chunk
+            chunk_overlap_tokens: Tokens of trailing sentences repeated in the next chunk
+            chunking_mode: "sentence" for plain token-budget chunks, "structured" to split on
+                passage/section/question headings and keep page and section metadata
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunker = SentenceChunker(
+            max_tokens=chunk_tokens or max(1, chunk_size // 4),
+            overlap_tokens=chunk_overlap_tokens if chunk_overlap_tokens is not None else chunk_overlap // 4
+        )
+        self.structured_chunker = StructuredChunker(self.chunker)
+        if chunking_mode not in ("sentence", "structured"):
+            raise ValueError(f"Unknown chunking mode '{chunking_mode}', expected 'sentence' or 'structured'")
+        self.chunking_mode = chunking_mode
+        self.backend = resolve_backend(backend)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        logger.info(f"PDF extractor using backend: {self.backend} (workers: {self.max_workers})")
+    
+    def iter_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) in page order as soon as each page range is extracted
+        
+        Page ranges are extracted in parallel across a process pool; small documents
+        are extracted in-process to avoid the pool round trip.
+        
+        Args:
+            file_path: Path to the PDF file
+        """
+        num_pages = count_pages(file_path, self.backend)
+        ranges = [
+            (start, min(start + self.pages_per_task, num_pages))
+            for start in range(0, num_pages, self.pages_per_task)
+        ]
+        
+        if self.max_workers <= 1 or len(ranges) <= 1:
+            for start, end in ranges:
+                yield from extract_page_range(file_path, self.backend, start, end)
+            return
+        
+        pool = _get_process_pool(self.max_workers)
+        futures = [
+            pool.submit(extract_page_range, file_path, self.backend, start, end)
+            for start, end in ranges
+        ]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
     
     def extract_text_from_pdf(self, file_path: str) -> str:
         """
@@ -31,17 +202,7 @@ class PDFExtractor:
             Extracted text as a string
         """
         try:
-            reader = PdfReader(file_path)
-            text_parts = []
-            
-            for page_num, page in enumerate(reader.pages):
-                try:
-                    text = page.extract_text()
-                    if text.strip():
-                        text_parts.append(text)
-                except Exception as e:
-                    logger.warning(f"Error extracting text from page {page_num + 1}: {e}")
-                    continue
+            text_parts = [text for _, text in self.iter_pages(file_path) if text and text.strip()]
             
             full_text = "\n\n".join(text_parts)
             logger.info(f"Extracted {len(full_text)} characters from PDF")
@@ -70,7 +231,7 @@ class PDFExtractor:
     
     def chunk_text(self, text: str, metadata: Dict = None) -> List[Dict[str, str]]:
         """
-        Split text into overlapping chunks
+        Split text into overlapping, sentence-aligned chunks within the token budget
         
         Args:
             text: Text to chunk
@@ -79,86 +240,87 @@ class PDFExtractor:
         Returns:
             List of dictionaries containing chunk text and metadata
         """
-        # Clean text first
-        text = self.clean_text(text)
-        
-        if not text:
-            return []
-        
-        chunks = []
-        start = 0
-        chunk_index = 0
-        
-        while start < len(text):
-            # Calculate end position
-            end = start + self.chunk_size
-            
-            # Try to break at sentence boundary
-            if end < len(text):
-                # Look for sentence endings
-                sentence_endings = ['. ', '.\n', '! ', '!\n', '? ', '?\n']
-                best_break = end
-                
-                for ending in sentence_endings:
-                    # Look backwards from end
-                    for i in range(end, max(start, end - 200), -1):
-                        if text[i:i+len(ending)] == ending:
-                            best_break = i + len(ending)
-                            break
-                    if best_break < end:
-                        break
-                
-                end = best_break
-            
-            # Extract chunk
-            chunk_text = text[start:end].strip()
-            
-            if chunk_text:
-                chunk_data = {
-                    "text": chunk_text,
-                    "chunk_index": chunk_index,
-                    "start_char": start,
-                    "end_char": end
-                }
-                
-                if metadata:
-                    chunk_data["metadata"] = metadata
-                
-                chunks.append(chunk_data)
-                chunk_index += 1
-            
-            # Move start position with overlap
-            start = end - self.chunk_overlap
-            if start >= len(text):
-                break
+        chunks = self.chunker.chunk(text, metadata)
         
         logger.info(f"Created {len(chunks)} chunks from text")
         return chunks
     
-    def extract_and_chunk_pdf(self, file_path: str, source_file_name: str = None) -> List[Dict[str, str]]:
+    def extract_and_chunk_pdf(
+        self,
+        file_path: str,
+        source_file_name: str = None,
+        chunking_mode: str = None
+    ) -> List[Dict[str, str]]:
         """
         Extract text from PDF and chunk it
         
         Args:
             file_path: Path to the PDF file
             source_file_name: Name of the source file (for metadata)
+            chunking_mode: Overrides the extractor's default chunking mode
             
         Returns:
             List of chunk dictionaries
         """
-        # Extract text
-        text = self.extract_text_from_pdf(file_path)
+        chunks = list(self.iter_pdf_chunks(file_path, source_file_name, chunking_mode))
+        logger.info(f"Created {len(chunks)} chunks from PDF")
+        return chunks
+    
+    def iter_pdf_chunks(
+        self,
+        file_path: str,
+        source_file_name: str = None,
+        chunking_mode: str = None
+    ) -> Iterator[Dict]:
+        """
+        Stream chunks while pages are still being extracted
         
-        # Prepare metadata
+        Args:
+            file_path: Path to the PDF file
+            source_file_name: Name of the source file (for metadata)
+            chunking_mode: Overrides the extractor's default chunking mode
+        """
+        yield from self.chunk_pages(
+            self.iter_pages(file_path),
+            source_file_name or os.path.basename(file_path),
+            chunking_mode
+        )
+    
+    def chunk_pages(
+        self,
+        pages: Iterable[Tuple[int, str]],
+        source_file_name: str,
+        chunking_mode: str = None
+    ) -> Iterator[Dict]:
+        """
+        Chunk already extracted (page_number, text) pairs
+        
+        Args:
+            pages: Pages as yielded by iter_pages
+            source_file_name: Name of the source file (for metadata)
+            chunking_mode: Overrides the extractor's default chunking mode
+        """
         metadata = {
-            "source": source_file_name or os.path.basename(file_path),
+            "source": source_file_name,
             "type": "pdf"
         }
-        
-        # Chunk text
-        chunks = self.chunk_text(text, metadata)
-        
-        return chunks
+        if (chunking_mode or self.chunking_mode) == "structured":
+            yield from self.structured_chunker.iter_chunks(pages, metadata)
+        else:
+            yield from self.chunker.iter_chunks((text for _, text in pages), metadata)
+
+def build_chunk_metadata(chunk: Dict) -> Dict:
+    """Metadata stored alongside a chunk in Milvus"""
+    chunk_metadata = {
+        "chunk_index": chunk["chunk_index"],
+        "start_char": chunk.get("start_char", 0),
+        "end_char": chunk.get("end_char", 0)
+    }
+    structure = chunk.get("metadata") or {}
+    for key in ("page_start", "page_end", "section"):
+        if structure.get(key):
+            chunk_metadata[key] = structure[key]
+    return chunk_metadata
 
 # Global instance
 _pdf_extractor: Optional[PDFExtractor] = None
@@ -171,6 +333,16 @@ def get_pdf_extractor(chunk_size: int = None, chunk_overlap: int = None) -> PDFE
         env_chunk_overlap = os.getenv("CHUNK_OVERLAP")
         final_chunk_size = int(env_chunk_size) if env_chunk_size else (chunk_size or 400)
         final_chunk_overlap = int(env_chunk_overlap) if env_chunk_overlap else (chunk_overlap or 60)
-        _pdf_extractor = PDFExtractor(chunk_size=final_chunk_size, chunk_overlap=final_chunk_overlap)
+        env_workers = os.getenv("PDF_EXTRACT_WORKERS")
+        _pdf_extractor = PDFExtractor(
+            chunk_size=final_chunk_size,
+            chunk_overlap=final_chunk_overlap,
+            backend=os.getenv("PDF_BACKEND", "auto"),
+            max_workers=int(env_workers) if env_workers else None,
+            pages_per_task=int(os.getenv("PDF_PAGES_PER_TASK", "16")),
+            chunk_tokens=int(os.getenv("CHUNK_TOKENS")) if os.getenv("CHUNK_TOKENS") else None,
+            chunk_overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS")) if os.getenv("CHUNK_OVERLAP_TOKENS") else None,
+            chunking_mode=os.getenv("CHUNKING_MODE", "sentence")
+        )
     return _pdf_extractor
 
@@ -0,0 +1,340 @@
+import os
+import logging
+import re
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sentence boundary: terminal punctuation (plus closing quotes/brackets) followed by
+# whitespace, or a paragraph break. Matched once per text instead of rescanning per chunk.
+_BOUNDARY_RE = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n\s*\n\s*')
+# Same character filter PDFExtractor.clean_text applies, minus the newline flattening
+_INVALID_CHARS_RE = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\"\']')
+_INLINE_SPACE_RE = re.compile(r'[ \t\f\v\r]+')
+_PARAGRAPH_RE = re.compile(r' *\n *(?:\n *)+')
+_LINE_WRAP_RE = re.compile(r'(?<!\n)\n(?!\n)')
+
+_tokenizer = None
+_tokenizer_failed = False
+
+def _load_tokenizer():
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is not None or _tokenizer_failed:
+        return _tokenizer
+
+    model_name = os.getenv("EMBEDDING_MODEL_NAME", "BAAI/bge-m3")
+    try:
+        from transformers import AutoTokenizer
+        _tokenizer = AutoTokenizer.from_pretrained(model_name, token=os.getenv("HF_TOKEN"))
+        logger.info(f"Loaded tokenizer for chunking: {model_name}")
+    except Exception as e:
+        logger.warning(f"Failed to load tokenizer '{model_name}': {e}. Falling back to length-based token estimates.")
+        _tokenizer_failed = True
+    return _tokenizer
+
+def normalize_text(text: str) -> str:
+    """
+    Clean extracted text while keeping paragraph breaks
+
+    Single line breaks (PDF line wrapping) become spaces, blank lines stay as
+    paragraph separators so they can act as chunk boundaries.
+    """
+    text = _INVALID_CHARS_RE.sub(' ', text)
+    text = _INLINE_SPACE_RE.sub(' ', text)
+    text = _PARAGRAPH_RE.sub('\n\n', text)
+    text = _LINE_WRAP_RE.sub(' ', text)
+    return re.sub(r' {2,}', ' ', text)
+
+class SentenceChunker:
+    """Packs sentences into chunks bounded by an embedding-model token budget"""
+
+    def __init__(self, max_tokens: int = 256, overlap_tokens: int = 32, use_tokenizer: bool = True):
+        """
+        Args:
+            max_tokens: Maximum number of tokens per chunk
+            overlap_tokens: Tokens of trailing sentences repeated at the start of the next chunk
+            use_tokenizer: Count tokens with the embedding model tokenizer (len // 4 estimate otherwise)
+        """
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        self.tokenizer = _load_tokenizer() if use_tokenizer else None
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        if self.tokenizer is None:
+            return [max(1, len(t) // 4) for t in texts]
+        encoded = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _split_long(self, text: str, start: int) -> List[Tuple[str, int, int]]:
+        """Hard-split a sentence that alone exceeds the token budget"""
+        pieces = []
+        if self.tokenizer is None:
+            step = self.max_tokens * 4
+            for offset in range(0, len(text), step):
+                piece = text[offset:offset + step]
+                pieces.append((piece, start + offset, max(1, len(piece) // 4)))
+            return pieces
+
+        offsets = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        for i in range(0, len(offsets), self.max_tokens):
+            window = offsets[i:i + self.max_tokens]
+            piece_start = window[0][0]
+            piece_end = offsets[i + self.max_tokens][0] if i + self.max_tokens < len(offsets) else len(text)
+            pieces.append((text[piece_start:piece_end], start + piece_start, len(window)))
+        return pieces
+
+    def iter_sentences(self, segments: Iterable[str]) -> Iterator[Tuple[str, int]]:
+        """
+        Yield (sentence, start_char) from a stream of text segments (e.g. PDF pages)
+
+        A sentence that runs across a segment boundary is carried into the next segment.
+        """
+        carry = ""
+        carry_start = 0
+        offset = 0
+
+        # Offsets refer to the normalized segments joined with "\n\n"
+        for segment in segments:
+            segment = normalize_text(segment)
+            if not segment.strip():
+                continue
+            segment_start = offset
+            offset += len(segment) + 2
+            prefix_len = len(carry) + 1 if carry else 0
+            buffer = f"{carry} {segment}" if carry else segment
+
+            def to_offset(pos: int) -> int:
+                return carry_start + pos if pos < prefix_len else segment_start + pos - prefix_len
+
+            last = 0
+            for match in _BOUNDARY_RE.finditer(buffer):
+                sentence = buffer[last:match.start()]
+                stripped = sentence.lstrip()
+                if stripped.strip():
+                    yield stripped.rstrip(), to_offset(last + len(sentence) - len(stripped))
+                last = match.end()
+
+            tail = buffer[last:]
+            carry = tail.strip()
+            carry_start = to_offset(last + len(tail) - len(tail.lstrip())) if carry else 0
+
+        if carry:
+            yield carry, carry_start
+
+    def iter_chunks(self, segments: Iterable[str], metadata: Dict = None, batch_size: int = 256) -> Iterator[Dict]:
+        """
+        Stream chunks from text segments
+
+        Sentences are tokenized in batches, then greedily packed until the next
+        sentence would exceed max_tokens. Each chunk starts with the trailing
+        sentences of the previous one, up to overlap_tokens.
+        """
+        window: List[Tuple[str, int, int]] = []  # (sentence, start_char, tokens)
+        window_tokens = 0
+        chunk_index = 0
+
+        def emit():
+            text = " ".join(s for s, _, _ in window)
+            start_char = window[0][1]
+            last_text, last_start, _ = window[-1]
+            chunk = {
+                "text": text,
+                "chunk_index": chunk_index,
+                "start_char": start_char,
+                "end_char": last_start + len(last_text),
+                "token_count": window_tokens,
+            }
+            if metadata:
+                chunk["metadata"] = metadata
+            return chunk
+
+        def batches():
+            batch = []
+            for sentence in self.iter_sentences(segments):
+                batch.append(sentence)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        for batch in batches():
+            token_counts = self.count_tokens([s for s, _ in batch])
+            for (sentence, start), tokens in zip(batch, token_counts):
+                parts = self._split_long(sentence, start) if tokens > self.max_tokens else [(sentence, start, tokens)]
+                for part in parts:
+                    if window and window_tokens + part[2] > self.max_tokens:
+                        yield emit()
+                        chunk_index += 1
+                        # Keep trailing sentences as overlap for the next chunk
+                        kept: List[Tuple[str, int, int]] = []
+                        kept_tokens = 0
+                        for item in reversed(window):
+                            if kept_tokens + item[2] > self.overlap_tokens:
+                                break
+                            kept.insert(0, item)
+                            kept_tokens += item[2]
+                        while kept and kept_tokens + part[2] > self.max_tokens:
+                            kept_tokens -= kept.pop(0)[2]
+                        window = kept
+                        window_tokens = kept_tokens
+                    window.append(part)
+                    window_tokens += part[2]
+
+        if window:
+            yield emit()
+
+    def chunk(self, text: str, metadata: Dict = None) -> List[Dict]:
+        return list(self.iter_chunks([text], metadata))
+
+# IELTS material headings, outermost first. Each match opens a new section and
+# closes any open section at the same or a deeper level.
+HEADING_PATTERNS = [
+    (1, re.compile(r'^(?:(?:academic|general training)\s+)?(?:practice\s+)?test\s+\d+\b', re.IGNORECASE)),
+    (2, re.compile(r'^(?:reading|listening|writing|speaking)(?:\s+(?:test|module))?$', re.IGNORECASE)),
+    (3, re.compile(
+        r'^(?:(?:reading\s+)?passage|section|part|(?:writing\s+)?task)\s+(?:\d+|one|two|three|four)\b',
+        re.IGNORECASE
+    )),
+    (4, re.compile(r'^questions?\s+\d+(?:\s*(?:[-\u2013\u2014]|to|and)\s*\d+)?\b', re.IGNORECASE)),
+]
+_MAX_HEADING_CHARS = 80
+# Lines that should stay separate sentences: numbered questions/options and table rows.
+# Letter and roman-numeral items need their "." or ")" so wrapped prose starting
+# with "A " or "I " is not split; bare question numbers must start a capitalised line.
+_ITEM_LINE_RE = re.compile(
+    r'^\s*(?:\d{1,2}(?:[\.\)]\s+\S|\s+[A-Z])|(?:[A-Ha-h]|[ivx]{1,4}|[IVX]{1,4})[\.\)]\s+\S)'
+)
+_TABLE_LINE_RE = re.compile(r'\S(?:\t| {3,})\S')
+
+def detect_heading(line: str) -> Optional[Tuple[int, str]]:
+    line = line.strip()
+    if not line or len(line) > _MAX_HEADING_CHARS:
+        return None
+    for level, pattern in HEADING_PATTERNS:
+        if pattern.match(line):
+            return level, re.sub(r'\s+', ' ', line)
+    return None
+
+class StructuredChunker:
+    """
+    Section-aware chunking for IELTS books and test papers
+
+    Splits on test/passage/section/question headings so a chunk never spans two
+    passages, keeps numbered questions and table rows as separate sentences, and
+    records page range and heading path in each chunk's metadata.
+    """
+
+    def __init__(self, sentence_chunker: SentenceChunker):
+        self.sentence_chunker = sentence_chunker
+
+    def _mark_lines(self, lines: List[str]) -> str:
+        # A blank line before list items and table rows turns them into boundaries
+        marked = []
+        for line in lines:
+            if marked and (_ITEM_LINE_RE.match(line) or _TABLE_LINE_RE.search(line)):
+                marked.append("")
+            marked.append(line)
+        return "\n".join(marked)
+
+    def _chunk_section(
+        self,
+        segments: List[Tuple[int, str]],
+        headings: Dict[int, str],
+        metadata: Optional[Dict],
+        base_offset: int
+    ) -> Iterator[Dict]:
+        texts = [text for _, text in segments]
+
+        # Start offset of each non-empty normalized segment, to map chunks back to pages
+        starts = []
+        offset = 0
+        for page, text in segments:
+            normalized = normalize_text(text)
+            if not normalized.strip():
+                continue
+            starts.append((offset, page))
+            offset += len(normalized) + 2
+
+        def page_at(char: int) -> int:
+            page = starts[0][1]
+            for start, p in starts:
+                if start > char:
+                    break
+                page = p
+            return page
+
+        path = [headings[level] for level in sorted(headings)]
+        for chunk in self.sentence_chunker.iter_chunks(texts):
+            chunk_metadata = dict(metadata or {})
+            chunk_metadata.update({
+                "page_start": page_at(chunk["start_char"]),
+                "page_end": page_at(max(chunk["start_char"], chunk["end_char"] - 1)),
+                "section": " > ".join(path),
+                "headings": path,
+            })
+            chunk["start_char"] += base_offset
+            chunk["end_char"] += base_offset
+            chunk["metadata"] = chunk_metadata
+            yield chunk
+
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]], metadata: Dict = None) -> Iterator[Dict]:
+        """
+        Stream chunks from (page_number, raw_text) pairs
+
+        Raw text is needed (not clean_text output) because headings and
+        numbered questions are recognised line by line.
+        """
+        headings: Dict[int, str] = {}
+        section: List[Tuple[int, str]] = []
+        lines: List[str] = []
+        current_page = None
+        chunk_index = 0
+        base_offset = 0
+
+        def close_page():
+            if lines and current_page is not None:
+                section.append((current_page, self._mark_lines(lines)))
+            lines.clear()
+
+        def flush():
+            nonlocal chunk_index, base_offset
+            close_page()
+            if section:
+                last_end = base_offset
+                for chunk in self._chunk_section(section, headings, metadata, base_offset):
+                    chunk["chunk_index"] = chunk_index
+                    chunk_index += 1
+                    last_end = chunk["end_char"]
+                    yield chunk
+                base_offset = last_end + 2
+            section.clear()
+
+        for page_number, text in pages:
+            close_page()
+            current_page = page_number
+            for line in (text or "").splitlines():
+                heading = detect_heading(line)
+                if heading is None:
+                    lines.append(line)
+                    continue
+                yield from flush()
+                level, title = heading
+                for deeper in [l for l in headings if l >= level]:
+                    del headings[deeper]
+                headings[level] = title
+
+        yield from flush()
+
+_sentence_chunker: Optional[SentenceChunker] = None
+
+def get_sentence_chunker(max_tokens: int = None, overlap_tokens: int = None) -> SentenceChunker:
+    global _sentence_chunker
+    if _sentence_chunker is None:
+        _sentence_chunker = SentenceChunker(
+            max_tokens=max_tokens or int(os.getenv("CHUNK_TOKENS", "256")),
+            overlap_tokens=overlap_tokens if overlap_tokens is not None else int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+        )
+    return _sentence_chunker
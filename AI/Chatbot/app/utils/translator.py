@@ -1,92 +1,395 @@
 from langdetect import detect, DetectorFactory
-from transformers import pipeline
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio
 import logging
 import os
+import re
+import threading
+import unicodedata
 
 DetectorFactory.seed = 0
 logger = logging.getLogger(__name__)
 
-_translator = None
+MODEL_NAME = "Helsinki-NLP/opus-mt-vi-en"
+# Longest segment sent to the model in one piece; longer sentences are split further
+MAX_INPUT_CHARS = 512
+# Translate with the chat LLM when the MT model could not be loaded. Off by default:
+# it costs a full Ollama generation per Vietnamese message before routing starts
+LLM_FALLBACK_ENABLED = os.getenv("TRANSLATION_LLM_FALLBACK", "false").lower() == "true"
 
-def _load_translator():
-    global _translator
-    if _translator is not None:
-        return _translator
-    
-    hf_token = os.getenv("HF_TOKEN")
-    model_name = "Helsinki-NLP/opus-mt-vi-en"
-    
-    try:
+SUPPORTED_BACKENDS = ("transformers", "ctranslate2")
+
+class TransformersBackend:
+    """Reference MarianMT pipeline (PyTorch, fp32)"""
+
+    name = "transformers"
+
+    def __init__(self, model_name: str):
+        from transformers import pipeline
+
+        hf_token = os.getenv("HF_TOKEN")
         if hf_token:
-            _translator = pipeline(
+            self.pipeline = pipeline(
                 "translation",
                 model=model_name,
                 tokenizer=model_name,
                 token=hf_token
             )
         else:
-            _translator = pipeline(
+            self.pipeline = pipeline(
                 "translation",
                 model=model_name,
                 tokenizer=model_name
             )
-        logger.info("Vietnamese-English translator loaded successfully")
-    except Exception as e:
-        logger.warning(f"Failed to load translator model '{model_name}': {e}. Translation features will be disabled. The application will continue to work, but Vietnamese text will not be automatically translated.")
-        _translator = None
-    
-    return _translator
 
-_load_translator()
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        results = self.pipeline(texts, max_length=512, num_return_sequences=1, batch_size=len(texts))
+        return [r["translation_text"].strip() for r in results]
+
+class CTranslate2Backend:
+    """
+    The same MarianMT weights converted to CTranslate2 with int8 quantization
+
+    CT2_MODEL_DIR points at a converted model; if it does not exist yet the
+    model is converted once from the HuggingFace checkpoint and cached there.
+    """
+
+    name = "ctranslate2"
+
+    def __init__(self, model_name: str):
+        import ctranslate2
+        from transformers import AutoTokenizer
+
+        hf_token = os.getenv("HF_TOKEN")
+        model_dir = os.getenv("CT2_MODEL_DIR", os.path.join("models", "opus-mt-vi-en-ct2-int8"))
+        compute_type = os.getenv("CT2_COMPUTE_TYPE", "int8")
+
+        if not os.path.isdir(model_dir):
+            logger.info(f"Converting {model_name} to CTranslate2 ({compute_type}) in {model_dir}")
+            converter = ctranslate2.converters.TransformersConverter(model_name)
+            converter.convert(model_dir, quantization=compute_type)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, token=hf_token)
+        self.translator = ctranslate2.Translator(
+            model_dir,
+            device="cpu",
+            compute_type=compute_type,
+            inter_threads=1,
+            intra_threads=int(os.getenv("CT2_THREADS", "0"))
+        )
+        self.beam_size = int(os.getenv("CT2_BEAM_SIZE", "4"))
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        source_tokens = [
+            self.tokenizer.convert_ids_to_tokens(self.tokenizer.encode(text))
+            for text in texts
+        ]
+        results = self.translator.translate_batch(
+            source_tokens,
+            beam_size=self.beam_size,
+            max_decoding_length=512
+        )
+        return [
+            self.tokenizer.decode(
+                self.tokenizer.convert_tokens_to_ids(result.hypotheses[0]),
+                skip_special_tokens=True
+            ).strip()
+            for result in results
+        ]
+
+def create_backend(name: str, model_name: str = MODEL_NAME):
+    """Instantiate a translation backend, falling back to the transformers pipeline"""
+    name = (name or "transformers").lower()
+    if name not in SUPPORTED_BACKENDS:
+        logger.warning(f"Unknown translation backend '{name}', using transformers")
+        name = "transformers"
+
+    if name == "ctranslate2":
+        try:
+            return CTranslate2Backend(model_name)
+        except Exception as e:
+            logger.warning(f"Failed to load CTranslate2 translator: {e}. Falling back to transformers pipeline.")
+
+    return TransformersBackend(model_name)
+
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?\u2026])\s+|\s*\n+\s*')
+_CLAUSE_SPLIT_RE = re.compile(r'(?<=[,;:])\s+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def _split_oversized(sentence: str) -> List[str]:
+    """Split a sentence longer than MAX_INPUT_CHARS on clause, then word boundaries"""
+    pieces = []
+    current = ""
+    for part in _CLAUSE_SPLIT_RE.split(sentence):
+        words = [part] if len(part) <= MAX_INPUT_CHARS else part.split(" ")
+        for word in words:
+            candidate = f"{current} {word}" if current else word
+            if len(candidate) <= MAX_INPUT_CHARS:
+                current = candidate
+            else:
+                if current:
+                    pieces.append(current)
+                # A token longer than the limit (a URL, unspaced text) goes out in consecutive slices
+                slices = [word[i:i + MAX_INPUT_CHARS] for i in range(0, len(word), MAX_INPUT_CHARS)] or [""]
+                pieces.extend(slices[:-1])
+                current = slices[-1]
+    if current:
+        pieces.append(current)
+    return pieces
+
+def segment_sentences(text: str) -> List[str]:
+    """Split text into sentences that each fit in one translation input"""
+    sentences = []
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        sentence = _WHITESPACE_RE.sub(" ", sentence).strip()
+        if not sentence:
+            continue
+        if len(sentence) <= MAX_INPUT_CHARS:
+            sentences.append(sentence)
+        else:
+            sentences.extend(_split_oversized(sentence))
+    return sentences
+
+class TranslationService:
+    """
+    Vietnamese -> English translation with lazy model loading
+
+    The model is loaded on first use (or by a background startup task) and all
+    inference runs on a dedicated single-thread executor, so the event loop is
+    never blocked. Requests arriving within max_wait_ms are translated together
+    in one forward pass.
+    """
+
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        backend: str = "transformers",
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        cache_size: int = 2048
+    ):
+        self.model_name = model_name
+        self.backend_name = backend
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._translator = None
+        self._load_failed = False
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translator")
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._translator is not None
+
+    @property
+    def load_failed(self) -> bool:
+        return self._load_failed
+
+    def _load(self):
+        with self._load_lock:
+            if self._translator is not None or self._load_failed:
+                return self._translator
+
+            try:
+                self._translator = create_backend(self.backend_name, self.model_name)
+                logger.info(f"Vietnamese-English translator loaded successfully (backend: {self._translator.name})")
+            except Exception as e:
+                logger.warning(f"Failed to load translator model '{self.model_name}': {e}. Translation features will be disabled. The application will continue to work, but Vietnamese text will not be automatically translated.")
+                self._load_failed = True
+
+            return self._translator
+
+    async def load_async(self):
+        """Load the model on the inference thread (used as a background startup task)"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._load)
+
+    def _run_batch(self, texts: List[str]) -> List[str]:
+        translator = self._load()
+        if not translator:
+            return texts
+        return translator.translate_batch(texts)
+
+    def _ensure_batcher(self):
+        if self._batcher_task is None or self._batcher_task.done():
+            self._queue = asyncio.Queue()
+            self._batcher_task = asyncio.create_task(self._batch_loop())
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                translations = await loop.run_in_executor(self._executor, self._run_batch, texts)
+                for (_, future), translated in zip(batch, translations):
+                    if not future.done():
+                        future.set_result(translated)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def translate(self, text: str) -> str:
+        return (await self.translate_many([text]))[0]
+
+    async def translate_many(self, texts: List[str]) -> List[str]:
+        """Queue several inputs at once so they share a forward pass"""
+        self._ensure_batcher()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            await self._queue.put((text, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def translate_text(self, text: str) -> str:
+        """
+        Translate text of any length: split into sentences, serve repeated
+        sentences from the LRU cache and translate the rest in one batch.
+        """
+        sentences = segment_sentences(text)
+        if not sentences:
+            return text.strip()
+
+        translations: List[Optional[str]] = []
+        missing: List[str] = []
+        for sentence in sentences:
+            cached = self._cache.get(sentence)
+            if cached is not None:
+                self._cache.move_to_end(sentence)
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+                if sentence not in missing:
+                    missing.append(sentence)
+            translations.append(cached)
+
+        if missing:
+            results = dict(zip(missing, await self.translate_many(missing)))
+            # Only cache real translations; an unloaded model echoes its input
+            if self.loaded:
+                for sentence, translated in results.items():
+                    self._cache[sentence] = translated
+                    self._cache.move_to_end(sentence)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            translations = [t if t is not None else results[s] for s, t in zip(sentences, translations)]
+
+        return " ".join(translations)
+
+_translation_service: Optional[TranslationService] = None
+
+def get_translation_service() -> TranslationService:
+    global _translation_service
+    if _translation_service is None:
+        _translation_service = TranslationService(
+            backend=os.getenv("TRANSLATION_BACKEND", "transformers"),
+            max_batch_size=int(os.getenv("TRANSLATION_MAX_BATCH", "16")),
+            max_wait_ms=float(os.getenv("TRANSLATION_BATCH_WAIT_MS", "10")),
+            cache_size=int(os.getenv("TRANSLATION_CACHE_SIZE", "2048"))
+        )
+    return _translation_service
+
+# Vietnamese letters: the base letters ăâđêôơư, the accented vowels shared with
+# Latin-1, and the Latin Extended Additional block (U+1EA0-U+1EF9) used for tone marks
+_VIETNAMESE_CHARS_RE = re.compile(
+    '[\u0103\u00e2\u0111\u00ea\u00f4\u01a1\u01b0'
+    '\u0102\u00c2\u0110\u00ca\u00d4\u01a0\u01af'
+    '\u00e0\u00e1\u00e3\u00e8\u00e9\u00ec\u00ed\u00f2\u00f3\u00f5\u00f9\u00fa\u00fd'
+    '\u00c0\u00c1\u00c3\u00c8\u00c9\u00cc\u00cd\u00d2\u00d3\u00d5\u00d9\u00da\u00dd'
+    '\u0129\u0128\u0169\u0168'
+    '\u1ea0-\u1ef9]'
+)
+_WORD_RE = re.compile(r"[a-z]+")
+# Common Vietnamese words typed without diacritics that are not English words
+_UNACCENTED_VIETNAMESE_WORDS = frozenset([
+    "toi", "ban", "minh", "cua", "voi", "duoc", "nay", "khong", "nhung", "nhieu",
+    "khoa", "hoc", "cho", "hoi", "nao", "gi", "lam", "sao", "nhu", "thi",
+    "diem", "bai", "viet", "noi", "nghe", "tu", "vung", "giup", "em", "anh",
+    "chi", "oi", "nhe", "vay", "roi", "luyen", "muon",
+])
+_SHORT_TEXT_WORDS = 3
 
 def is_vietnamese(text: str) -> bool:
+    """
+    Decide whether a message is Vietnamese
+
+    One precompiled regex settles any text containing Vietnamese letters. ASCII
+    text is only passed to langdetect when it is short or contains common
+    unaccented Vietnamese words; longer plain ASCII is treated as English.
+    """
     if not text or len(text.strip()) < 3:
         return False
     
+    # Decomposed input (macOS, some mobile keyboards) carries the tone marks as
+    # combining characters that the precomposed character class does not match
+    cleaned_text = unicodedata.normalize("NFC", text.strip())
+    if _VIETNAMESE_CHARS_RE.search(cleaned_text):
+        return True
+    
+    words = _WORD_RE.findall(cleaned_text.lower())
+    looks_unaccented_vietnamese = sum(1 for w in words if w in _UNACCENTED_VIETNAMESE_WORDS) >= 2
+    if len(words) > _SHORT_TEXT_WORDS and not looks_unaccented_vietnamese:
+        return False
+    
     try:
-        cleaned_text = text.strip()
-        detected_lang = detect(cleaned_text)
-        
-        vietnamese_chars = ['ă', 'â', 'đ', 'ê', 'ô', 'ơ', 'ư', 'á', 'à', 'ả', 'ã', 'ạ', 
-                          'é', 'è', 'ẻ', 'ẽ', 'ẹ', 'í', 'ì', 'ỉ', 'ĩ', 'ị', 'ó', 'ò', 
-                          'ỏ', 'õ', 'ọ', 'ú', 'ù', 'ủ', 'ũ', 'ụ', 'ý', 'ỳ', 'ỷ', 'ỹ', 'ỵ']
-        
-        has_vietnamese_chars = any(char in cleaned_text.lower() for char in vietnamese_chars)
-        
-        return detected_lang == "vi" or has_vietnamese_chars
-        
+        return detect(cleaned_text) == "vi"
     except Exception as e:
         logger.warning(f"Language detection failed: {e}")
+        return looks_unaccented_vietnamese
 
-        vietnamese_words = ['tôi', 'bạn', 'là', 'của', 'với', 'để', 'có', 'được', 'này', 'đó']
-        return any(word in text.lower() for word in vietnamese_words)
+async def _translate_with_llm(text: str) -> str:
+    from ..llm.llm_service import generate_with_fallback
+    from ..llm.prompts import TRANSLATE_SYSTEM_PROMPT
+
+    return (await generate_with_fallback(text, profile="translate_fallback", system=TRANSLATE_SYSTEM_PROMPT)).strip()
 
 async def translate_vi_to_en(text: str) -> str:
-    translator = _load_translator()
-    if not translator:
-        logger.debug("Translator not available, returning original text")
-        return text
-    
+    service = get_translation_service()
+
     try:
         cleaned_text = text.strip()
-        if len(cleaned_text) > 512:
-            logger.warning("Text too long, truncating for translation")
-            cleaned_text = cleaned_text[:512]
-        
-        result = translator(cleaned_text, max_length=512, num_return_sequences=1)
-        translated = result[0]["translation_text"]
-        
+        translated = await service.translate_text(cleaned_text)
+        if service.load_failed and LLM_FALLBACK_ENABLED:
+            translated = await _translate_with_llm(cleaned_text)
+
         logger.info(f"Translation: '{cleaned_text[:50]}...' -> '{translated[:50]}...'")
-        return translated.strip()
-        
+        return translated
+
     except Exception as e:
         logger.error(f"Translation failed: {e}")
-        return text  
+        return text
 
 def get_translation_info() -> dict:
+    service = get_translation_service()
     return {
-        "model": "Helsinki-NLP/opus-mt-vi-en",
-        "available": _translator is not None,
+        "model": service.model_name,
+        "backend": service._translator.name if service.loaded else service.backend_name,
+        "available": service.loaded,
+        "load_failed": service.load_failed,
         "supported_languages": ["vi", "en"],
-        "max_length": 512
-    }
\ No newline at end of file
+        "max_segment_length": MAX_INPUT_CHARS,
+        "cache_entries": len(service._cache),
+        "cache_hits": service.cache_hits,
+        "cache_misses": service.cache_misses
+    }
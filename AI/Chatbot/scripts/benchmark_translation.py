@@ -0,0 +1,138 @@
+"""
+Parity check and latency benchmark for the Vietnamese -> English translation backends
+
+Usage (from AI/Chatbot):
+    python scripts/benchmark_translation.py
+    python scripts/benchmark_translation.py --candidate ctranslate2 --min-similarity 0.9
+
+Each backend runs in its own process so resident memory is measured per backend.
+Exits with status 1 when the candidate's mean similarity to the reference
+backend falls below --min-similarity.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SAMPLES = [
+    "Cho mình hỏi khóa học nào phù hợp để luyện IELTS Writing Task 2?",
+    "Làm thế nào để cải thiện kỹ năng nghe IELTS trong ba tháng?",
+    "Tôi nên học từ vựng theo chủ đề hay theo danh sách?",
+    "Bài thi Speaking Part 2 kéo dài bao lâu?",
+    "Khóa học nào có giá dưới một triệu đồng?",
+    "Mình đang ở band 5.5, muốn lên 7.0 thì cần làm gì?",
+    "Có mã giảm giá nào cho gói combo không?",
+    "Cách quản lý thời gian khi làm bài Reading là gì?",
+    "Tôi hay bị mất điểm ở phần coherence and cohesion, làm sao để khắc phục?",
+    "Bạn có thể giải thích sự khác nhau giữa IELTS Academic và General Training không?",
+    "Đề thi thử Listening có đáp án không?",
+    "Mình nên viết bao nhiêu từ cho Writing Task 1?",
+    "Những lỗi ngữ pháp phổ biến trong bài viết IELTS là gì?",
+    "Làm sao để phát âm đúng trọng âm của từ nhiều âm tiết?",
+    "Khóa học Speaking cho người mới bắt đầu có không?",
+    "Tôi cần luyện bao nhiêu đề Reading mỗi tuần?",
+]
+
+def run_backend(backend_name: str, repeats: int) -> dict:
+    from app.utils.translator import create_backend
+
+    load_start = time.perf_counter()
+    backend = create_backend(backend_name)
+    load_seconds = time.perf_counter() - load_start
+
+    # Warm up once so the first measured call does not include lazy initialization
+    backend.translate_batch(SAMPLES[:1])
+
+    latencies = []
+    outputs = []
+    for _ in range(repeats):
+        outputs = []
+        for text in SAMPLES:
+            start = time.perf_counter()
+            outputs.append(backend.translate_batch([text])[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    batch_start = time.perf_counter()
+    backend.translate_batch(SAMPLES)
+    batch_seconds = time.perf_counter() - batch_start
+
+    latencies.sort()
+    return {
+        "requested_backend": backend_name,
+        "backend": backend.name,
+        "load_seconds": load_seconds,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "batch_sentences_per_second": len(SAMPLES) / batch_seconds,
+        # ru_maxrss is reported in KiB on Linux
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "outputs": outputs,
+    }
+
+def run_in_subprocess(backend_name: str, repeats: int) -> dict:
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", backend_name, "--repeats", str(repeats)],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference", default="transformers")
+    parser.add_argument("--candidate", default="ctranslate2")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--min-similarity", type=float, default=0.9)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.repeats)))
+        return 0
+
+    reference = run_in_subprocess(args.reference, args.repeats)
+    candidate = run_in_subprocess(args.candidate, args.repeats)
+
+    if candidate["backend"] != args.candidate:
+        print(f"Candidate backend '{args.candidate}' failed to load (fell back to {candidate['backend']})")
+        return 1
+
+    similarities = [
+        SequenceMatcher(None, ref.lower(), cand.lower()).ratio()
+        for ref, cand in zip(reference["outputs"], candidate["outputs"])
+    ]
+    exact = sum(1 for ref, cand in zip(reference["outputs"], candidate["outputs"]) if ref == cand)
+    mean_similarity = statistics.mean(similarities)
+
+    print(f"{'':24}{'reference':>14}{'candidate':>14}")
+    print(f"{'backend':24}{reference['backend']:>14}{candidate['backend']:>14}")
+    for key, label in [
+        ("load_seconds", "load (s)"),
+        ("p50_ms", "p50 latency (ms)"),
+        ("p95_ms", "p95 latency (ms)"),
+        ("batch_sentences_per_second", "batch sentences/s"),
+        ("max_rss_mb", "max RSS (MB)"),
+    ]:
+        print(f"{label:24}{reference[key]:>14.1f}{candidate[key]:>14.1f}")
+
+    print(f"\nExact matches: {exact}/{len(SAMPLES)}, mean similarity: {mean_similarity:.3f}")
+    for ref, cand, similarity in zip(reference["outputs"], candidate["outputs"], similarities):
+        if ref != cand:
+            print(f"  [{similarity:.2f}] {ref!r}\n         {cand!r}")
+
+    if mean_similarity < args.min_similarity:
+        print(f"FAIL: mean similarity {mean_similarity:.3f} < {args.min_similarity}")
+        return 1
+    print("PASS")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
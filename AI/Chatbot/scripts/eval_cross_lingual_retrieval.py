@@ -0,0 +1,83 @@
+"""
+Compare vector retrieval with and without translating Vietnamese queries first
+
+Usage (from AI/Chatbot, with Milvus and HF_TOKEN configured):
+    python scripts/eval_cross_lingual_retrieval.py eval_queries.jsonl --top-k 5
+
+Each JSONL line has a Vietnamese query and its ground truth, either as source
+files or as an English reference query:
+    {"query_vi": "...", "relevant_sources": ["cambridge-18.pdf"]}
+    {"query_vi": "...", "query_en": "..."}
+
+With relevant_sources, recall@k is the fraction of relevant files found in the
+top k. With query_en, the top-k chunks retrieved for the English reference are
+the relevant set, and recall@k is the overlap with that set.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.rag_service import get_rag_service
+from app.utils.translator import translate_vi_to_en
+
+def _chunk_key(doc: dict) -> str:
+    return f"{doc.get('source_file')}#{doc.get('chunk_index')}"
+
+def recall(retrieved: list, relevant: set, by_source: bool) -> float:
+    if not relevant:
+        return 0.0
+    keys = {doc.get("source_file") if by_source else _chunk_key(doc) for doc in retrieved}
+    return len(keys & relevant) / len(relevant)
+
+async def evaluate(path: str, top_k: int):
+    rag_service = get_rag_service()
+    rag_service.top_k = top_k
+
+    direct_recalls, translated_recalls = [], []
+    direct_ms, translated_ms, translation_ms = [], [], []
+
+    with open(path, "r", encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+
+    for item in items:
+        query_vi = item["query_vi"]
+        by_source = "relevant_sources" in item
+        if by_source:
+            relevant = set(item["relevant_sources"])
+        else:
+            relevant = {_chunk_key(doc) for doc in rag_service.retrieve_context(item["query_en"])}
+
+        start = time.perf_counter()
+        direct = rag_service.retrieve_context(query_vi)
+        direct_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        query_en = await translate_vi_to_en(query_vi)
+        translation_ms.append((time.perf_counter() - start) * 1000)
+        translated = rag_service.retrieve_context(query_en)
+        translated_ms.append((time.perf_counter() - start) * 1000)
+
+        direct_recalls.append(recall(direct, relevant, by_source))
+        translated_recalls.append(recall(translated, relevant, by_source))
+
+    print(f"Queries: {len(items)}, top_k: {top_k}")
+    print(f"{'':28}{'recall@k':>10}{'p50 ms':>10}")
+    print(f"{'original Vietnamese':28}{statistics.mean(direct_recalls):>10.3f}{statistics.median(direct_ms):>10.1f}")
+    print(f"{'translate then embed':28}{statistics.mean(translated_recalls):>10.3f}{statistics.median(translated_ms):>10.1f}")
+    print(f"Translation alone p50: {statistics.median(translation_ms):.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queries", help="JSONL evaluation set")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(evaluate(args.queries, args.top_k))
+
+if __name__ == "__main__":
+    main()
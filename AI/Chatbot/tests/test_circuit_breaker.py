@@ -0,0 +1,60 @@
+import asyncio
+
+from app.llm.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def _tripped(**kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", min_calls=2, open_seconds=30.0, **kwargs)
+    breaker.record_failure(RuntimeError("down"))
+    breaker.record_failure(RuntimeError("down"))
+    assert breaker.state == OPEN
+    return breaker
+
+
+def _cool_down(breaker: CircuitBreaker):
+    breaker.opened_at -= breaker.open_seconds + 1
+
+
+def test_open_half_open_closed_through_allow_request():
+    breaker = _tripped()
+    assert not breaker.allow_request()
+
+    _cool_down(breaker)
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Only one trial request at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_trial_reopens():
+    breaker = _tripped()
+    _cool_down(breaker)
+    assert breaker.allow_request()
+
+    breaker.record_failure(RuntimeError("still down"))
+    assert breaker.state == OPEN
+    assert breaker.is_open()
+
+
+def test_ungated_success_after_cool_down_closes():
+    breaker = _tripped()
+    # Successes during the cool-down do not close the circuit
+    breaker.record_success(0.1)
+    assert breaker.state == OPEN
+
+    _cool_down(breaker)
+    asyncio.run(breaker.call(asyncio.sleep(0, result="ok")))
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["state"] == CLOSED
+
+
+def test_ungated_failure_after_cool_down_restarts_it():
+    breaker = _tripped()
+    _cool_down(breaker)
+    breaker.record_failure(RuntimeError("still down"))
+    assert breaker.state == OPEN
+    assert breaker.is_open()
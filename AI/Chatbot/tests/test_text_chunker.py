@@ -0,0 +1,38 @@
+from app.utils.text_chunker import SentenceChunker, StructuredChunker
+
+
+def _marked(text: str) -> str:
+    return StructuredChunker(SentenceChunker(use_tokenizer=False))._mark_lines(text.splitlines())
+
+
+def test_items_and_table_rows_become_separate_paragraphs():
+    marked = _marked(
+        "Choose the correct letter.\n"
+        "A. the library\n"
+        "B) the museum\n"
+        "14 Which paragraph mentions costs?\n"
+        "15. What does the writer suggest?\n"
+        "iv. A new approach\n"
+        "Year\t2010\t2020"
+    )
+    assert marked.split("\n\n") == [
+        "Choose the correct letter.",
+        "A. the library",
+        "B) the museum",
+        "14 Which paragraph mentions costs?",
+        "15. What does the writer suggest?",
+        "iv. A new approach",
+        "Year\t2010\t2020",
+    ]
+
+
+def test_wrapped_prose_is_not_split():
+    text = (
+        "Many students find that living away from home is\n"
+        "a challenge at first, and some of them say that\n"
+        "I cannot manage is a common first reaction.\n"
+        "A careful look at the data shows that around\n"
+        "20 percent of them move back within a year, and\n"
+        "b grades are typical in the first term."
+    )
+    assert "\n\n" not in _marked(text)
@@ -0,0 +1,273 @@
+"""
+Stage timings, throughput and score regression check for pronunciation_analyzer.py
+
+Usage (from Backend/pronunciation-analysis):
+    python benchmark.py
+    python benchmark.py --cases short,medium --repeats 5
+    python benchmark.py --update-golden
+
+Test recordings are synthesized offline and deterministically: every syllable
+of the transcription is a harmonic voice source shaped by vowel formants, with
+higher pitch and level on stressed syllables and seeded pauses between words.
+Each case runs in its own process so peak RSS is measured per case.
+Exits with status 1 when a score differs from golden_outputs.json by more
+than --tolerance.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden_outputs.json')
+SAMPLE_RATE = 16000
+
+SENTENCES = [
+    "Many people believe that environmental education should be compulsory in every school.",
+    "In my opinion, the government ought to invest more money in public transportation.",
+    "I usually spend my weekends reading novels and visiting my grandparents.",
+    "The graph illustrates the percentage of households with access to the internet.",
+    "Technology has fundamentally changed the way we communicate with each other.",
+    "Living in a big city offers more opportunities, but it can also be stressful.",
+]
+
+# name -> (number of words, alignment mode)
+CASES = {
+    'short': (8, 'nuclei'),
+    'medium': (30, 'nuclei'),
+    'long': (120, 'nuclei'),
+    'medium-uniform': (30, 'uniform'),
+}
+
+# (F1, F2, F3) in Hz for the vowel of a syllable, picked by the CMU vowel symbol
+VOWEL_FORMANTS = {
+    'AA': (730, 1090, 2440), 'AE': (660, 1720, 2410), 'AH': (640, 1190, 2390),
+    'AO': (570, 840, 2410), 'AW': (700, 1200, 2500), 'AY': (700, 1500, 2500),
+    'EH': (530, 1840, 2480), 'ER': (490, 1350, 1690), 'EY': (480, 2000, 2600),
+    'IH': (390, 1990, 2550), 'IY': (270, 2290, 3010), 'OW': (500, 900, 2400),
+    'OY': (550, 1000, 2450), 'UH': (440, 1020, 2240), 'UW': (300, 870, 2240),
+}
+
+def case_text(num_words):
+    words = ' '.join(SENTENCES).split()
+    return ' '.join(words[i % len(words)] for i in range(num_words))
+
+def formant_envelope(frequencies, formants, bandwidth=80.0):
+    """Magnitude of a cascade of second-order resonators at the given frequencies"""
+    gain = np.ones_like(frequencies)
+    for formant in formants:
+        gain *= formant ** 2 / np.sqrt((formant ** 2 - frequencies ** 2) ** 2 + (bandwidth * frequencies) ** 2)
+    return gain
+
+def synthesize_syllable(vowel, stressed, rng):
+    duration = 0.22 if stressed else 0.16
+    f0 = (165.0 if stressed else 125.0) * (1 + rng.normal(0, 0.02))
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    # Gentle declination within the syllable
+    pitch = f0 * (1.0 - 0.08 * t / duration)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    formants = VOWEL_FORMANTS.get(vowel, VOWEL_FORMANTS['AH'])
+    harmonics = np.arange(1, int(4000 / f0))
+    amplitudes = formant_envelope(harmonics * f0, formants) / harmonics
+    signal = (amplitudes[:, None] * np.sin(harmonics[:, None] * phase[None, :])).sum(axis=0)
+    envelope = np.sin(np.pi * t / duration) ** 0.5
+    level = 1.0 if stressed else 0.45
+    return level * envelope * signal / np.abs(signal).max()
+
+def synthesize(transcription, seed):
+    """Deterministic speech-like recording of transcription; returns float samples"""
+    from pronunciation_analyzer import tokenize, estimate_syllables
+    from lexicon import lookup_word
+
+    rng = np.random.default_rng(seed)
+    parts = [np.zeros(int(0.3 * SAMPLE_RATE))]
+    for word in tokenize(transcription):
+        entry = lookup_word(word)
+        if entry:
+            syllables = [(phone.rstrip('012'), phone[-1] == '1') for phone in entry.phones if phone[-1].isdigit()]
+        else:
+            syllables = [('AH', i == 0) for i in range(estimate_syllables(word))]
+        for vowel, stressed in syllables:
+            parts.append(synthesize_syllable(vowel, stressed, rng))
+            parts.append(np.zeros(int(0.03 * SAMPLE_RATE)))
+        parts.append(np.zeros(int(rng.uniform(0.05, 0.45) * SAMPLE_RATE)))
+    samples = np.concatenate(parts)
+    samples = 0.8 * samples / np.abs(samples).max() + rng.normal(0, 0.002, len(samples))
+    return np.clip(samples, -1, 1)
+
+def write_wav(path, samples):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((samples * 32767).astype('<i2').tobytes())
+
+def run_case(name, repeats):
+    num_words, alignment = CASES[name]
+    transcription = case_text(num_words)
+    with tempfile.TemporaryDirectory() as directory:
+        # Private feature cache: the warm-up fills it, 'cached_features' then measures a hit
+        os.environ['PRONUNCIATION_FEATURE_CACHE_DIR'] = os.path.join(directory, 'features')
+        import parselmouth
+        import pronunciation_analyzer as analyzer
+
+        audio_path = os.path.join(directory, f'{name}.wav')
+        write_wav(audio_path, synthesize(transcription, seed=num_words))
+
+        # Warm up the lexicon and Praat once so the first measured run is not an outlier
+        analyzer.analyze_pronunciation(audio_path, transcription, alignment)
+
+        stages = {
+            stage: [] for stage in ('load', 'to_pitch', 'to_intensity', 'windowing', 'scoring', 'total', 'cached_features')
+        }
+        for _ in range(repeats):
+            started = time.perf_counter()
+            sound = parselmouth.Sound(audio_path)
+            settings = analyzer.feature_settings(sound.duration)
+            loaded = time.perf_counter()
+            pitch = sound.to_pitch(
+                time_step=settings.pitch_step, pitch_floor=settings.pitch_floor, pitch_ceiling=settings.pitch_ceiling
+            )
+            pitched = time.perf_counter()
+            intensity = sound.to_intensity(minimum_pitch=settings.intensity_min_pitch, time_step=settings.intensity_step)
+            intensified = time.perf_counter()
+            tracks = analyzer._tracks_from_features(**analyzer._features_from_praat(pitch, intensity))
+            segments = analyzer.speech_segments(tracks)
+            words = analyzer.tokenize(transcription)
+            lexicon = analyzer._lexicon_entries(words)
+            starts, ends, edges, alignment_used = analyzer._word_windows(lexicon, segments, sound.duration, alignment)
+            windowed = time.perf_counter()
+            word_analyses = analyzer._analyze_words(range(len(words)), words, lexicon, tracks, starts, ends, edges)
+            speech = analyzer.speech_metrics(segments, len(words), tracks)
+            result = analyzer._score(transcription, word_analyses, sound.duration, alignment_used, speech)
+            scored = time.perf_counter()
+
+            stages['load'].append(loaded - started)
+            stages['to_pitch'].append(pitched - loaded)
+            stages['to_intensity'].append(intensified - pitched)
+            stages['windowing'].append(windowed - intensified)
+            stages['scoring'].append(scored - windowed)
+            stages['total'].append(scored - started)
+
+            cache_started = time.perf_counter()
+            analyzer._prosody_tracks(sound)
+            stages['cached_features'].append(time.perf_counter() - cache_started)
+
+        # The staged run must be exactly what callers get
+        reference = analyzer.analyze_pronunciation(audio_path, transcription, alignment)
+        if reference != result:
+            raise RuntimeError(f'{name}: staged result differs from analyze_pronunciation')
+
+    total = statistics.median(stages['total'])
+    return {
+        'case': name,
+        'words': len(words),
+        'audio_seconds': result['metrics']['audioDuration'],
+        'stages_ms': {stage: statistics.median(times) * 1000 for stage, times in stages.items()},
+        'realtime_factor': result['metrics']['audioDuration'] / total if total > 0 else 0,
+        'recordings_per_second': 1 / total if total > 0 else 0,
+        # ru_maxrss is reported in KiB on Linux
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'scores': {
+            'pronunciationScore': result['pronunciationScore'],
+            'stressPatternMatch': result['metrics']['stressPatternMatch'],
+            'alignment': result['metrics'].get('alignment'),
+            'actualStress': [w['actualStress'] for w in result['words']],
+        },
+    }
+
+def run_in_subprocess(name, repeats):
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', name, '--repeats', str(repeats)],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def compare_with_golden(report, golden, tolerance):
+    """Differences between a case's scores and its golden output, as readable lines"""
+    expected = golden.get(report['case'])
+    if expected is None:
+        return [f"no golden output (run with --update-golden)"]
+    actual = report['scores']
+    problems = []
+    for key in ('pronunciationScore', 'stressPatternMatch'):
+        if abs(actual[key] - expected[key]) > tolerance:
+            problems.append(f"{key} {expected[key]:.3f} -> {actual[key]:.3f}")
+    if actual['alignment'] != expected.get('alignment'):
+        problems.append(f"alignment {expected.get('alignment')} -> {actual['alignment']}")
+    changed = [
+        i for i, (old, new) in enumerate(zip(expected['actualStress'], actual['actualStress'])) if old != new
+    ]
+    if changed or len(expected['actualStress']) != len(actual['actualStress']):
+        problems.append(f"actualStress changed for {len(changed)} of {len(expected['actualStress'])} words {changed[:10]}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', default=','.join(CASES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.01, help='allowed score difference in points')
+    parser.add_argument('--update-golden', action='store_true', help='store the current scores as golden outputs')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_case(args.worker, args.repeats)))
+        return 0
+
+    names = [name.strip() for name in args.cases.split(',') if name.strip()]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        print(f"Unknown cases: {', '.join(unknown)}. Available: {', '.join(CASES)}")
+        return 1
+    reports = [run_in_subprocess(name, args.repeats) for name in names]
+
+    stage_names = list(reports[0]['stages_ms'])
+    print(f"{'case':16}{'words':>7}{'audio s':>9}" + ''.join(f"{stage:>17}" for stage in stage_names)
+          + f"{'x realtime':>12}{'rec/s':>8}{'RSS MB':>8}")
+    for report in reports:
+        print(f"{report['case']:16}{report['words']:>7}{report['audio_seconds']:>9.1f}"
+              + ''.join(f"{report['stages_ms'][stage]:>15.1f}ms" for stage in stage_names)
+              + f"{report['realtime_factor']:>12.1f}{report['recordings_per_second']:>8.1f}{report['max_rss_mb']:>8.0f}")
+
+    golden = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH, 'r', encoding='utf-8') as f:
+            golden = json.load(f)
+
+    if args.update_golden:
+        for report in reports:
+            golden[report['case']] = report['scores']
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(golden, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nUpdated golden outputs for {', '.join(names)}")
+        return 0
+
+    failed = False
+    print()
+    for report in reports:
+        problems = compare_with_golden(report, golden, args.tolerance)
+        print(f"{report['case']:16}score {report['scores']['pronunciationScore']:.2f}  "
+              + ('OK' if not problems else 'CHANGED: ' + '; '.join(problems)))
+        failed = failed or bool(problems)
+
+    if failed:
+        print("FAIL: scores differ from golden outputs")
+        return 1
+    print("PASS")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+On-disk cache of extracted prosody features for the pronunciation analyzer.
+
+Re-submitted or re-graded recordings skip pitch and intensity extraction:
+tracks are stored as float32 .npz files keyed by a hash of the audio samples
+plus the extraction parameters, in a directory bounded to
+PRONUNCIATION_FEATURE_CACHE_MB (least recently used files are evicted).
+Several worker processes can share the directory: files are written
+atomically and a corrupt or half-evicted entry is just a miss.
+Set PRONUNCIATION_FEATURE_CACHE_MB=0 to disable.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+CACHE_DIR = os.getenv(
+    'PRONUNCIATION_FEATURE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.feature-cache')
+)
+MAX_BYTES = int(float(os.getenv('PRONUNCIATION_FEATURE_CACHE_MB', '256')) * 1024 * 1024)
+# Evict down to this fraction of MAX_BYTES so eviction does not run on every write
+EVICT_TO = 0.8
+
+
+class FeatureCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, samples, sampling_frequency, params):
+        """Content hash of the samples together with everything that affects extraction"""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(np.ascontiguousarray(samples).view(np.uint8))
+        digest.update(json.dumps({'fs': float(sampling_frequency), **params}, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+            # Mark as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, EOFError) as e:
+            print(f"Warning: dropping unreadable feature cache entry {path} ({e})", file=sys.stderr)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.misses += 1
+            return None
+        self.hits += 1
+        return arrays
+
+    def put(self, key, **arrays):
+        try:
+            fd, staging = tempfile.mkstemp(prefix='.tmp-', suffix='.npz', dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(staging, self._path(key))
+        except OSError as e:
+            print(f"Warning: could not write feature cache entry ({e})", file=sys.stderr)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.npz') and not entry.name.startswith('.tmp-'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+        except OSError:
+            return
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                # Another worker evicted it first
+                total -= size
+            except OSError:
+                continue
+
+
+_cache = None
+_cache_disabled = False
+
+
+def get_feature_cache():
+    """The process-wide cache, or None when disabled or the directory is unusable"""
+    global _cache, _cache_disabled
+    if _cache is None and not _cache_disabled:
+        if MAX_BYTES <= 0:
+            _cache_disabled = True
+            return None
+        try:
+            _cache = FeatureCache(CACHE_DIR, MAX_BYTES)
+        except OSError as e:
+            print(f"Warning: feature cache disabled, cannot use {CACHE_DIR} ({e})", file=sys.stderr)
+            _cache_disabled = True
+    return _cache
@@ -0,0 +1,193 @@
+"""
+Precomputed CMUdict lexicon for the pronunciation analyzer.
+
+The first pronunciation of every CMUdict word (what
+pronouncing.phones_for_word(word)[0] returns) is stored as a handful of
+.npy arrays that are memory-mapped on load, so worker processes start
+without parsing the dictionary:
+
+    words.npy          sorted fixed-width UTF-8 words (binary searched)
+    phone_offsets.npy  int32, phones of word i are phones[offsets[i]:offsets[i + 1]]
+    phones.npy         uint8 ids into the symbol table in meta.json
+    syllables.npy      uint8 syllable (vowel) count per word
+
+Build ahead of time with `python lexicon.py`; otherwise it is built on first use.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+LEXICON_DIR = os.getenv(
+    'PRONUNCIATION_LEXICON_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.lexicon')
+)
+FORMAT_VERSION = 1
+
+# phones keep their stress digits ("AE1"), phonemes do not ("AE"); stress has one
+# entry per phone (0 for consonants), matching extract_stress_pattern
+LexiconEntry = namedtuple('LexiconEntry', ['phones', 'phonemes', 'stress', 'syllables'])
+
+
+class Lexicon:
+    def __init__(self, words, phone_offsets, phones, syllables, symbols):
+        self.words = words
+        self.phone_offsets = phone_offsets
+        self.phones = phones
+        self.syllables = syllables
+        self.symbols = symbols
+        self._phonemes = [symbol.rstrip('012') for symbol in symbols]
+        self._stress = [int(symbol[-1]) if symbol[-1].isdigit() else 0 for symbol in symbols]
+
+    def __len__(self):
+        return len(self.words)
+
+    def lookup(self, word):
+        key = word.encode('utf-8')
+        if not key or len(key) > self.words.dtype.itemsize:
+            return None
+        index = int(np.searchsorted(self.words, key))
+        if index >= len(self.words) or self.words[index] != key:
+            return None
+
+        ids = self.phones[self.phone_offsets[index]:self.phone_offsets[index + 1]].tolist()
+        return LexiconEntry(
+            phones=tuple(self.symbols[i] for i in ids),
+            phonemes=tuple(self._phonemes[i] for i in ids),
+            stress=tuple(self._stress[i] for i in ids),
+            syllables=int(self.syllables[index])
+        )
+
+
+def _compile(pronunciations):
+    """Array form of (word, phones string) pairs, keeping the first pronunciation per word"""
+    first = {}
+    for word, phones in pronunciations:
+        first.setdefault(word, phones.split())
+
+    words = sorted(first)
+    symbols = sorted({symbol for phones in first.values() for symbol in phones})
+    symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+
+    phone_offsets = np.zeros(len(words) + 1, dtype=np.int32)
+    phone_offsets[1:] = np.cumsum([len(first[word]) for word in words])
+    phones = np.fromiter(
+        (symbol_ids[symbol] for word in words for symbol in first[word]),
+        dtype=np.uint8,
+        count=int(phone_offsets[-1])
+    )
+    syllables = np.array(
+        [sum(1 for symbol in first[word] if symbol[-1].isdigit()) for word in words],
+        dtype=np.uint8
+    )
+    encoded = np.array([word.encode('utf-8') for word in words])
+    return Lexicon(encoded, phone_offsets, phones, syllables, symbols)
+
+
+def _cmudict_version():
+    import cmudict
+    return getattr(cmudict, '__version__', 'unknown')
+
+
+def build_lexicon(directory=LEXICON_DIR):
+    """Parse CMUdict and write the array files to directory. Returns the in-memory Lexicon."""
+    import cmudict
+    import pronouncing
+
+    stream = cmudict.dict_stream()
+    try:
+        lexicon = _compile(pronouncing.parse_cmu(stream))
+    finally:
+        stream.close()
+
+    meta = {
+        'format': FORMAT_VERSION,
+        'cmudict': _cmudict_version(),
+        'count': len(lexicon),
+        'symbols': lexicon.symbols
+    }
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.lexicon-', dir=parent)
+    try:
+        np.save(os.path.join(staging, 'words.npy'), lexicon.words)
+        np.save(os.path.join(staging, 'phone_offsets.npy'), lexicon.phone_offsets)
+        np.save(os.path.join(staging, 'phones.npy'), lexicon.phones)
+        np.save(os.path.join(staging, 'syllables.npy'), lexicon.syllables)
+        with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+        # Readers only ever see a complete directory; a concurrent builder may win the rename
+        os.replace(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not _is_current(directory):
+            raise
+    return lexicon
+
+
+def _is_current(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get('format') == FORMAT_VERSION and meta.get('cmudict') == _cmudict_version()
+
+
+def load_lexicon(directory=LEXICON_DIR):
+    """Memory-map the prebuilt lexicon, building it first if missing or stale"""
+    if _is_current(directory):
+        try:
+            with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            return Lexicon(
+                np.load(os.path.join(directory, 'words.npy'), mmap_mode='r'),
+                np.load(os.path.join(directory, 'phone_offsets.npy'), mmap_mode='r'),
+                np.load(os.path.join(directory, 'phones.npy'), mmap_mode='r'),
+                np.load(os.path.join(directory, 'syllables.npy'), mmap_mode='r'),
+                meta['symbols']
+            )
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: could not load lexicon from {directory} ({e}), rebuilding", file=sys.stderr)
+
+    try:
+        return build_lexicon(directory)
+    except OSError as e:
+        # Read-only install: keep the compiled arrays in memory for this process
+        print(f"Warning: could not write lexicon to {directory} ({e})", file=sys.stderr)
+        import cmudict
+        import pronouncing
+        stream = cmudict.dict_stream()
+        try:
+            return _compile(pronouncing.parse_cmu(stream))
+        finally:
+            stream.close()
+
+
+_lexicon = None
+
+
+def get_lexicon():
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = load_lexicon()
+    return _lexicon
+
+
+@lru_cache(maxsize=65536)
+def lookup_word(word):
+    """LexiconEntry for a cleaned, lower-case word, or None if it is not in CMUdict"""
+    return get_lexicon().lookup(word)
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else LEXICON_DIR
+    lexicon = build_lexicon(directory)
+    print(json.dumps({'directory': directory, 'words': len(lexicon), 'symbols': len(lexicon.symbols)}))
@@ -1,8 +1,16 @@
 import sys
+import base64
+import binascii
+import io
 import json
 import os
+import struct
+from collections import namedtuple
+from functools import lru_cache
 import numpy as np
-import pronouncing
+
+from feature_cache import get_feature_cache
+from lexicon import get_lexicon, lookup_word
 
 try:
     import parselmouth
@@ -11,9 +19,47 @@ except ImportError:
     PARSELMOUTH_AVAILABLE = False
     print("Warning: parselmouth not available. Pronunciation analysis will be limited.", file=sys.stderr)
 
+# 'uniform' splits the audio evenly between words; set PRONUNCIATION_ALIGNMENT=nuclei
+# to align words to detected syllable nuclei instead (changes scores)
+ALIGNMENT_MODE = os.getenv('PRONUNCIATION_ALIGNMENT', 'uniform')
+# Streaming mode analyzes the audio in overlapping chunks of this length
+CHUNK_SECONDS = float(os.getenv('PRONUNCIATION_CHUNK_SECONDS', '10'))
+CHUNK_OVERLAP_SECONDS = float(os.getenv('PRONUNCIATION_CHUNK_OVERLAP_SECONDS', '1'))
+# Bump when pitch/intensity extraction changes so cached features are not reused
+FEATURE_VERSION = 1
+# Frames quieter than the loudest (0.99 quantile) level minus this are silence
+SILENCE_DB = 25.0
+# Silent runs at least this long (seconds) inside the speech region count as pauses
+MIN_PAUSE_SECONDS = 0.3
+# Pitch range (Hz) and intensity window of the feature extraction pass
+PITCH_FLOOR = float(os.getenv('PRONUNCIATION_PITCH_FLOOR', '75'))
+PITCH_CEILING = float(os.getenv('PRONUNCIATION_PITCH_CEILING', '600'))
+INTENSITY_MIN_PITCH = float(os.getenv('PRONUNCIATION_INTENSITY_MIN_PITCH', '100'))
+# Recordings longer than this are analyzed with coarser frame steps (seconds);
+# shorter ones use Praat's defaults (0.75 / pitch floor and 0.8 / minimum pitch / 4)
+LONG_AUDIO_SECONDS = float(os.getenv('PRONUNCIATION_LONG_AUDIO_SECONDS', '60'))
+LONG_AUDIO_PITCH_STEP = float(os.getenv('PRONUNCIATION_LONG_AUDIO_PITCH_STEP', '0.02'))
+LONG_AUDIO_INTENSITY_STEP = float(os.getenv('PRONUNCIATION_LONG_AUDIO_INTENSITY_STEP', '0.016'))
+
+# Frame times and values of the Praat pitch and intensity tracks
+ProsodyTracks = namedtuple('ProsodyTracks', ['pitch_xs', 'pitch_values', 'intensity_xs', 'intensity_values'])
+# Parameters of one extraction pass; None time steps mean Praat's default
+FeatureSettings = namedtuple(
+    'FeatureSettings', ['pitch_step', 'pitch_floor', 'pitch_ceiling', 'intensity_step', 'intensity_min_pitch']
+)
+# Syllable nuclei, pauses as (start, end) and the speech region found in the intensity track
+SpeechSegments = namedtuple('SpeechSegments', ['nuclei', 'pauses', 'speech_start', 'speech_end'])
+
+_PUNCTUATION = str.maketrans('', '', '.,!?;:()"\'')
+
+@lru_cache(maxsize=65536)
 def clean_word(word):
     """Remove punctuation from word"""
-    return word.lower().replace('.', '').replace(',', '').replace('!', '').replace('?', '').replace(';', '').replace(':', '').replace('(', '').replace(')', '').replace('"', '').replace("'", '').strip()
+    return word.lower().translate(_PUNCTUATION).strip()
+
+def tokenize(transcription):
+    """Cleaned, non-empty words of a transcription"""
+    return [word for word in map(clean_word, transcription.split()) if word]
 
 def extract_stress_pattern(pronunciation):
     """Extract stress pattern from CMU pronunciation. Format: "K AE1 T" where 1=primary stress, 2=secondary, 0=unstressed"""
@@ -41,8 +87,12 @@ def estimate_syllables(word):
     matches = [c for c in word if c in 'aeiouy']
     return max(1, len(matches))
 
-def detect_stress_from_prosody(pitch_values, intensity_values, num_syllables):
-    """Detect stress pattern from prosodic features. Higher pitch + higher intensity = stressed syllable"""
+def detect_stress_from_prosody(pitch_values, intensity_values, num_syllables, syllable_edges=None):
+    """
+    Detect stress pattern from prosodic features. Higher pitch + higher intensity = stressed syllable.
+    syllable_edges (num_syllables + 1 fractions of the word window) come from alignment;
+    without them the word is split into equal segments.
+    """
     if len(pitch_values) == 0 or len(intensity_values) == 0 or num_syllables == 0:
         return [0] * num_syllables
     
@@ -65,8 +115,15 @@ def detect_stress_from_prosody(pitch_values, intensity_values, num_syllables):
     syllable_scores = []
     
     for i in range(num_syllables):
-        start_idx = i * segment_size
-        end_idx = min((i + 1) * segment_size, len(pitch_values))
+        if syllable_edges is not None:
+            start_idx = int(round(syllable_edges[i] * len(pitch_values)))
+            end_idx = int(round(syllable_edges[i + 1] * len(pitch_values)))
+            intensity_start = int(round(syllable_edges[i] * len(intensity_values)))
+            intensity_end = int(round(syllable_edges[i + 1] * len(intensity_values)))
+        else:
+            start_idx = i * segment_size
+            end_idx = min((i + 1) * segment_size, len(pitch_values))
+            intensity_start, intensity_end = start_idx, end_idx
         
         if start_idx >= len(pitch_values):
             detected_stress.append(0)
@@ -74,7 +131,7 @@ def detect_stress_from_prosody(pitch_values, intensity_values, num_syllables):
             continue
         
         segment_pitch = pitch_values[start_idx:end_idx]
-        segment_intensity = intensity_values[start_idx:end_idx] if start_idx < len(intensity_values) else []
+        segment_intensity = intensity_values[intensity_start:intensity_end] if intensity_start < len(intensity_values) else []
         
         segment_pitch_valid = segment_pitch[(segment_pitch > 0) & ~np.isnan(segment_pitch)]
         segment_intensity_valid = segment_intensity[~np.isnan(segment_intensity)] if len(segment_intensity) > 0 else []
@@ -101,6 +158,180 @@ def detect_stress_from_prosody(pitch_values, intensity_values, num_syllables):
     
     return detected_stress
 
+def window_bounds(xs, starts, ends):
+    """Index ranges [lo, hi) of the sorted frame times xs falling inside each [start, end] window"""
+    lo = np.searchsorted(xs, starts, side='left')
+    hi = np.searchsorted(xs, ends, side='right')
+    return lo, hi
+
+def window_means(values, valid, lo, hi):
+    """
+    Mean of values[valid] inside every [lo, hi) window in one pass.
+
+    Uses prefix sums rather than np.add.reduceat because adjacent windows
+    share their boundary frame (both ends are inclusive).
+    """
+    masked = np.where(valid, values, 0.0)
+    sums = np.concatenate(([0.0], np.cumsum(masked)))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    window_sums = sums[hi] - sums[lo]
+    window_counts = counts[hi] - counts[lo]
+    return np.divide(window_sums, window_counts, out=np.zeros(len(lo)), where=window_counts > 0)
+
+def detect_syllable_nuclei(intensity_xs, intensity_values, pitch_xs, pitch_values,
+                           silence_db=SILENCE_DB, min_dip_db=2.0, min_pause=MIN_PAUSE_SECONDS, threshold=None):
+    """
+    Energy/voicing syllable nucleus detection (de Jong & Wempe style).
+
+    A nucleus is a voiced intensity peak above the silence threshold (0.99
+    quantile minus silence_db, unless threshold is given) that is separated
+    from the previous nucleus by a dip of at least min_dip_db. Returns
+    (nucleus times, pauses as (start, end) tuples of at least min_pause
+    seconds, speech start, speech end).
+    """
+    finite = np.isfinite(intensity_values)
+    if not finite.any():
+        return np.array([]), [], 0.0, 0.0
+    
+    if threshold is None:
+        levels = intensity_values[finite]
+        threshold = max(np.quantile(levels, 0.99) - silence_db, np.min(levels))
+    values = np.where(finite, intensity_values, -np.inf)
+    
+    speaking = values > threshold
+    if not speaking.any():
+        return np.array([]), [], 0.0, 0.0
+    speech_frames = np.flatnonzero(speaking)
+    speech_start = float(intensity_xs[speech_frames[0]])
+    speech_end = float(intensity_xs[speech_frames[-1]])
+    
+    peaks = np.flatnonzero((values[1:-1] > values[:-2]) & (values[1:-1] >= values[2:]) & speaking[1:-1]) + 1
+    kept = []
+    for peak in peaks:
+        if kept and values[peak] - values[kept[-1]:peak + 1].min() < min_dip_db:
+            # Same syllable: keep the louder of the two peaks
+            if values[peak] > values[kept[-1]]:
+                kept[-1] = peak
+            continue
+        kept.append(peak)
+    
+    nuclei = intensity_xs[np.array(kept, dtype=int)]
+    voiced = ((pitch_values > 0) & ~np.isnan(pitch_values)).astype(float)
+    if len(pitch_xs) > 0:
+        nuclei = nuclei[np.interp(nuclei, pitch_xs, voiced) > 0]
+    
+    # Silent runs inside the speech region
+    silent = np.concatenate(([False], ~speaking[speech_frames[0]:speech_frames[-1] + 1], [False]))
+    changes = np.flatnonzero(np.diff(silent.astype(int)))
+    frame_step = intensity_xs[1] - intensity_xs[0] if len(intensity_xs) > 1 else 0.0
+    pauses = []
+    for run_start, run_end in zip(changes[::2], changes[1::2]):
+        start = float(intensity_xs[speech_frames[0] + run_start])
+        end = float(intensity_xs[speech_frames[0] + run_end - 1]) + frame_step
+        if end - start >= min_pause:
+            pauses.append((start, end))
+    
+    return nuclei, pauses, speech_start, speech_end
+
+def speech_segments(tracks, threshold=None):
+    """Nuclei, pauses and speech region of ProsodyTracks, shared by word alignment and speech metrics"""
+    return SpeechSegments(*detect_syllable_nuclei(
+        tracks.intensity_xs, tracks.intensity_values, tracks.pitch_xs, tracks.pitch_values, threshold=threshold
+    ))
+
+def speech_metrics(segments, num_words, tracks):
+    """
+    Fluency measures from the speech segments: speech rate in words per
+    minute over the speaking time (pauses included), number and total length
+    of pauses, articulation rate in syllable nuclei per second of phonation
+    (pauses excluded) and the voiced share of the speaking time.
+    """
+    speaking_time = segments.speech_end - segments.speech_start
+    pause_time = sum(end - start for start, end in segments.pauses)
+    phonation_time = max(0.0, speaking_time - pause_time)
+    
+    in_speech = (tracks.pitch_xs >= segments.speech_start) & (tracks.pitch_xs <= segments.speech_end)
+    voiced = in_speech & (tracks.pitch_values > 0) & ~np.isnan(tracks.pitch_values)
+    speech_frames = int(np.sum(in_speech))
+    
+    return {
+        'speechRate': float(num_words / speaking_time * 60) if speaking_time > 0 else 0.0,
+        'pauseCount': len(segments.pauses),
+        'pauseDuration': float(pause_time),
+        'articulationRate': float(len(segments.nuclei) / phonation_time) if phonation_time > 0 else 0.0,
+        'phonationTime': float(phonation_time),
+        'voicedFraction': float(np.sum(voiced) / speech_frames) if speech_frames > 0 else 0.0
+    }
+
+def align_words(syllable_counts, nuclei, pauses, speech_start, speech_end):
+    """
+    Word and syllable boundaries from detected nuclei.
+
+    Nuclei are shared out over the words in proportion to their dictionary
+    syllable counts (at least one per word). Words are cut halfway between
+    neighbouring nuclei, or at the edges of a pause lying between them.
+    Returns (starts, ends, per-word syllable edge fractions or None), or
+    None when there are fewer nuclei than words to anchor.
+    """
+    counts = np.maximum(np.asarray(syllable_counts, dtype=int), 1)
+    num_words = len(counts)
+    num_nuclei = len(nuclei)
+    if num_words == 0 or num_nuclei < num_words:
+        return None
+    
+    # Index of each word's first nucleus, kept strictly increasing so every word gets one
+    cumulative = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    first = np.rint(cumulative * num_nuclei / counts.sum()).astype(int)
+    offsets = np.clip(first - np.arange(num_words), 0, num_nuclei - num_words)
+    first = np.maximum.accumulate(offsets) + np.arange(num_words)
+    return place_words(counts, nuclei, first, pauses, speech_start, speech_end)
+
+def place_words(counts, nuclei, first, pauses, speech_start, speech_end):
+    """Boundaries for words whose first nuclei are nuclei[first] (see align_words)"""
+    num_words = len(first)
+    last = np.append(first[1:], len(nuclei))
+    
+    pause_starts = np.array([p[0] for p in pauses])
+    starts = np.empty(num_words)
+    ends = np.empty(num_words)
+    starts[0] = speech_start
+    ends[-1] = speech_end
+    for w in range(1, num_words):
+        before, after = nuclei[first[w] - 1], nuclei[first[w]]
+        k = np.searchsorted(pause_starts, before, side='right')
+        if k < len(pauses) and pauses[k][1] <= after:
+            ends[w - 1], starts[w] = pauses[k]
+        else:
+            ends[w - 1] = starts[w] = (before + after) / 2
+    
+    syllable_edges = []
+    for w in range(num_words):
+        word_nuclei = nuclei[first[w]:last[w]]
+        span = ends[w] - starts[w]
+        if counts[w] > 1 and len(word_nuclei) == counts[w] and span > 0:
+            cuts = (word_nuclei[:-1] + word_nuclei[1:]) / 2
+            syllable_edges.append(np.concatenate(([0.0], (cuts - starts[w]) / span, [1.0])))
+        else:
+            syllable_edges.append(None)
+    
+    return starts, ends, syllable_edges
+
+def phoneme_edges(phones, syllable_edges):
+    """
+    Spread aligned syllable edges over a CMU phone list, which is what the
+    per-phoneme stress pattern is scored against: each syllable span is shared
+    equally by its onset consonants and vowel, coda consonants join the last syllable.
+    """
+    vowels = [i for i, phone in enumerate(phones) if phone[-1].isdigit()]
+    groups = np.searchsorted(vowels, np.arange(len(phones)), side='left')
+    groups = np.minimum(groups, len(vowels) - 1)
+    edges = []
+    for syllable in range(len(vowels)):
+        size = int(np.sum(groups == syllable))
+        edges.extend(np.linspace(syllable_edges[syllable], syllable_edges[syllable + 1], size + 1)[:-1])
+    edges.append(1.0)
+    return np.array(edges)
+
 def compare_stress_patterns(expected, actual):
     """Compare expected and actual stress patterns. Returns: match percentage (0-100)"""
     if len(expected) == 0 or len(actual) == 0:
@@ -120,16 +351,15 @@ def compare_stress_patterns(expected, actual):
 
 def analyze_pronunciation_text_only(transcription):
     """Fallback function: analyze pronunciation from text only (when parselmouth is not available)"""
-    words = [clean_word(w) for w in transcription.split() if clean_word(w)]
+    words = tokenize(transcription)
     word_analyses = []
     
     for word in words:
-        pronunciation = pronouncing.phones_for_word(word)
-        pronunciation = pronunciation[0] if pronunciation else None
+        entry = lookup_word(word)
         
-        if pronunciation:
-            expected_stress = extract_stress_pattern(pronunciation)
-            phonemes = [p.replace('0', '').replace('1', '').replace('2', '') for p in pronunciation.split()]
+        if entry:
+            expected_stress = list(entry.stress)
+            phonemes = list(entry.phonemes)
             syllable_count = len(expected_stress)
         else:
             syllable_count = estimate_syllables(word)
@@ -173,172 +403,820 @@ def analyze_pronunciation_text_only(transcription):
         'detailedFeedback': f'Text-based analysis only (estimated score: {pronunciation_score:.1f}%). Install parselmouth for accurate audio-based pronunciation scoring.'
     }
 
-def analyze_pronunciation(audio_path, transcription):
-    """Main function to analyze pronunciation and stress from audio"""
-    try:
-        if not PARSELMOUTH_AVAILABLE:
-            return analyze_pronunciation_text_only(transcription)
+def _lexicon_entries(words):
+    """(phones, expected stress, phonemes, syllable count, spoken syllables) per word"""
+    lexicon = []
+    for word in words:
+        entry = lookup_word(word)
         
-        sound = parselmouth.Sound(audio_path)
-        pitch = sound.to_pitch()
-        intensity = sound.to_intensity()
+        if entry:
+            phones = entry.phones
+            expected_stress = list(entry.stress)
+            phonemes = list(entry.phonemes)
+            syllable_count = len(expected_stress)
+            spoken_syllables = entry.syllables
+        else:
+            phones = None
+            syllable_count = estimate_syllables(word)
+            expected_stress = [1] + [0] * (syllable_count - 1) if syllable_count > 0 else [0]
+            phonemes = []
+            spoken_syllables = syllable_count
+        lexicon.append((phones, expected_stress, phonemes, syllable_count, spoken_syllables))
+    return lexicon
+
+def _features_from_praat(pitch, intensity):
+    """
+    Pitch and intensity tracks in the compact form the feature cache stores:
+    float32 values and (x1, dx) time axes. Fresh and cached tracks both go
+    through this form so a cache hit scores exactly like a miss.
+    """
+    return {
+        'pitch_time': np.array([pitch.x1, pitch.dx]),
+        'pitch_values': pitch.selected_array['frequency'].astype(np.float32),
+        'intensity_time': np.array([intensity.x1, intensity.dx]),
+        'intensity_values': intensity.values[0].astype(np.float32),
+    }
+
+def _tracks_from_features(pitch_time, pitch_values, intensity_time, intensity_values):
+    return ProsodyTracks(
+        pitch_time[0] + pitch_time[1] * np.arange(len(pitch_values)),
+        pitch_values.astype(np.float64),
+        intensity_time[0] + intensity_time[1] * np.arange(len(intensity_values)),
+        intensity_values.astype(np.float64)
+    )
+
+def feature_settings(duration):
+    """Extraction parameters for a recording of duration seconds: coarser frame steps for long audio"""
+    long_audio = duration > LONG_AUDIO_SECONDS
+    return FeatureSettings(
+        pitch_step=LONG_AUDIO_PITCH_STEP if long_audio else None,
+        pitch_floor=PITCH_FLOOR,
+        pitch_ceiling=PITCH_CEILING,
+        intensity_step=LONG_AUDIO_INTENSITY_STEP if long_audio else None,
+        intensity_min_pitch=INTENSITY_MIN_PITCH
+    )
+
+def _extract_features(sound, settings):
+    """Pitch (which also gives voicing) and intensity of sound in one pass with the given settings"""
+    pitch = sound.to_pitch(
+        time_step=settings.pitch_step, pitch_floor=settings.pitch_floor, pitch_ceiling=settings.pitch_ceiling
+    )
+    intensity = sound.to_intensity(minimum_pitch=settings.intensity_min_pitch, time_step=settings.intensity_step)
+    return _features_from_praat(pitch, intensity)
+
+def _prosody_tracks(sound, settings=None, use_cache=True):
+    """Pitch and intensity tracks of sound, from the feature cache when it has seen the same audio"""
+    settings = settings or feature_settings(sound.duration)
+    cache = get_feature_cache() if use_cache else None
+    if cache is None:
+        return _tracks_from_features(**_extract_features(sound, settings))
+    
+    key = cache.key(sound.values, sound.sampling_frequency, {
+        'features': FEATURE_VERSION,
+        'parselmouth': parselmouth.VERSION,
+        'praat': parselmouth.PRAAT_VERSION,
+        'settings': settings._asdict(),
+    })
+    features = cache.get(key)
+    if features is None:
+        features = _extract_features(sound, settings)
+        cache.put(key, **features)
+    return _tracks_from_features(**features)
+
+def _word_syllable_edges(lexicon, indices, spans):
+    edges = {}
+    for i, span in zip(indices, spans):
+        if span is not None:
+            phones = lexicon[i][0]
+            edges[i] = phoneme_edges(phones, span) if phones else span
+    return edges
+
+def _word_windows(lexicon, segments, audio_duration, alignment):
+    """Word start/end times, syllable edges by word index and the alignment actually used"""
+    num_words = len(lexicon)
+    word_duration = audio_duration / num_words if num_words > 0 else 0
+    starts = np.arange(num_words) * word_duration
+    ends = starts + word_duration
+    
+    if alignment == 'nuclei' and num_words > 0:
+        aligned = align_words([entry[4] for entry in lexicon], *segments)
+        if aligned is not None:
+            starts, ends, spans = aligned
+            return starts, ends, _word_syllable_edges(lexicon, range(num_words), spans), 'nuclei'
+    
+    return starts, ends, {}, 'uniform'
+
+def _analyze_words(indices, words, lexicon, tracks, starts, ends, syllable_edges):
+    """Per-word analyses for the given word indices; starts/ends are indexed like words"""
+    indices = list(indices)
+    if not indices:
+        return []
+    
+    # Frame time axes are searched once for all words and per-word averages
+    # come from a single vectorized pass
+    pitch_lo, pitch_hi = window_bounds(tracks.pitch_xs, starts[indices], ends[indices])
+    intensity_lo, intensity_hi = window_bounds(tracks.intensity_xs, starts[indices], ends[indices])
+    
+    pitch_values = tracks.pitch_values
+    intensity_values = tracks.intensity_values
+    valid_pitch_mask = (pitch_values > 0) & ~np.isnan(pitch_values)
+    valid_intensity_mask = ~np.isnan(intensity_values)
+    word_avg_pitch = window_means(pitch_values, valid_pitch_mask, pitch_lo, pitch_hi)
+    word_avg_intensity = window_means(intensity_values, valid_intensity_mask, intensity_lo, intensity_hi)
+    
+    word_analyses = []
+    for n, i in enumerate(indices):
+        _, expected_stress, phonemes, syllable_count, _ = lexicon[i]
         
-        pitch_values = pitch.selected_array['frequency']
-        intensity_values = intensity.values[0]
+        # Slices of the sorted frame arrays are views, no per-word masks
+        pitch_segment = pitch_values[pitch_lo[n]:pitch_hi[n]]
+        intensity_segment = intensity_values[intensity_lo[n]:intensity_hi[n]]
         
-        words = [clean_word(w) for w in transcription.split() if clean_word(w)]
-        word_analyses = []
-        total_stress_match = 0
-        words_with_stress = 0
+        actual_stress = detect_stress_from_prosody(
+            pitch_segment,
+            intensity_segment,
+            syllable_count,
+            syllable_edges.get(i)
+        )
         
-        audio_duration = sound.duration
-        word_duration = audio_duration / len(words) if len(words) > 0 else 0
+        stress_match = compare_stress_patterns(expected_stress, actual_stress)
         
-        for i, word in enumerate(words):
-            pronunciation = pronouncing.phones_for_word(word)
-            pronunciation = pronunciation[0] if pronunciation else None
-            
-            if pronunciation:
-                expected_stress = extract_stress_pattern(pronunciation)
-                phonemes = [p.replace('0', '').replace('1', '').replace('2', '') for p in pronunciation.split()]
-                syllable_count = len(expected_stress)
-            else:
-                syllable_count = estimate_syllables(word)
-                expected_stress = [1] + [0] * (syllable_count - 1) if syllable_count > 0 else [0]
-                phonemes = []
-            
-            start_time = i * word_duration
-            end_time = (i + 1) * word_duration
-            
-            pitch_segment = pitch_values[
-                (pitch.xs() >= start_time) & (pitch.xs() <= end_time)
-            ] if len(pitch_values) > 0 else np.array([])
-            
-            intensity_segment = intensity.values[0][
-                (intensity.xs() >= start_time) & (intensity.xs() <= end_time)
-            ] if len(intensity_values) > 0 else np.array([])
-            
-            actual_stress = detect_stress_from_prosody(
-                pitch_segment,
-                intensity_segment,
-                syllable_count
-            )
-            
-            stress_match = compare_stress_patterns(expected_stress, actual_stress)
-            
-            if syllable_count > 1:
-                total_stress_match += stress_match
-                words_with_stress += 1
-            
-            valid_pitch = pitch_segment[(pitch_segment > 0) & ~np.isnan(pitch_segment)]
-            valid_intensity = intensity_segment[~np.isnan(intensity_segment)] if len(intensity_segment) > 0 else np.array([])
-            
-            avg_pitch = float(np.mean(valid_pitch)) if len(valid_pitch) > 0 else 0.0
-            avg_intensity = float(np.mean(valid_intensity)) if len(valid_intensity) > 0 else 0.0
-            
-            word_analyses.append({
-                'word': word,
-                'expectedStress': expected_stress,
-                'actualStress': actual_stress.tolist() if isinstance(actual_stress, np.ndarray) else actual_stress,
-                'phonemes': phonemes,
-                'syllableCount': syllable_count,
-                'stressMatch': float(stress_match),
-                'avgPitch': avg_pitch,
-                'avgIntensity': avg_intensity
-            })
+        word_analyses.append({
+            'word': words[i],
+            'expectedStress': expected_stress,
+            'actualStress': actual_stress.tolist() if isinstance(actual_stress, np.ndarray) else actual_stress,
+            'phonemes': phonemes,
+            'syllableCount': syllable_count,
+            'stressMatch': float(stress_match),
+            'avgPitch': float(word_avg_pitch[n]),
+            'avgIntensity': float(word_avg_intensity[n]),
+            'startTime': float(starts[i]),
+            'endTime': float(ends[i])
+        })
+    return word_analyses
+
+def _score(transcription, word_analyses, audio_duration, alignment_used, speech=None):
+    """Overall metrics, score and feedback from the per-word analyses and optional speech_metrics"""
+    stressed_words = [w for w in word_analyses if w['syllableCount'] > 1]
+    total_stress_match = sum(w['stressMatch'] for w in stressed_words)
+    words_with_stress = len(stressed_words)
+    stress_pattern_match = (total_stress_match / words_with_stress) if words_with_stress > 0 else 0
+    stress_pattern_match = min(100, max(0, stress_pattern_match))
+    
+    base_score = stress_pattern_match * 0.4
+    
+    pitch_variations = [w['avgPitch'] for w in word_analyses if w['avgPitch'] > 0]
+    if len(pitch_variations) > 1:
+        pitch_std = np.std(pitch_variations) if len(pitch_variations) > 1 else 0
+        pitch_mean = np.mean(pitch_variations)
+        cv = (pitch_std / pitch_mean * 100) if pitch_mean > 0 else 0
+        clarity_score = min(100, max(50, 50 + cv * 0.5))
+    else:
+        clarity_score = 60
+    base_score += clarity_score * 0.3
+    
+    intensity_variations = [w['avgIntensity'] for w in word_analyses if w['avgIntensity'] > 0]
+    if len(intensity_variations) > 1:
+        intensity_std = np.std(intensity_variations) if len(intensity_variations) > 1 else 0
+        intensity_mean = np.mean(intensity_variations)
+        cv = (intensity_std / intensity_mean * 100) if intensity_mean > 0 else 0
+        rhythm_score = min(100, max(50, 50 + cv * 0.5))
+    else:
+        rhythm_score = 60
+    base_score += rhythm_score * 0.2
+    
+    multi_syllable_words = [w for w in word_analyses if w['syllableCount'] > 1]
+    if len(multi_syllable_words) > 0:
+        word_accuracy = np.mean([w['stressMatch'] for w in multi_syllable_words])
+    else:
+        word_accuracy = 70
+    base_score += word_accuracy * 0.1
+    
+    pronunciation_score = min(100, max(0, base_score))
+    
+    stress_feedback = []
+    if stress_pattern_match < 70:
+        stress_feedback.append(f"Stress pattern accuracy is {stress_pattern_match:.1f}%. Focus on word stress in multi-syllable words.")
+    elif stress_pattern_match < 80:
+        stress_feedback.append(f"Stress patterns are acceptable ({stress_pattern_match:.1f}%) but can be improved.")
+    else:
+        stress_feedback.append(f"Good stress patterns ({stress_pattern_match:.1f}%).")
+    
+    multi_syllable_words = [w for w in word_analyses if w['syllableCount'] > 1]
+    if len(multi_syllable_words) > 0:
+        stress_feedback.append(f"Analyzed {len(multi_syllable_words)} multi-syllable words for stress patterns.")
+    
+    if clarity_score < 60:
+        stress_feedback.append("Work on speech clarity and pitch variation.")
+    if rhythm_score < 60:
+        stress_feedback.append("Improve rhythm and intonation patterns.")
+    
+    detailed_feedback = f"Pronunciation analysis completed. Overall score: {pronunciation_score:.1f}%. "
+    detailed_feedback += f"Stress pattern match: {stress_pattern_match:.1f}%, Clarity: {clarity_score:.1f}%, Rhythm: {rhythm_score:.1f}%. "
+    if pronunciation_score >= 80:
+        detailed_feedback += "Excellent pronunciation with clear stress patterns and good rhythm."
+    elif pronunciation_score >= 70:
+        detailed_feedback += "Good pronunciation overall. Continue practicing stress patterns and intonation."
+    elif pronunciation_score >= 60:
+        detailed_feedback += "Pronunciation needs improvement. Focus on word stress, clarity, and rhythm."
+    else:
+        detailed_feedback += "Significant improvement needed. Practice stress patterns, clarity, and intonation systematically."
+    
+    return {
+        'transcription': transcription,
+        'words': word_analyses,
+        'metrics': {
+            'stressPatternMatch': float(stress_pattern_match),
+            'audioDuration': float(audio_duration),
+            'alignment': alignment_used,
+            **(speech or {})
+        },
+        'stressFeedback': stress_feedback,
+        'pronunciationScore': float(pronunciation_score),
+        'detailedFeedback': detailed_feedback
+    }
+    
+def _error_result(transcription, e):
+    return {
+        'error': str(e),
+        'transcription': transcription,
+        'words': [],
+        'metrics': {
+            'stressPatternMatch': 0,
+            'audioDuration': 0
+        },
+        'stressFeedback': ['Error analyzing pronunciation'],
+        'pronunciationScore': 0,
+        'detailedFeedback': f'Error: {str(e)}'
+    }
+
+def analyze_pronunciation(audio, transcription, alignment=None):
+    """Main function to analyze pronunciation and stress from audio (a file path or a parselmouth.Sound)"""
+    alignment = alignment or ALIGNMENT_MODE
+    try:
+        if not PARSELMOUTH_AVAILABLE:
+            return analyze_pronunciation_text_only(transcription)
         
-        stress_pattern_match = (total_stress_match / words_with_stress) if words_with_stress > 0 else 0
-        stress_pattern_match = min(100, max(0, stress_pattern_match))
+        sound = audio if isinstance(audio, parselmouth.Sound) else parselmouth.Sound(audio)
+        tracks = _prosody_tracks(sound)
         
-        base_score = stress_pattern_match * 0.4
+        segments = speech_segments(tracks)
         
-        pitch_variations = [w['avgPitch'] for w in word_analyses if w['avgPitch'] > 0]
-        if len(pitch_variations) > 1:
-            pitch_std = np.std(pitch_variations) if len(pitch_variations) > 1 else 0
-            pitch_mean = np.mean(pitch_variations)
-            cv = (pitch_std / pitch_mean * 100) if pitch_mean > 0 else 0
-            clarity_score = min(100, max(50, 50 + cv * 0.5))
-        else:
-            clarity_score = 60
-        base_score += clarity_score * 0.3
+        words = tokenize(transcription)
+        lexicon = _lexicon_entries(words)
+        starts, ends, syllable_edges, alignment_used = _word_windows(lexicon, segments, sound.duration, alignment)
+        word_analyses = _analyze_words(range(len(words)), words, lexicon, tracks, starts, ends, syllable_edges)
+        speech = speech_metrics(segments, len(words), tracks)
+        return _score(transcription, word_analyses, sound.duration, alignment_used, speech)
         
-        intensity_variations = [w['avgIntensity'] for w in word_analyses if w['avgIntensity'] > 0]
-        if len(intensity_variations) > 1:
-            intensity_std = np.std(intensity_variations) if len(intensity_variations) > 1 else 0
-            intensity_mean = np.mean(intensity_variations)
-            cv = (intensity_std / intensity_mean * 100) if intensity_mean > 0 else 0
-            rhythm_score = min(100, max(50, 50 + cv * 0.5))
-        else:
-            rhythm_score = 60
-        base_score += rhythm_score * 0.2
+    except Exception as e:
+        return _error_result(transcription, e)
+
+# (format tag, bits per sample) -> sample dtype and the offset/scale to [-1, 1]
+_WAV_SAMPLE_TYPES = {
+    (1, 8): ('u1', 128.0, 128.0),
+    (1, 16): ('<i2', 0.0, 32768.0),
+    (1, 32): ('<i4', 0.0, 2147483648.0),
+    (3, 32): ('<f4', 0.0, 1.0),
+}
+
+# Headerless little-endian PCM accepted by sound_from_bytes
+_PCM_FORMATS = {
+    'pcm_u8': (1, 8),
+    'pcm_s16le': (1, 16),
+    'pcm_s32le': (1, 32),
+    'pcm_f32le': (3, 32),
+}
+
+def _wav_layout(f, total_size):
+    """
+    Walk the RIFF chunks of a WAV file object. Returns (data offset, frames,
+    channels, sampling rate, sample type) or None if it is not PCM / float WAV.
+    """
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+    
+    sample_format = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id = chunk_header[:4]
+        size = struct.unpack('<I', chunk_header[4:])[0]
         
-        multi_syllable_words = [w for w in word_analyses if w['syllableCount'] > 1]
-        if len(multi_syllable_words) > 0:
-            word_accuracy = np.mean([w['stressMatch'] for w in multi_syllable_words])
+        if chunk_id == b'fmt ':
+            data = f.read(size)
+            if len(data) < 16:
+                return None
+            format_tag, channels, rate, _, _, bits = struct.unpack('<HHIIHH', data[:16])
+            if format_tag == 0xFFFE and len(data) >= 26:
+                # WAVE_FORMAT_EXTENSIBLE: the real tag leads the sub-format GUID
+                format_tag = struct.unpack('<H', data[24:26])[0]
+            sample_format = (format_tag, bits, channels, rate)
+            f.seek(size & 1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if sample_format is None:
+                return None
+            format_tag, bits, channels, rate = sample_format
+            sample_type = _WAV_SAMPLE_TYPES.get((format_tag, bits))
+            if sample_type is None or channels == 0:
+                return None
+            data_start = f.tell()
+            frame_bytes = (bits // 8) * channels
+            # Streamed WAVs (e.g. piped from ffmpeg) may carry a 0 or 0xFFFFFFFF data size
+            available = total_size - data_start
+            data_size = size if 0 < size <= available else available
+            frames = data_size // frame_bytes
+            if frames == 0:
+                return None
+            return data_start, frames, channels, float(rate), sample_type
         else:
-            word_accuracy = 70
-        base_score += word_accuracy * 0.1
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+def open_wav_samples(audio_path):
+    """
+    Memory-map the sample data of a PCM / float WAV file without reading it.
+    Returns (samples [frames, channels], sampling rate, offset, scale) or None
+    for anything else, in which case the file has to be decoded by Praat.
+    """
+    with open(audio_path, 'rb') as f:
+        layout = _wav_layout(f, os.path.getsize(audio_path))
+    if layout is None:
+        return None
+    data_start, frames, channels, rate, (dtype, offset, scale) = layout
+    samples = np.memmap(audio_path, dtype=dtype, mode='r', offset=data_start, shape=(frames, channels))
+    return samples, rate, offset, scale
+
+def sound_from_bytes(data, audio_format='wav', sample_rate=None, channels=1):
+    """
+    parselmouth.Sound straight from in-memory audio, without a temp file:
+    either a complete WAV file ('wav') or headerless PCM in one of
+    _PCM_FORMATS, in which case sample_rate is required.
+    """
+    if audio_format == 'wav':
+        layout = _wav_layout(io.BytesIO(data), len(data))
+        if layout is None:
+            raise ValueError('Unsupported WAV data (expected PCM or 32-bit float)')
+        data_start, frames, channels, sample_rate, (dtype, offset, scale) = layout
+    elif audio_format in _PCM_FORMATS:
+        if not sample_rate:
+            raise ValueError(f'sampleRate is required for {audio_format} audio')
+        channels = int(channels or 1)
+        dtype, offset, scale = _WAV_SAMPLE_TYPES[_PCM_FORMATS[audio_format]]
+        data_start = 0
+        frames = len(data) // (np.dtype(dtype).itemsize * channels)
+    else:
+        raise ValueError(f'Unknown audio format: {audio_format}')
+    
+    if frames == 0:
+        raise ValueError('Audio data is empty')
+    samples = np.frombuffer(data, dtype=dtype, count=frames * channels, offset=data_start)
+    values = ((samples.reshape(frames, channels) - offset) / scale).mean(axis=1)
+    return parselmouth.Sound(values, sampling_frequency=float(sample_rate))
+
+def _audio_chunks(audio_path, chunk_seconds, overlap_seconds):
+    """
+    Yield (sound, core_start, core_end, duration) for overlapping chunks of the
+    recording. Pitch and intensity frames are kept only inside the chunk's
+    core, the middle part that excludes half the overlap on each side, so
+    every frame is analyzed with context and comes from exactly one chunk.
+    """
+    wav = open_wav_samples(audio_path)
+    if wav is not None:
+        samples, rate, offset, scale = wav
+    else:
+        # Not a plain WAV: decode in full, but still report incrementally
+        sound = parselmouth.Sound(audio_path)
+        samples, rate, offset, scale = sound.values.T, sound.sampling_frequency, 0.0, 1.0
+    
+    total = len(samples)
+    duration = total / rate
+    chunk = max(1, int(chunk_seconds * rate))
+    overlap = min(max(0, int(overlap_seconds * rate)), chunk // 2)
+    step = chunk - overlap
+    
+    start = 0
+    while True:
+        end = start + chunk
+        # Fold a short remainder into this chunk rather than analyzing a sliver
+        last = end + step // 2 >= total
+        if last:
+            end = total
         
-        pronunciation_score = min(100, max(0, base_score))
+        block = np.asarray(samples[start:end], dtype=np.float64)
+        values = ((block - offset) / scale).mean(axis=1)
+        sound = parselmouth.Sound(values, sampling_frequency=rate, start_time=start / rate)
+        core_start = 0.0 if start == 0 else (start + overlap / 2) / rate
+        core_end = duration if last else (end - overlap / 2) / rate
+        yield sound, core_start, core_end, duration
         
-        stress_feedback = []
-        if stress_pattern_match < 70:
-            stress_feedback.append(f"Stress pattern accuracy is {stress_pattern_match:.1f}%. Focus on word stress in multi-syllable words.")
-        elif stress_pattern_match < 80:
-            stress_feedback.append(f"Stress patterns are acceptable ({stress_pattern_match:.1f}%) but can be improved.")
-        else:
-            stress_feedback.append(f"Good stress patterns ({stress_pattern_match:.1f}%).")
+        if last:
+            return
+        start += step
+
+class _TrackBuffer:
+    """
+    Pitch/intensity frames analyzed so far that may still belong to an
+    unfinished word, plus a float32 copy of every core frame for the
+    recording-wide speech metrics
+    """
+    
+    def __init__(self):
+        self.tracks = ProsodyTracks(np.array([]), np.array([]), np.array([]), np.array([]))
+        self.history = ProsodyTracks([], [], [], [])
+    
+    def append(self, tracks, core_start, core_end, last):
+        pitch_keep = (tracks.pitch_xs >= core_start) & ((tracks.pitch_xs < core_end) | last)
+        intensity_keep = (tracks.intensity_xs >= core_start) & ((tracks.intensity_xs < core_end) | last)
+        core = ProsodyTracks(
+            tracks.pitch_xs[pitch_keep],
+            tracks.pitch_values[pitch_keep],
+            tracks.intensity_xs[intensity_keep],
+            tracks.intensity_values[intensity_keep]
+        )
+        self.tracks = ProsodyTracks(*(np.concatenate((kept, new)) for kept, new in zip(self.tracks, core)))
+        for frames, new in zip(self.history, core):
+            frames.append(new.astype(np.float32))
+        return core.intensity_values
+    
+    def full_tracks(self):
+        return ProsodyTracks(*(
+            np.concatenate(frames).astype(np.float64) if frames else np.array([]) for frames in self.history
+        ))
+    
+    def discard_before(self, time):
+        pitch_from = np.searchsorted(self.tracks.pitch_xs, time, side='left')
+        intensity_from = np.searchsorted(self.tracks.intensity_xs, time, side='left')
+        self.tracks = ProsodyTracks(
+            self.tracks.pitch_xs[pitch_from:],
+            self.tracks.pitch_values[pitch_from:],
+            self.tracks.intensity_xs[intensity_from:],
+            self.tracks.intensity_values[intensity_from:]
+        )
+
+def analyze_pronunciation_stream(audio_path, transcription, alignment=None,
+                                 chunk_seconds=None, overlap_seconds=None):
+    """
+    Windowed analysis for long or live recordings. Audio is read in
+    overlapping chunks (memory-mapped for WAV files) and each word is yielded
+    as {'type': 'word', 'index': i, 'word': {...}} as soon as the audio it
+    covers has been analyzed, followed by one {'type': 'result', 'result': {...}}
+    with the same schema as analyze_pronunciation.
+
+    Only the frames of words that are not finished yet are kept in memory.
+    With nuclei alignment words are anchored greedily in order (each word
+    takes as many nuclei as it has syllables); words still open at the end
+    are aligned over the remaining audio like in analyze_pronunciation.
+    Speech rate, pauses and articulation rate in the result are measured over
+    the whole recording once it has been read.
+    """
+    alignment = alignment or ALIGNMENT_MODE
+    chunk_seconds = chunk_seconds or CHUNK_SECONDS
+    overlap_seconds = CHUNK_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds
+    
+    if not PARSELMOUTH_AVAILABLE:
+        result = analyze_pronunciation_text_only(transcription)
+        for i, word in enumerate(result['words']):
+            yield {'type': 'word', 'index': i, 'word': word}
+        yield {'type': 'result', 'result': result}
+        return
+    
+    try:
+        words = tokenize(transcription)
+        lexicon = _lexicon_entries(words)
+        counts = np.maximum(np.array([entry[4] for entry in lexicon], dtype=int), 1)
+        num_words = len(words)
+        starts = np.zeros(num_words)
+        ends = np.zeros(num_words)
+        syllable_edges = {}
+        aligned_words = 0
         
-        multi_syllable_words = [w for w in word_analyses if w['syllableCount'] > 1]
-        if len(multi_syllable_words) > 0:
-            stress_feedback.append(f"Analyzed {len(multi_syllable_words)} multi-syllable words for stress patterns.")
+        buffer = _TrackBuffer()
+        word_analyses = []
+        pending = 0  # first word not yet emitted
+        pending_start = None  # its start time once the previous word was cut
+        loudest = -np.inf
+        quietest = np.inf
+        settings = None
         
-        if clarity_score < 60:
-            stress_feedback.append("Work on speech clarity and pitch variation.")
-        if rhythm_score < 60:
-            stress_feedback.append("Improve rhythm and intonation patterns.")
+        for sound, core_start, core_end, duration in _audio_chunks(audio_path, chunk_seconds, overlap_seconds):
+            last = core_end >= duration
+            # Frame steps follow the whole recording's length, not the chunk's
+            settings = settings or feature_settings(duration)
+            # Chunks of live audio are not worth caching
+            levels = buffer.append(_prosody_tracks(sound, settings, use_cache=False), core_start, core_end, last)
+            levels = levels[np.isfinite(levels)]
+            if len(levels) > 0:
+                loudest = max(loudest, np.quantile(levels, 0.99))
+                quietest = min(quietest, np.min(levels))
+            if pending >= num_words:
+                continue
+            
+            ready = []
+            tracks = buffer.tracks
+            if alignment != 'nuclei':
+                word_duration = duration / num_words
+                starts = np.arange(num_words) * word_duration
+                ends = starts + word_duration
+                ready = [i for i in range(pending, num_words) if last or ends[i] < core_end]
+            else:
+                threshold = max(loudest - SILENCE_DB, quietest)
+                nuclei, pauses, speech_start, speech_end = detect_syllable_nuclei(
+                    tracks.intensity_xs, tracks.intensity_values, tracks.pitch_xs, tracks.pitch_values,
+                    threshold=threshold
+                )
+                region_start = speech_start if pending_start is None else pending_start
+                if not last:
+                    # A nucleus close to the end of the analyzed audio may still move
+                    nuclei = nuclei[nuclei < core_end - overlap_seconds / 2]
+                    first = np.concatenate(([0], np.cumsum(counts[pending:])))
+                    closed = int(np.searchsorted(first, len(nuclei), side='left')) - 1
+                    closed = min(closed, num_words - pending - 1)
+                    if closed > 0:
+                        # Place the closed words plus the next one, which only provides the cut
+                        placed_starts, placed_ends, spans = place_words(
+                            counts[pending:pending + closed + 1], nuclei, first[:closed + 1],
+                            pauses, region_start, core_end
+                        )
+                        ready = list(range(pending, pending + closed))
+                        starts[ready] = placed_starts[:closed]
+                        ends[ready] = placed_ends[:closed]
+                        syllable_edges.update(_word_syllable_edges(lexicon, ready, spans[:closed]))
+                        aligned_words += closed
+                        pending_start = placed_starts[closed]
+                else:
+                    remaining = list(range(pending, num_words))
+                    aligned = align_words(counts[pending:], nuclei, pauses, region_start, speech_end)
+                    if aligned is not None:
+                        starts[remaining], ends[remaining], spans = aligned
+                        syllable_edges.update(_word_syllable_edges(lexicon, remaining, spans))
+                        aligned_words += len(remaining)
+                    else:
+                        # Too few nuclei: split whatever audio is left evenly
+                        left_from = 0.0 if pending_start is None else pending_start
+                        word_duration = (duration - left_from) / len(remaining)
+                        starts[remaining] = left_from + np.arange(len(remaining)) * word_duration
+                        ends[remaining] = starts[remaining] + word_duration
+                    ready = remaining
+            
+            for n, analysis in enumerate(_analyze_words(ready, words, lexicon, tracks, starts, ends, syllable_edges)):
+                word_analyses.append(analysis)
+                yield {'type': 'word', 'index': ready[n], 'word': analysis}
+            if ready:
+                pending = ready[-1] + 1
+                if pending < num_words:
+                    buffer.discard_before(starts[pending] if alignment != 'nuclei' else pending_start)
         
-        detailed_feedback = f"Pronunciation analysis completed. Overall score: {pronunciation_score:.1f}%. "
-        detailed_feedback += f"Stress pattern match: {stress_pattern_match:.1f}%, Clarity: {clarity_score:.1f}%, Rhythm: {rhythm_score:.1f}%. "
-        if pronunciation_score >= 80:
-            detailed_feedback += "Excellent pronunciation with clear stress patterns and good rhythm."
-        elif pronunciation_score >= 70:
-            detailed_feedback += "Good pronunciation overall. Continue practicing stress patterns and intonation."
-        elif pronunciation_score >= 60:
-            detailed_feedback += "Pronunciation needs improvement. Focus on word stress, clarity, and rhythm."
+        if aligned_words == num_words and num_words > 0:
+            alignment_used = 'nuclei'
+        elif aligned_words > 0:
+            alignment_used = 'partial'
         else:
-            detailed_feedback += "Significant improvement needed. Practice stress patterns, clarity, and intonation systematically."
-        
-        return {
-            'transcription': transcription,
-            'words': word_analyses,
-            'metrics': {
-                'stressPatternMatch': float(stress_pattern_match),
-                'audioDuration': float(audio_duration)
-            },
-            'stressFeedback': stress_feedback,
-            'pronunciationScore': float(pronunciation_score),
-            'detailedFeedback': detailed_feedback
-        }
+            alignment_used = 'uniform'
+        full_tracks = buffer.full_tracks()
+        speech = speech_metrics(speech_segments(full_tracks), num_words, full_tracks)
+        yield {'type': 'result', 'result': _score(transcription, word_analyses, duration, alignment_used, speech)}
         
     except Exception as e:
-        return {
-            'error': str(e),
-            'transcription': transcription,
-            'words': [],
-            'metrics': {
-                'stressPatternMatch': 0,
-                'audioDuration': 0
-            },
-            'stressFeedback': ['Error analyzing pronunciation'],
-            'pronunciationScore': 0,
-            'detailedFeedback': f'Error: {str(e)}'
-        }
+        yield {'type': 'result', 'result': _error_result(transcription, e)}
+
+def _init_pool_worker():
+    # Map the lexicon once per worker process instead of on the first request
+    get_lexicon()
+
+def _analyze_request(request):
+    transcription = request.get('transcription', '')
+    alignment = request.get('alignment')
+    
+    if request.get('audio') is not None:
+        # Inline audio: base64 WAV or raw PCM ({"audioFormat", "sampleRate", "channels"})
+        if not PARSELMOUTH_AVAILABLE:
+            return analyze_pronunciation_text_only(transcription)
+        try:
+            sound = sound_from_bytes(
+                base64.b64decode(request['audio']),
+                request.get('audioFormat', 'wav'),
+                request.get('sampleRate'),
+                request.get('channels', 1)
+            )
+        except (ValueError, binascii.Error) as e:
+            return {'error': f'Invalid audio data: {e}'}
+        return analyze_pronunciation(sound, transcription, alignment)
+    
+    audio_path = request.get('audioPath')
+    if not audio_path or not os.path.exists(audio_path):
+        return {'error': f'Audio file not found: {audio_path}'}
+    return analyze_pronunciation(audio_path, transcription, alignment)
+
+def _run_requests(lines, write, concurrency):
+    """
+    Analyze JSON request lines on a pool of `concurrency` processes that import
+    numpy/parselmouth and the lexicon only once, calling write() with
+    {"id": ..., "result": {...}} or {"id": ..., "error": ...} in completion
+    order. At most concurrency * 2 requests are pending at any time.
+
+    A process that crashes breaks the whole pool and fails every request in
+    flight, so those requests are run again, each in a process of its own on
+    the side while a fresh pool takes new work: only a request that crashes
+    twice fails. Returns (completed, failed) counts.
+    """
+    import threading
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    # Stop reading input while the pool is saturated so pending work stays bounded
+    pending_limit = concurrency * 2
+    slots = threading.BoundedSemaphore(pending_limit)
+    lock = threading.Lock()
+    counts = {'completed': 0, 'failed': 0}
+    pools = {'current': None}
+
+    def new_pool(workers=concurrency):
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker)
+
+    def replace_pool(broken):
+        with lock:
+            if pools['current'] is broken:
+                broken.shutdown(wait=False)
+                pools['current'] = new_pool()
+            return pools['current']
+
+    def finish(request_id, message, failed):
+        write({'id': request_id, **message})
+        with lock:
+            counts['completed'] += 1
+            counts['failed'] += int(failed)
+        slots.release()
+
+    def retry_alone(request_id, request):
+        pool = new_pool(1)
+        future = pool.submit(_analyze_request, request)
+
+        def done(f):
+            pool.shutdown(wait=False)
+            on_done(request_id, request, f, None)
+        future.add_done_callback(done)
+
+    def on_done(request_id, request, future, pool):
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            if pool is None:
+                finish(request_id, {'error': f'Worker process crashed: {e}'}, True)
+                return
+            replace_pool(pool)
+            retry_alone(request_id, request)
+        except Exception as e:
+            finish(request_id, {'error': str(e)}, True)
+        else:
+            finish(request_id, {'result': result}, 'error' in result)
+
+    def submit(request_id, request):
+        with lock:
+            pool = pools['current']
+        try:
+            future = pool.submit(_analyze_request, request)
+        except BrokenProcessPool:
+            pool = replace_pool(pool)
+            future = pool.submit(_analyze_request, request)
+        future.add_done_callback(lambda f: on_done(request_id, request, f, pool))
+
+    pools['current'] = new_pool()
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError(f'expected an object, got {type(request).__name__}')
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            write({'id': None, 'error': f'Invalid JSON request on line {line_number}: {e}'})
+            with lock:
+                counts['completed'] += 1
+                counts['failed'] += 1
+            continue
+
+        slots.acquire()
+        submit(request.get('id', line_number), request)
+
+    # Retries can start after the last submit: wait until every request has finished
+    for _ in range(pending_limit):
+        slots.acquire()
+    pools['current'].shutdown(wait=True)
+    return counts['completed'], counts['failed']
+
+def _line_writer(stream):
+    import threading
+
+    lock = threading.Lock()
+
+    def write(message):
+        line = json.dumps(message)
+        with lock:
+            stream.write(line + '\n')
+            stream.flush()
+
+    return write
+
+def run_worker(concurrency):
+    """
+    Persistent worker: reads one JSON request per line on stdin
+    ({"id": ..., "audioPath": ..., "transcription": ...}, or base64 "audio"
+    instead of audioPath, see _analyze_request) and writes one JSON line per
+    result on stdout (see _run_requests).
+    """
+    write = _line_writer(sys.stdout)
+    write({'ready': True, 'concurrency': concurrency, 'parselmouth': PARSELMOUTH_AVAILABLE})
+    _run_requests(sys.stdin, write, concurrency)
+
+def run_batch(manifest_path, output_path, concurrency):
+    """
+    Batch mode for re-scoring whole cohorts: the manifest is JSONL with one
+    {"audioPath": ..., "transcription": ..., "id"?: ...} object per line
+    (id defaults to the line number). Results are appended to output_path
+    (stdout when None) as JSONL as soon as each recording finishes.
+    """
+    import time
+
+    started = time.perf_counter()
+    output = open(output_path, 'w', encoding='utf-8') if output_path else sys.stdout
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as manifest:
+            completed, failed = _run_requests(manifest, _line_writer(output), concurrency)
+    finally:
+        if output_path:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    rate = completed / elapsed if elapsed > 0 else 0
+    print(f'Analyzed {completed} recordings ({failed} failed) in {elapsed:.1f}s, {rate:.2f}/s', file=sys.stderr)
+    return failed
+
+def _option(args, name, default=None):
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+    return default
 
 if __name__ == '__main__':
+    args = sys.argv[1:]
+    concurrency = int(_option(args, '--concurrency', os.getenv('PRONUNCIATION_WORKER_CONCURRENCY', str(os.cpu_count() or 1))))
+    concurrency = max(1, concurrency)
+
+    if args and args[0] == '--worker':
+        run_worker(concurrency)
+        sys.exit(0)
+
+    if args and args[0] == '--batch':
+        if len(args) < 2 or not os.path.exists(args[1]):
+            print(json.dumps({'error': f'Manifest not found: {args[1] if len(args) > 1 else None}'}))
+            sys.exit(1)
+        failed = run_batch(args[1], _option(args, '--output'), concurrency)
+        sys.exit(1 if failed else 0)
+
+    if args and args[0] == '--stream':
+        if len(args) < 3 or not os.path.exists(args[1]):
+            print(json.dumps({'error': f'Audio file not found: {args[1] if len(args) > 1 else None}'}))
+            sys.exit(1)
+        # One JSON line per word as it is analyzed, then the merged result
+        for event in analyze_pronunciation_stream(args[1], args[2]):
+            sys.stdout.write(json.dumps(event) + '\n')
+            sys.stdout.flush()
+        sys.exit(0)
+
+    if args and args[0] == '--stdin':
+        # Audio bytes on stdin instead of a file: WAV, or raw PCM with --sample-rate
+        if len(args) < 2:
+            print(json.dumps({'error': 'Usage: --stdin <transcription> [--format wav|pcm_s16le|...] [--sample-rate N] [--channels N]'}))
+            sys.exit(1)
+        if not PARSELMOUTH_AVAILABLE:
+            print(json.dumps(analyze_pronunciation_text_only(args[1]), indent=2))
+            sys.exit(0)
+        try:
+            sound = sound_from_bytes(
+                sys.stdin.buffer.read(),
+                _option(args, '--format', 'wav'),
+                float(_option(args, '--sample-rate', '0')),
+                int(_option(args, '--channels', '1'))
+            )
+        except ValueError as e:
+            # A normal result, like in --worker mode: the caller retries with a temp file
+            print(json.dumps({'error': f'Invalid audio data: {e}'}))
+            sys.exit(0)
+        print(json.dumps(analyze_pronunciation(sound, args[1]), indent=2))
+        sys.exit(0)
+
     if len(sys.argv) < 3:
         print(json.dumps({
             'error': 'Usage: python pronunciation_analyzer.py <audio_path> <transcription>'
+                     ' | --stdin <transcription> [--format F] [--sample-rate N]'
+                     ' | --stream <audio_path> <transcription>'
+                     ' | --worker [--concurrency N]'
+                     ' | --batch <manifest.jsonl> [--output results.jsonl] [--concurrency N]'
         }))
         sys.exit(1)
     
@@ -353,4 +1231,3 @@ if __name__ == '__main__':
     
     result = analyze_pronunciation(audio_path, transcription)
     print(json.dumps(result, indent=2))
-
@@ -140,6 +140,7 @@ export class TranscribeAndGradeResponse {
       pauseCount: number;
       averageWordLength: number;
       stressPatternMatch: number;
+      articulationRate?: number;
     };
     stressFeedback: string[];
     pronunciationScore: number;
@@ -1,10 +1,12 @@
 import * as ffmpegInstaller from '@ffmpeg-installer/ffmpeg';
-import { Injectable, Logger } from '@nestjs/common';
-import { spawn } from 'child_process';
+import { Injectable, Logger, OnModuleDestroy } from '@nestjs/common';
+import { ChildProcessWithoutNullStreams, spawn } from 'child_process';
 import * as ffmpeg from 'fluent-ffmpeg';
 import * as fs from 'fs';
 import * as os from 'os';
 import * as path from 'path';
+import * as readline from 'readline';
+import { Readable } from 'stream';
 
 export interface WordAnalysis {
   word: string;
@@ -15,9 +17,10 @@ export interface WordAnalysis {
 
 export interface PronunciationMetrics {
   speechRate: number; // Words per minute
-  pauseCount: number; // Estimated from punctuation and slow speech rate
+  pauseCount: number; // Measured from audio, else estimated from punctuation and slow speech rate
   averageWordLength: number;
   stressPatternMatch: number; // Percentage of words with correct stress (estimated)
+  articulationRate?: number; // Syllables per second excluding pauses (audio analysis only)
 }
 
 export interface PronunciationAnalysisResult {
@@ -29,13 +32,73 @@ export interface PronunciationAnalysisResult {
   detailedFeedback: string;
 }
 
+interface PythonAnalyzerResult {
+  error?: string;
+  transcription?: string;
+  words?: Array<{
+    word: string;
+    expectedStress: number[];
+    actualStress: number[];
+    phonemes: string[];
+    syllableCount: number;
+  }>;
+  metrics?: {
+    stressPatternMatch: number;
+    audioDuration: number;
+    // Measured from the audio's speech segments
+    speechRate?: number;
+    pauseCount?: number;
+    articulationRate?: number;
+  };
+  stressFeedback?: string[];
+  pronunciationScore?: number;
+  detailedFeedback?: string;
+}
+
+// What the analyzer reads: a file on disk, or the audio bytes themselves
+// (a WAV file, or raw 16-bit PCM at sampleRate)
+type AnalyzerInput =
+  | { audioPath: string }
+  | { audio: Buffer; audioFormat: 'wav' | 'pcm_s16le'; sampleRate?: number };
+
+interface WorkerMessage {
+  ready?: boolean;
+  id?: string | null;
+  result?: PythonAnalyzerResult;
+  error?: string;
+}
+
+interface PendingWorkerRequest {
+  resolve: (result: PythonAnalyzerResult) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
 @Injectable()
-export class PronunciationAnalysisService {
+export class PronunciationAnalysisService implements OnModuleDestroy {
   private readonly logger = new Logger(PronunciationAnalysisService.name);
   private pronouncingDictionary: Record<string, string> | null = null;
   private readonly pythonScriptPath: string;
   private readonly pythonExecutable: string;
 
+  // Persistent analyzer process (see pronunciation_analyzer.py --worker); set
+  // PRONUNCIATION_WORKER_MODE=spawn to start one Python process per request
+  private readonly useWorker =
+    process.env.PRONUNCIATION_WORKER_MODE !== 'spawn';
+  private readonly workerConcurrency =
+    parseInt(process.env.PRONUNCIATION_WORKER_CONCURRENCY || '', 10) ||
+    Math.max(1, Math.min(4, os.cpus().length));
+  private readonly workerTimeoutMs = 60000;
+  private worker: ChildProcessWithoutNullStreams | null = null;
+  private workerReady: Promise<void> | null = null;
+  private readonly pendingRequests = new Map<string, PendingWorkerRequest>();
+  private requestCounter = 0;
+  // Hand audio to the analyzer in memory instead of through temp files; set
+  // PRONUNCIATION_AUDIO_TRANSPORT=file to always go through disk
+  private readonly inMemoryAudio =
+    process.env.PRONUNCIATION_AUDIO_TRANSPORT !== 'file';
+  private readonly analysisSampleRate = 16000;
+
   constructor() {
     this.pythonScriptPath = path.join(
       process.cwd(),
@@ -442,150 +505,19 @@ export class PronunciationAnalysisService {
     fileName: string,
     transcription: string,
   ): Promise<PronunciationAnalysisResult> {
-    const tempDir = os.tmpdir();
-    const tempAudioPath = path.join(
-      tempDir,
-      `audio-${Date.now()}-${path.basename(fileName)}`,
-    );
-    const tempWavPath = path.join(tempDir, `audio-${Date.now()}.wav`);
-
     try {
-      fs.writeFileSync(tempAudioPath, audioBuffer);
-
-      const isWav = fileName.toLowerCase().endsWith('.wav');
-      const finalAudioPath = isWav ? tempAudioPath : tempWavPath;
-
-      if (!isWav) {
-        try {
-          await new Promise<void>((resolve, reject) => {
-            ffmpeg(tempAudioPath)
-              .setFfmpegPath(ffmpegInstaller.path)
-              .audioCodec('pcm_s16le')
-              .audioFrequency(16000)
-              .audioChannels(1)
-              .format('wav')
-              .on('end', () => resolve())
-              .on('error', (err) => reject(err))
-              .save(tempWavPath);
-          });
-        } catch (convertError) {
-          this.logger.warn(`Failed to convert audio to WAV: ${convertError}`);
-          if (!fs.existsSync(tempWavPath)) {
-            throw new Error(
-              `Failed to convert audio to WAV: ${convertError instanceof Error ? convertError.message : 'Unknown error'}`,
-            );
-          }
-        }
-      }
-
-      this.logger.debug(
-        `Executing Python script: ${this.pythonExecutable} ${this.pythonScriptPath} ${finalAudioPath}`,
-      );
-
       if (!fs.existsSync(this.pythonScriptPath)) {
         this.logger.error(`Python script not found: ${this.pythonScriptPath}`);
         throw new Error(`Python script not found: ${this.pythonScriptPath}`);
       }
 
-      if (!fs.existsSync(finalAudioPath)) {
-        this.logger.error(`Audio file not found: ${finalAudioPath}`);
-        throw new Error(`Audio file not found: ${finalAudioPath}`);
-      }
-
-      const stdout: string[] = [];
-      const stderr: string[] = [];
-
-      const pythonProcess = spawn(this.pythonExecutable, [
-        this.pythonScriptPath,
-        finalAudioPath,
-        transcription,
-      ]);
-
-      pythonProcess.stdout.on('data', (data: Buffer) => {
-        stdout.push(data.toString());
-      });
-
-      pythonProcess.stderr.on('data', (data: Buffer) => {
-        stderr.push(data.toString());
-      });
-
-      // Thêm timeout để ngăn chặn treo
-      const timeout = 60000; // 60 seconds
-      const timeoutId = setTimeout(() => {
-        pythonProcess.kill('SIGTERM');
-        this.logger.error('Python script execution timeout');
-      }, timeout);
-
-      const exitCode = await new Promise<number>((resolve, reject) => {
-        pythonProcess.on('close', (code) => {
-          clearTimeout(timeoutId);
-          resolve(code || 0);
-        });
-        pythonProcess.on('error', (error) => {
-          clearTimeout(timeoutId);
-          this.logger.error(`Failed to spawn Python process: ${error}`);
-          reject(error);
-        });
-      });
-
-      const stdoutStr = stdout.join('');
-      const stderrStr = stderr.join('');
-
-      this.logger.debug(
-        `Python script stdout (first 500 chars): ${stdoutStr.substring(0, 500)}`,
-      );
-      if (stderrStr) {
-        this.logger.debug(`Python script stderr: ${stderrStr}`);
-      }
-
-      if (exitCode !== 0) {
-        this.logger.error(
-          `Python script exited with code ${exitCode}: ${stderrStr}`,
-        );
-        throw new Error(
-          `Python script failed with exit code ${exitCode}: ${stderrStr}`,
-        );
-      }
-
-      if (stderrStr) {
-        this.logger.warn(`Python script stderr: ${stderrStr}`);
-      }
-
-      // Xác thực stdout trước khi phân tích
-      if (!stdoutStr || stdoutStr.trim().length === 0) {
-        this.logger.error('Python script returned empty output');
-        throw new Error('Python script returned empty output');
-      }
-
-      // Phân tích kết quả JSON
-      let result: {
-        error?: string;
-        transcription?: string;
-        words?: Array<{
-          word: string;
-          expectedStress: number[];
-          actualStress: number[];
-          phonemes: string[];
-          syllableCount: number;
-        }>;
-        metrics?: {
-          stressPatternMatch: number;
-          audioDuration: number;
-        };
-        stressFeedback?: string[];
-        pronunciationScore?: number;
-        detailedFeedback?: string;
-      };
-      try {
-        result = JSON.parse(stdoutStr) as typeof result;
-      } catch (parseError) {
-        this.logger.error(
-          `Failed to parse Python script output: ${stdoutStr.substring(0, 500)}`,
-        );
-        throw new Error(
-          `Failed to parse Python script output: ${parseError instanceof Error ? parseError.message : 'Unknown error'}`,
-        );
-      }
+      const result = this.inMemoryAudio
+        ? await this.runAnalyzerInMemory(audioBuffer, fileName, transcription)
+        : await this.runAnalyzerOnTempFile(
+            audioBuffer,
+            fileName,
+            transcription,
+          );
 
       if (result.error) {
         throw new Error(result.error);
@@ -606,10 +538,12 @@ export class PronunciationAnalysisService {
 
       const audioDuration = result.metrics?.audioDuration || 0;
       const words = this.extractWords(transcription);
+      // Prefer the analyzer's measurements; older analyzers only report duration
       const speechRate =
-        audioDuration > 0 ? (words.length / audioDuration) * 60 : 155;
+        result.metrics?.speechRate ||
+        (audioDuration > 0 ? (words.length / audioDuration) * 60 : 155);
       const punctuationCount = (transcription.match(/[.,!?;:]/g) || []).length;
-      const pauseCount = punctuationCount;
+      const pauseCount = result.metrics?.pauseCount ?? punctuationCount;
       const totalPhonemes = wordAnalyses.reduce(
         (sum, w) => sum + w.phonemes.length,
         0,
@@ -623,6 +557,10 @@ export class PronunciationAnalysisService {
         averageWordLength: Math.round(averageWordLength * 10) / 10,
         stressPatternMatch: result.metrics?.stressPatternMatch || 0,
       };
+      if (typeof result.metrics?.articulationRate === 'number') {
+        metrics.articulationRate =
+          Math.round(result.metrics.articulationRate * 10) / 10;
+      }
 
       const stressFeedback = result.stressFeedback || [];
       const detailedFeedback = result.detailedFeedback || '';
@@ -652,6 +590,135 @@ export class PronunciationAnalysisService {
       this.logger.error(`Error analyzing pronunciation from audio: ${error}`);
       this.logger.warn('Falling back to text-based pronunciation analysis');
       return await this.analyzePronunciation(transcription, undefined);
+    }
+  }
+
+  /**
+   * Pass the upload to the analyzer without touching disk: WAV files as-is,
+   * anything else decoded by ffmpeg to 16 kHz mono PCM through pipes
+   */
+  private async runAnalyzerInMemory(
+    audioBuffer: Buffer,
+    fileName: string,
+    transcription: string,
+  ): Promise<PythonAnalyzerResult> {
+    let input: AnalyzerInput;
+    if (fileName.toLowerCase().endsWith('.wav')) {
+      input = { audio: audioBuffer, audioFormat: 'wav' };
+    } else {
+      try {
+        input = {
+          audio: await this.convertToPcm(audioBuffer),
+          audioFormat: 'pcm_s16le',
+          sampleRate: this.analysisSampleRate,
+        };
+      } catch (convertError) {
+        // Containers with a trailing index (e.g. MP4) cannot be piped
+        this.logger.warn(
+          `In-memory audio conversion failed, using temp files: ${convertError}`,
+        );
+        return this.runAnalyzerOnTempFile(audioBuffer, fileName, transcription);
+      }
+    }
+
+    const result = this.useWorker
+      ? await this.runAnalyzerInWorker(input, transcription)
+      : await this.runAnalyzerProcess(input, transcription);
+    if (result.error?.startsWith('Invalid audio data')) {
+      // e.g. 24-bit or compressed WAV, which only Praat's file reader handles
+      this.logger.warn(`${result.error}, retrying with a temp file`);
+      return this.runAnalyzerOnTempFile(audioBuffer, fileName, transcription);
+    }
+    return result;
+  }
+
+  /**
+   * Decode any ffmpeg-readable audio to raw 16-bit mono PCM in memory
+   */
+  private convertToPcm(audioBuffer: Buffer): Promise<Buffer> {
+    return new Promise<Buffer>((resolve, reject) => {
+      const chunks: Buffer[] = [];
+      const output = ffmpeg(Readable.from(audioBuffer))
+        .setFfmpegPath(ffmpegInstaller.path)
+        .audioCodec('pcm_s16le')
+        .audioFrequency(this.analysisSampleRate)
+        .audioChannels(1)
+        .format('s16le')
+        .on('error', (err) => reject(err))
+        .pipe();
+
+      output.on('data', (chunk: Buffer) => chunks.push(chunk));
+      output.on('error', (err) => reject(err));
+      output.on('end', () => {
+        const pcm = Buffer.concat(chunks);
+        if (pcm.length === 0) {
+          reject(new Error('ffmpeg produced no audio'));
+        } else {
+          resolve(pcm);
+        }
+      });
+    });
+  }
+
+  /**
+   * Write the upload (converted to WAV if needed) to a temp file for the
+   * analyzer to read (PRONUNCIATION_AUDIO_TRANSPORT=file, or formats ffmpeg
+   * cannot decode from a pipe)
+   */
+  private async runAnalyzerOnTempFile(
+    audioBuffer: Buffer,
+    fileName: string,
+    transcription: string,
+  ): Promise<PythonAnalyzerResult> {
+    const tempDir = os.tmpdir();
+    const tempAudioPath = path.join(
+      tempDir,
+      `audio-${Date.now()}-${path.basename(fileName)}`,
+    );
+    const tempWavPath = path.join(tempDir, `audio-${Date.now()}.wav`);
+
+    try {
+      fs.writeFileSync(tempAudioPath, audioBuffer);
+
+      const isWav = fileName.toLowerCase().endsWith('.wav');
+      const finalAudioPath = isWav ? tempAudioPath : tempWavPath;
+
+      if (!isWav) {
+        try {
+          await new Promise<void>((resolve, reject) => {
+            ffmpeg(tempAudioPath)
+              .setFfmpegPath(ffmpegInstaller.path)
+              .audioCodec('pcm_s16le')
+              .audioFrequency(this.analysisSampleRate)
+              .audioChannels(1)
+              .format('wav')
+              .on('end', () => resolve())
+              .on('error', (err) => reject(err))
+              .save(tempWavPath);
+          });
+        } catch (convertError) {
+          this.logger.warn(`Failed to convert audio to WAV: ${convertError}`);
+          if (!fs.existsSync(tempWavPath)) {
+            throw new Error(
+              `Failed to convert audio to WAV: ${convertError instanceof Error ? convertError.message : 'Unknown error'}`,
+            );
+          }
+        }
+      }
+
+      this.logger.debug(
+        `Executing Python script: ${this.pythonExecutable} ${this.pythonScriptPath} ${finalAudioPath}`,
+      );
+
+      if (!fs.existsSync(finalAudioPath)) {
+        this.logger.error(`Audio file not found: ${finalAudioPath}`);
+        throw new Error(`Audio file not found: ${finalAudioPath}`);
+      }
+
+      const input: AnalyzerInput = { audioPath: finalAudioPath };
+      return this.useWorker
+        ? await this.runAnalyzerInWorker(input, transcription)
+        : await this.runAnalyzerProcess(input, transcription);
     } finally {
       try {
         if (fs.existsSync(tempAudioPath)) {
@@ -665,4 +732,242 @@ export class PronunciationAnalysisService {
       }
     }
   }
+
+  /**
+   * Run the analyzer in a fresh Python process per request
+   * (PRONUNCIATION_WORKER_MODE=spawn)
+   */
+  private async runAnalyzerProcess(
+    input: AnalyzerInput,
+    transcription: string,
+  ): Promise<PythonAnalyzerResult> {
+    const stdout: string[] = [];
+    const stderr: string[] = [];
+
+    const args =
+      'audioPath' in input
+        ? [this.pythonScriptPath, input.audioPath, transcription]
+        : [
+            this.pythonScriptPath,
+            '--stdin',
+            transcription,
+            '--format',
+            input.audioFormat,
+            '--sample-rate',
+            String(input.sampleRate || 0),
+          ];
+    const pythonProcess = spawn(this.pythonExecutable, args);
+    if ('audio' in input) {
+      pythonProcess.stdin.end(input.audio);
+    }
+
+    pythonProcess.stdout.on('data', (data: Buffer) => {
+      stdout.push(data.toString());
+    });
+
+    pythonProcess.stderr.on('data', (data: Buffer) => {
+      stderr.push(data.toString());
+    });
+
+    // Thêm timeout để ngăn chặn treo
+    const timeout = 60000; // 60 seconds
+    const timeoutId = setTimeout(() => {
+      pythonProcess.kill('SIGTERM');
+      this.logger.error('Python script execution timeout');
+    }, timeout);
+
+    const exitCode = await new Promise<number>((resolve, reject) => {
+      pythonProcess.on('close', (code) => {
+        clearTimeout(timeoutId);
+        resolve(code || 0);
+      });
+      pythonProcess.on('error', (error) => {
+        clearTimeout(timeoutId);
+        this.logger.error(`Failed to spawn Python process: ${error}`);
+        reject(error);
+      });
+    });
+
+    const stdoutStr = stdout.join('');
+    const stderrStr = stderr.join('');
+
+    this.logger.debug(
+      `Python script stdout (first 500 chars): ${stdoutStr.substring(0, 500)}`,
+    );
+    if (stderrStr) {
+      this.logger.debug(`Python script stderr: ${stderrStr}`);
+    }
+
+    if (exitCode !== 0) {
+      this.logger.error(
+        `Python script exited with code ${exitCode}: ${stderrStr}`,
+      );
+      throw new Error(
+        `Python script failed with exit code ${exitCode}: ${stderrStr}`,
+      );
+    }
+
+    if (stderrStr) {
+      this.logger.warn(`Python script stderr: ${stderrStr}`);
+    }
+
+    // Xác thực stdout trước khi phân tích
+    if (!stdoutStr || stdoutStr.trim().length === 0) {
+      this.logger.error('Python script returned empty output');
+      throw new Error('Python script returned empty output');
+    }
+
+    // Phân tích kết quả JSON
+    let result: PythonAnalyzerResult;
+    try {
+      result = JSON.parse(stdoutStr) as PythonAnalyzerResult;
+    } catch (parseError) {
+      this.logger.error(
+        `Failed to parse Python script output: ${stdoutStr.substring(0, 500)}`,
+      );
+      throw new Error(
+        `Failed to parse Python script output: ${parseError instanceof Error ? parseError.message : 'Unknown error'}`,
+      );
+    }
+
+    return result;
+  }
+
+  /**
+   * Start the persistent analyzer worker if it is not running and wait until
+   * it has loaded its dependencies
+   */
+  private ensureWorker(): Promise<void> {
+    if (this.workerReady) {
+      return this.workerReady;
+    }
+
+    this.workerReady = new Promise<void>((resolve, reject) => {
+      this.logger.log(
+        `Starting pronunciation worker (concurrency ${this.workerConcurrency})`,
+      );
+      const worker = spawn(this.pythonExecutable, [
+        this.pythonScriptPath,
+        '--worker',
+        '--concurrency',
+        String(this.workerConcurrency),
+      ]);
+      this.worker = worker;
+
+      const lines = readline.createInterface({ input: worker.stdout });
+      lines.on('line', (line) => {
+        let message: WorkerMessage;
+        try {
+          message = JSON.parse(line) as WorkerMessage;
+        } catch {
+          this.logger.warn(
+            `Unexpected worker output: ${line.substring(0, 200)}`,
+          );
+          return;
+        }
+
+        if (message.ready) {
+          clearTimeout(startupTimer);
+          resolve();
+          return;
+        }
+
+        const pending = message.id
+          ? this.pendingRequests.get(message.id)
+          : null;
+        if (!pending) {
+          this.logger.warn(
+            `Worker response for unknown request: ${line.substring(0, 200)}`,
+          );
+          return;
+        }
+        this.pendingRequests.delete(message.id as string);
+        clearTimeout(pending.timer);
+        if (message.error) {
+          pending.reject(new Error(message.error));
+        } else {
+          pending.resolve(message.result as PythonAnalyzerResult);
+        }
+      });
+
+      worker.stderr.on('data', (data: Buffer) => {
+        this.logger.warn(`Pronunciation worker stderr: ${data.toString()}`);
+      });
+
+      const handleExit = (reason: string) => {
+        if (this.worker !== worker) {
+          return;
+        }
+        this.logger.error(`Pronunciation worker stopped: ${reason}`);
+        clearTimeout(startupTimer);
+        this.worker = null;
+        this.workerReady = null;
+        reject(new Error(`Pronunciation worker stopped: ${reason}`));
+        for (const [, pending] of this.pendingRequests) {
+          clearTimeout(pending.timer);
+          pending.reject(new Error(`Pronunciation worker stopped: ${reason}`));
+        }
+        this.pendingRequests.clear();
+      };
+      worker.on('exit', (code, signal) =>
+        handleExit(`exit code ${code}, signal ${signal}`),
+      );
+      worker.on('error', (error) => handleExit(String(error)));
+      // Writing to a worker that just died fails with EPIPE on stdin
+      worker.stdin.on('error', (error) => handleExit(String(error)));
+
+      // A worker that hangs while loading would otherwise block every request
+      const startupTimer = setTimeout(() => {
+        handleExit(`not ready after ${this.workerTimeoutMs}ms`);
+        worker.kill('SIGKILL');
+      }, this.workerTimeoutMs);
+    });
+
+    return this.workerReady;
+  }
+
+  /**
+   * Send one analysis request to the persistent worker (default mode)
+   */
+  private async runAnalyzerInWorker(
+    input: AnalyzerInput,
+    transcription: string,
+  ): Promise<PythonAnalyzerResult> {
+    await this.ensureWorker();
+    const worker = this.worker;
+    if (!worker) {
+      throw new Error('Pronunciation worker is not running');
+    }
+
+    const id = String(++this.requestCounter);
+    return new Promise<PythonAnalyzerResult>((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pendingRequests.delete(id);
+        reject(new Error('Pronunciation worker request timeout'));
+      }, this.workerTimeoutMs);
+      this.pendingRequests.set(id, { resolve, reject, timer });
+      const request =
+        'audioPath' in input
+          ? { id, audioPath: input.audioPath, transcription }
+          : {
+              id,
+              transcription,
+              audio: input.audio.toString('base64'),
+              audioFormat: input.audioFormat,
+              sampleRate: input.sampleRate,
+              channels: 1,
+            };
+      worker.stdin.write(JSON.stringify(request) + '\n');
+    });
+  }
+
+  onModuleDestroy() {
+    if (this.worker) {
+      const worker = this.worker;
+      this.worker = null;
+      this.workerReady = null;
+      worker.stdin.end();
+      worker.kill('SIGTERM');
+    }
+  }
 }
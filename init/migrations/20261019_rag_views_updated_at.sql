@@ -0,0 +1,58 @@
+-- Adds updated_at to rag_courses and rag_blogs for the chatbot's incremental
+-- catalog sync. Fresh databases get it from 04-rag-views.sql; existing ones
+-- never re-run the init scripts, so apply this once:
+--
+--   docker exec -i postgres-ielts psql -U postgres -d ielts < init/migrations/20261019_rag_views_updated_at.sql
+--
+-- CREATE OR REPLACE VIEW cannot insert a column before category_name, so the
+-- two views are recreated (and re-granted) in one transaction. Safe to re-run.
+
+BEGIN;
+
+DROP VIEW IF EXISTS rag_courses;
+CREATE VIEW rag_courses AS
+SELECT
+  c.id,
+  c.title,
+  c.description,
+  c.skill_focus,
+  c.difficulty_level,
+  c.estimated_duration,
+  c.price,
+  c.discount_price,
+  c.rating,
+  c.enrollment_count,
+  c.tags,
+  c.published_at,
+  c.updated_at,
+  cat.name AS category_name
+FROM courses c
+LEFT JOIN course_categories cat ON cat.id = c.category_id
+WHERE
+  c.deleted = FALSE
+  AND c.published_at IS NOT NULL
+  AND cat.deleted = FALSE;
+
+DROP VIEW IF EXISTS rag_blogs;
+CREATE VIEW rag_blogs AS
+SELECT
+  b.id,
+  b.title,
+  b.content,
+  b.tags,
+  b.published_at,
+  b.updated_at,
+  c.name AS category_name
+FROM blogs b
+LEFT JOIN blog_categories c ON c.id = b.category_id
+WHERE
+  b.deleted = FALSE
+  AND b.status = 'published'
+  AND c.deleted = FALSE;
+
+GRANT SELECT ON
+  rag_courses,
+  rag_blogs
+TO rag_reader;
+
+COMMIT;
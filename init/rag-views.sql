@@ -12,6 +12,7 @@ SELECT
   c.enrollment_count,
   c.tags,
   c.published_at,
+  c.updated_at,
   cat.name AS category_name
 FROM courses c
 LEFT JOIN course_categories cat ON cat.id = c.category_id
@@ -41,6 +42,7 @@ SELECT
   b.content,
   b.tags,
   b.published_at,
+  b.updated_at,
   c.name AS category_name
 FROM blogs b
 LEFT JOIN blog_categories c ON c.id = b.category_id